@@ -41,6 +41,18 @@ function renderGallery(items) {
     });
 }
 
+// Thumbnail markup: the resized copies when the server has made them, else the original
+function galleryPicture(item) {
+    const img = `<img src="${item.image_url}" alt="${item.title}" loading="lazy"` +
+        (item.image_width && item.image_height ? ` width="${item.image_width}" height="${item.image_height}"` : '') + '>';
+    if (!item.srcset) return img;
+    const sizes = '(max-width: 600px) 100vw, (max-width: 1024px) 50vw, 33vw';
+    const sources = Object.entries(item.srcset)
+        .map(([format, srcset]) => `<source type="image/${format}" srcset="${srcset}" sizes="${sizes}">`)
+        .join('');
+    return `<picture>${sources}${img}</picture>`;
+}
+
 // Create gallery item element
 function createGalleryItem(item) {
     const galleryItem = document.createElement('div');
@@ -50,7 +62,7 @@ function createGalleryItem(item) {
 
     galleryItem.innerHTML = `
         <div class="gallery-image">
-            <img src="${item.image_url}" alt="${item.title}" loading="lazy">
+            ${galleryPicture(item)}
             <div class="gallery-overlay">
                 <div class="gallery-info">
                     <h3>${item.title}</h3>
@@ -5,6 +5,7 @@ from .models import (
     Dividend, DividendPayment, News, FAQ, Download, Gallery, 
     ContactInfo, CustomerFeedback, SystemSetting
 )
+from . import member_search
 
 
 @admin.register(User)
@@ -31,6 +32,12 @@ class MemberAdmin(admin.ModelAdmin):
     search_fields = ['member_id', 'user__first_name', 'user__last_name', 'user__email']
     ordering = ['-created_at']
     readonly_fields = ['member_id', 'created_at', 'updated_at']
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the member search index instead of icontains scans"""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=member_search.search_ids(search_term, limit=self.list_per_page * 10)), False
 
 
 @admin.register(SavingsAccount)
@@ -0,0 +1,166 @@
+"""
+Vectorized loan amortization.
+
+``compute`` works out every installment of many loans at once as NumPy
+arrays shaped (loans, months), using the closed-form balance of each method
+instead of a Python loop per loan per month:
+
+* ``reducing``: level annuity payment; interest accrues on the outstanding
+  balance each month.
+* ``flat``: interest is charged on the original principal for the whole
+  term and principal is repaid in equal parts.
+
+``interest_rate`` is the annual percentage rate. Balances are rounded to the
+cent and each installment's principal is the difference of consecutive
+rounded balances, so principal always sums exactly to the loan amount and
+the last installment absorbs the rounding residue.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+
+from .models import Loan, LoanSchedule
+
+
+def compute(amount, annual_rate, term_months, flat):
+    """Return schedule arrays for a batch of loans (all inputs are 1-D arrays)"""
+    principal = np.asarray(amount, dtype=float)
+    rate = np.asarray(annual_rate, dtype=float) / 1200
+    terms = np.asarray(term_months, dtype=int)
+    flat = np.asarray(flat, dtype=bool)
+
+    months = np.arange(1, terms.max(initial=0) + 1)
+    mask = months[None, :] <= terms[:, None]
+    k = months[None, :]
+    P, r, n = principal[:, None], rate[:, None], terms[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        annuity = np.where(rate > 0, principal * rate / (1 - (1 + rate) ** -terms), principal / terms)
+        growth = (1 + r) ** k
+        reducing_balance = np.where(r > 0, P * growth - annuity[:, None] * (growth - 1) / r, P - annuity[:, None] * k)
+        flat_balance = P - P / n * k
+
+    closing = np.round(np.where(flat[:, None], flat_balance, reducing_balance), 2) + 0.0
+    closing[k >= n] = 0.0
+    opening = np.concatenate([np.round(P, 2), closing[:, :-1]], axis=1)
+    principal_part = opening - closing
+    interest = np.where(flat[:, None], np.round(P * r, 2), np.round(opening * r, 2)) + 0.0
+    payment = principal_part + interest
+    for array in (opening, closing, principal_part, interest, payment):
+        array[~mask] = 0.0
+
+    monthly = np.where(flat, np.round((principal + principal * rate * terms) / terms, 2), np.round(annuity, 2))
+    return {
+        'mask': mask,
+        'opening': opening,
+        'principal': principal_part,
+        'interest': interest,
+        'payment': payment,
+        'closing': closing,
+        'monthly_payment': monthly,
+        'total_amount': np.round(payment.sum(axis=1), 2),
+    }
+
+
+def due_dates(start_dates, term_months):
+    """Monthly due dates after each start date, clipped to the month's last day"""
+    start = np.asarray(start_dates, dtype='datetime64[D]')
+    month = start.astype('datetime64[M]')
+    day = (start - month.astype('datetime64[D]')).astype(int)
+    steps = month[:, None] + np.arange(1, max(term_months, default=0) + 1)[None, :]
+    month_end = (steps + 1).astype('datetime64[D]') - 1
+    return np.minimum(steps.astype('datetime64[D]') + day[:, None], month_end)
+
+
+def terms(amount, interest_rate, term_months, interest_method):
+    """Monthly payment and total repayable for a single loan, as Decimals"""
+    if term_months <= 0:
+        raise ValueError('term_months must be positive')
+    result = compute([amount], [interest_rate], [term_months], [interest_method == 'flat'])
+    return (
+        Decimal(f"{result['monthly_payment'][0]:.2f}"),
+        Decimal(f"{result['total_amount'][0]:.2f}"),
+    )
+
+
+def build_schedules(queryset, chunk_size=10000):
+    """
+    Recompute terms and replace the stored schedule for every loan in queryset.
+
+    Loans are processed in primary-key order, chunk by chunk. Installments
+    fall due monthly from the disbursement date (the application date until
+    disbursed) and due_date is set to the last one. Undisbursed loans also
+    get remaining_balance reset to the new total; for loans already
+    repaying, remaining_balance is left to the posting engine.
+    Returns the number of loans and schedule rows written.
+    """
+    loans_done = rows_done = 0
+    last_pk = 0
+    queryset = queryset.filter(term_months__gt=0)
+    fields = ('pk', 'amount', 'interest_rate', 'term_months', 'interest_method',
+              'disbursement_date', 'application_date', 'status')
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list(*fields)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        rows_done += _build_chunk(chunk)
+        loans_done += len(chunk)
+    return loans_done, rows_done
+
+
+def _build_chunk(chunk):
+    pks, amount, rate, term, method, disbursed, applied, status = zip(*chunk)
+    today = timezone.now().date()
+    result = compute(
+        [float(a) for a in amount], [float(r) for r in rate], term, [m == 'flat' for m in method]
+    )
+    starts = [d or a or today for d, a in zip(disbursed, applied)]
+    dates = due_dates(starts, term)
+
+    mask = result['mask']
+    loan_index, month_index = np.nonzero(mask)
+    # Rounded floats keep their two-decimal repr, which every backend parses exactly
+    money = {name: np.round(result[name][mask], 2)
+             for name in ('opening', 'principal', 'interest', 'payment', 'closing')}
+    now = LoanSchedule._meta.get_field('created_at').get_db_prep_value(timezone.now(), connection)
+    loan_updated = Loan._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+    schedule_rows = list(zip(
+        np.asarray(pks)[loan_index].tolist(),
+        (month_index + 1).tolist(),
+        np.datetime_as_string(dates[mask]).tolist(),
+        money['opening'].tolist(), money['principal'].tolist(), money['interest'].tolist(),
+        money['payment'].tolist(), money['closing'].tolist(),
+        [now] * len(loan_index),
+    ))
+
+    monthly = result['monthly_payment'].tolist()
+    total = result['total_amount'].tolist()
+    maturity = np.datetime_as_string(dates[np.arange(len(pks)), np.asarray(term) - 1]).tolist() if len(pks) else []
+    loan_rows = [
+        (monthly[i], total[i], total[i] if status[i] in ('pending', 'approved') else None,
+         maturity[i], loan_updated, pks[i])
+        for i in range(len(pks))
+    ]
+
+    quote = connection.ops.quote_name
+    schedule_table = quote(LoanSchedule._meta.db_table)
+    loan_table = quote(Loan._meta.db_table)
+    columns = ', '.join(quote(LoanSchedule._meta.get_field(name).column) for name in (
+        'loan', 'installment_number', 'due_date', 'opening_balance', 'principal',
+        'interest', 'payment', 'closing_balance', 'created_at'))
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        LoanSchedule.objects.filter(loan_id__in=pks).delete()
+        cursor.executemany(
+            f"INSERT INTO {schedule_table} ({columns}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            schedule_rows,
+        )
+        cursor.executemany(
+            f"UPDATE {loan_table} SET {quote('monthly_payment')} = %s, {quote('total_amount')} = %s, "
+            f"{quote('remaining_balance')} = COALESCE(%s, {quote('remaining_balance')}), "
+            f"{quote('due_date')} = %s, {quote('updated_at')} = %s WHERE {quote(Loan._meta.pk.column)} = %s",
+            loan_rows,
+        )
+    return len(schedule_rows)
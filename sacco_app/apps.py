@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class SaccoAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sacco_app'
-    verbose_name = 'SACCO Management System' 
\ No newline at end of file
+    verbose_name = 'SACCO Management System' 
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,238 @@
+"""
+Public content search.
+
+``ContentSearchDocument`` holds one row per published news item, active FAQ
+and active download. The database's full-text engine indexes its title and
+body (migration 0014):
+
+* SQLite: an external-content FTS5 table with the porter stemmer, kept in
+  step with the document table by triggers;
+* PostgreSQL: a GIN index on an 'english' tsvector of the document.
+
+Documents are rewritten once the transaction commits after a save or delete
+(signals.py): content that is unpublished or deactivated leaves the index.
+``search`` ranks matches across all three kinds in one query and returns a
+highlighted title and a snippet of the body around the matched words.
+"""
+import re
+import threading
+import time
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import escape
+
+from .models import News, FAQ, Download, ContentSearchDocument
+
+
+FTS_TABLE = 'sacco_app_contentsearch_fts'
+# Must match the expression of the PostgreSQL GIN index in migration 0014
+TSVECTOR = "to_tsvector('english', title || ' ' || body)"
+MAX_TERMS = 8
+SNIPPET_WORDS = 24
+TITLE_WEIGHT = 5.0
+# Matches ranked per query on SQLite; broader queries rank the newest ones
+RANKED_MATCHES = 2000
+# The engines mark matches with these; they are swapped for <mark> after escaping
+OPEN, CLOSE = '\x02', '\x03'
+
+_pending = threading.local()
+
+
+def _news(pks):
+    for pk, title, content, published_date, created_at in News.objects.filter(
+        pk__in=pks, is_published=True
+    ).values_list('pk', 'title', 'content', 'published_date', 'created_at'):
+        yield ContentSearchDocument(kind='news', object_id=pk, title=title, body=content,
+                                    published_at=published_date or created_at)
+
+
+def _faqs(pks):
+    for pk, question, answer, category, created_at in FAQ.objects.filter(
+        pk__in=pks, is_active=True
+    ).values_list('pk', 'question', 'answer', 'category', 'created_at'):
+        yield ContentSearchDocument(kind='faq', object_id=pk, title=question, body=answer,
+                                    category=category or '', published_at=created_at)
+
+
+def _downloads(pks):
+    for pk, title, description, file_type, created_at in Download.objects.filter(
+        pk__in=pks, is_active=True
+    ).values_list('pk', 'title', 'description', 'file_type', 'created_at'):
+        yield ContentSearchDocument(kind='download', object_id=pk, title=title, body=description or '',
+                                    category=file_type, published_at=created_at)
+
+
+# kind -> (model, builder of the documents of the visible objects among pks)
+SOURCES = {
+    'news': (News, _news),
+    'faq': (FAQ, _faqs),
+    'download': (Download, _downloads),
+}
+
+
+def update(kind, pks, chunk_size=1000):
+    """Rewrite the documents of the given objects, dropping those no longer public"""
+    pks = list(pks)
+    builder = SOURCES[kind][1]
+    for start in range(0, len(pks), chunk_size):
+        chunk = pks[start:start + chunk_size]
+        documents = list(builder(chunk))
+        visible = {document.object_id for document in documents}
+        ContentSearchDocument.objects.filter(kind=kind, object_id__in=set(chunk) - visible).delete()
+        ContentSearchDocument.objects.bulk_create(
+            documents, update_conflicts=True, unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'body', 'category', 'published_at', 'updated_at'],
+        )
+
+
+def schedule_update(kind, pk):
+    """Rewrite an object's document once the current transaction commits"""
+    pending = getattr(_pending, 'keys', None)
+    if pending is None:
+        pending = _pending.keys = set()
+    pending.add((kind, pk))
+    db_transaction.on_commit(_flush)
+
+
+def _flush():
+    pending = getattr(_pending, 'keys', None)
+    if not pending:
+        return
+    keys, _pending.keys = pending, set()
+    for kind in SOURCES:
+        pks = [pk for key_kind, pk in keys if key_kind == kind]
+        if pks:
+            update(kind, pks)
+
+
+def rebuild(chunk_size=1000):
+    """Recompute every document and rebuild the full-text index; returns a report dict"""
+    started = time.perf_counter()
+    counts = {}
+    for kind, (model, _) in SOURCES.items():
+        pks = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        update(kind, pks, chunk_size)
+        ContentSearchDocument.objects.filter(kind=kind).exclude(object_id__in=pks).delete()
+        counts[kind] = ContentSearchDocument.objects.filter(kind=kind).count()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return {'documents': counts, 'seconds': round(time.perf_counter() - started, 3)}
+
+
+def terms(query):
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def _marked(text):
+    """Escape engine output and turn its match markers into <mark> tags"""
+    return escape(text or '').replace(OPEN, '<mark>').replace(CLOSE, '</mark>')
+
+
+def _excerpt(text, words):
+    """Marked window of text around the first matched word, for engines without snippets"""
+    tokens = (text or '').split()
+    lowered = [token.lower() for token in tokens]
+    first = next((i for i, token in enumerate(lowered) if any(word in token for word in words)), 0)
+    start = max(0, first - SNIPPET_WORDS // 4)
+    window = [
+        f'{OPEN}{token}{CLOSE}' if any(word in token.lower() for word in words) else token
+        for token in tokens[start:start + SNIPPET_WORDS]
+    ]
+    return ('...' if start else '') + ' '.join(window) + ('...' if start + SNIPPET_WORDS < len(tokens) else '')
+
+
+def _sqlite_rows(match, kinds, limit):
+    table = ContentSearchDocument._meta.db_table
+    join = (
+        f"FROM {FTS_TABLE} JOIN {table} d ON d.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+    )
+    with connection.cursor() as cursor:
+        # bm25 costs far more per match than the lookup, so a word found in
+        # most documents is ranked within its newest matches only
+        cursor.execute(
+            f"SELECT {FTS_TABLE}.rowid {join} ORDER BY {FTS_TABLE}.rowid DESC LIMIT %s",
+            [match, *kinds, RANKED_MATCHES],
+        )
+        newest = cursor.fetchall()
+        if not newest:
+            return []
+        cursor.execute(
+            f"SELECT {FTS_TABLE}.rowid {join} AND {FTS_TABLE}.rowid >= %s "
+            f"ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0) LIMIT %s",
+            [match, *kinds, newest[-1][0], limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        # Snippets for the top rows only: SQLite evaluates the select list of
+        # every row it sorts
+        cursor.execute(
+            f"SELECT d.id, d.kind, d.object_id, highlight({FTS_TABLE}, 0, %s, %s), "
+            f"snippet({FTS_TABLE}, 1, %s, %s, '...', {SNIPPET_WORDS}), d.category, d.published_at "
+            f"{join} AND {FTS_TABLE}.rowid IN ({', '.join(['%s'] * len(ids))})",
+            [OPEN, CLOSE, OPEN, CLOSE, match, *kinds, *ids],
+        )
+        rows = {row[0]: row[1:] for row in cursor.fetchall()}
+    return [rows[pk] for pk in ids if pk in rows]
+
+
+def _rows(words, kinds, limit):
+    """(kind, object id, marked title, marked snippet, category, published_at) of the best matches"""
+    if connection.vendor == 'sqlite':
+        # Quoted, so words are never read as FTS5 operators; all must appear
+        return _sqlite_rows(' '.join(f'"{word}"' for word in words), kinds, limit)
+    if connection.vendor == 'postgresql':
+        table = ContentSearchDocument._meta.db_table
+        options = f'StartSel={OPEN}, StopSel={CLOSE}, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}'
+        sql = (
+            f"SELECT d.kind, d.object_id, ts_headline('english', d.title, q, 'HighlightAll=true, {options}'), "
+            f"ts_headline('english', d.body, q, '{options}'), d.category, d.published_at "
+            f"FROM {table} d, plainto_tsquery('english', %s) q "
+            f"WHERE {TSVECTOR} @@ q AND d.kind IN ({', '.join(['%s'] * len(kinds))}) "
+            f"ORDER BY ts_rank(setweight(to_tsvector('english', d.title), 'A') || "
+            f"setweight(to_tsvector('english', d.body), 'D'), q) DESC LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [' '.join(words), *kinds, limit])
+            return cursor.fetchall()
+    documents = ContentSearchDocument.objects.filter(kind__in=kinds)
+    for word in words:
+        documents = documents.filter(Q(title__icontains=word) | Q(body__icontains=word))
+    return [
+        (kind, object_id, _excerpt(title, words), _excerpt(body, words), category, published_at)
+        for kind, object_id, title, body, category, published_at in documents.order_by('-published_at')
+        .values_list('kind', 'object_id', 'title', 'body', 'category', 'published_at')[:limit]
+    ]
+
+
+def _aware(stamp):
+    """Timestamps read through a plain cursor come back naive in UTC on backends without time zones"""
+    if isinstance(stamp, str):
+        stamp = parse_datetime(stamp)
+    if stamp is not None and settings.USE_TZ and timezone.is_naive(stamp):
+        stamp = stamp.replace(tzinfo=dt_timezone.utc)
+    return stamp
+
+
+def search(query, kinds=None, limit=20):
+    """Published content matching every word of query, best first"""
+    words = terms(query)
+    if not words:
+        return []
+    return [
+        {
+            'type': kind,
+            'id': object_id,
+            'title': _marked(title),
+            'snippet': _marked(snippet),
+            'category': category,
+            'published_at': _aware(stamp),
+        }
+        for kind, object_id, title, snippet, category, stamp in _rows(words, list(kinds or SOURCES), limit)
+    ]
@@ -0,0 +1,168 @@
+"""
+Admin dashboard statistics.
+
+``compute`` issues one conditional-aggregation query per table. ``get_stats``
+serves them from the cache:
+
+* within ``DASHBOARD_CACHE_SECONDS`` of computing, the cached copy is served;
+* after that and up to ``DASHBOARD_STALE_SECONDS``, the stale copy is still
+  served while a single background thread recomputes it;
+* a write to any model the dashboard counts deletes the copy (see
+  signals.py), so the next load recomputes it. Ledger postings do not
+  invalidate; their KPIs catch up through the refresh cycle above.
+
+The copy, the refresh lock and the generation live in the ``dashboard``
+cache, chosen by ``DASHBOARD_CACHE_BACKEND``. With the default, ``locmem``,
+each worker process keeps its own: a write invalidates only the copy of the
+process that handled it, others serve theirs until it goes stale, and every
+process recomputes on its own. ``file`` or ``db`` share one copy between
+workers.
+"""
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    Member, SavingsAccount, Loan, LoanSchedule, Transaction, News, FAQ, Download, Gallery, CustomerFeedback
+)
+
+
+CACHE_ALIAS = 'dashboard'
+CACHE_KEY = 'sacco:dashboard'
+REFRESH_LOCK_KEY = 'sacco:dashboard:refreshing'
+GENERATION_KEY = 'sacco:dashboard:generation'
+CENT = Decimal('0.01')
+OUTSTANDING_STATUSES = ('active', 'defaulted')
+
+
+def _money(value):
+    # SQLite sums decimal columns as floats
+    return Decimal('0.00') if value is None else Decimal(str(value)).quantize(CENT)
+
+
+def _loans(today):
+    """Loan book and portfolio at risk over 30 days"""
+    money = DecimalField(max_digits=14, decimal_places=2)
+    cutoff = today - timedelta(days=30)
+    # What the schedule says is still to fall due after the cutoff; a loan
+    # owing more than that has an installment over 30 days in arrears.
+    # Loans without a schedule are never counted at risk.
+    due_after_cutoff = (
+        LoanSchedule.objects.filter(loan=OuterRef('pk')).order_by().values('loan')
+        .annotate(total=Sum('payment', filter=Q(due_date__gt=cutoff), default=0)).values('total')
+    )
+    outstanding = Q(status__in=OUTSTANDING_STATUSES)
+    stats = Loan.objects.annotate(
+        due_after_cutoff=Coalesce(Subquery(due_after_cutoff, output_field=money), F('remaining_balance'))
+    ).aggregate(
+        loan_book=Sum('remaining_balance', filter=outstanding),
+        active_loans=Count('pk', filter=outstanding),
+        pending_loans=Count('pk', filter=Q(status='pending')),
+        par30_balance=Sum('remaining_balance', filter=outstanding & Q(remaining_balance__gt=F('due_after_cutoff'))),
+    )
+    loan_book, par30 = _money(stats['loan_book']), _money(stats['par30_balance'])
+    return {
+        'loan_book': loan_book,
+        'active_loans': stats['active_loans'],
+        'pending_loans': stats['pending_loans'],
+        'par30_balance': par30,
+        'par30_ratio': (par30 * 100 / loan_book).quantize(CENT) if loan_book else Decimal('0.00'),
+    }
+
+
+def compute():
+    """Compute every dashboard figure, one query per table"""
+    now = timezone.now()
+    today = timezone.localdate(now)
+    start_of_day = timezone.make_aware(datetime.combine(today, dt_time.min))
+
+    news = News.objects.aggregate(total=Count('pk'), published=Count('pk', filter=Q(is_published=True)))
+    faqs = FAQ.objects.aggregate(total=Count('pk'), active=Count('pk', filter=Q(is_active=True)))
+    downloads = Download.objects.aggregate(total=Count('pk'), active=Count('pk', filter=Q(is_active=True)))
+    gallery = Gallery.objects.aggregate(total=Count('pk'), active=Count('pk', filter=Q(is_active=True)))
+    feedback = CustomerFeedback.objects.aggregate(total=Count('pk'), new=Count('pk', filter=Q(status='new')))
+    members = Member.objects.aggregate(total=Count('pk'), active=Count('pk', filter=Q(status='active')))
+    savings = SavingsAccount.objects.aggregate(total=Sum('balance'))
+    today_txns = Transaction.objects.filter(created_at__gte=start_of_day).aggregate(
+        count=Count('pk'),
+        volume=Sum('amount'),
+        deposits=Sum('amount', filter=Q(transaction_type='deposit')),
+        withdrawals=Sum('amount', filter=Q(transaction_type='withdrawal')),
+    )
+
+    return {
+        'total_news': news['total'],
+        'total_faqs': faqs['total'],
+        'total_downloads': downloads['total'],
+        'total_gallery': gallery['total'],
+        'new_feedback_count': feedback['new'],
+        'total_feedback': feedback['total'],
+        'published_news': news['published'],
+        'active_faqs': faqs['active'],
+        'active_downloads': downloads['active'],
+        'active_gallery': gallery['active'],
+        'total_members': members['total'],
+        'active_members': members['active'],
+        'total_deposits': _money(savings['total']),
+        **_loans(today),
+        'transactions_today': today_txns['count'],
+        'transaction_volume_today': _money(today_txns['volume']),
+        'deposits_today': _money(today_txns['deposits']),
+        'withdrawals_today': _money(today_txns['withdrawals']),
+        'generated_at': now,
+    }
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def refresh():
+    """Recompute the statistics and cache them"""
+    cache = _cache()
+    generation = cache.get(GENERATION_KEY, 0)
+    stats = compute()
+    # A write that landed while computing may be missing from these figures
+    if cache.get(GENERATION_KEY, 0) == generation:
+        fresh_for = settings.DASHBOARD_CACHE_SECONDS
+        cache.set(CACHE_KEY, (time.time() + fresh_for, stats), fresh_for + settings.DASHBOARD_STALE_SECONDS)
+    return stats
+
+
+def _refresh_in_background():
+    try:
+        refresh()
+    finally:
+        _cache().delete(REFRESH_LOCK_KEY)
+        connection.close()
+
+
+def get_stats():
+    """Dashboard statistics, from the cache when possible"""
+    cache = _cache()
+    cached = cache.get(CACHE_KEY)
+    if cached is None:
+        return refresh()
+    fresh_until, stats = cached
+    # cache.add is atomic, so only one request starts a refresh
+    if time.time() >= fresh_until and cache.add(REFRESH_LOCK_KEY, True, settings.DASHBOARD_STALE_SECONDS):
+        threading.Thread(target=_refresh_in_background, name='dashboard-refresh', daemon=True).start()
+    return stats
+
+
+def invalidate():
+    """Drop the cached statistics so the next load recomputes them"""
+    cache = _cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+    cache.delete(CACHE_KEY)
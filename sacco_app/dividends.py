@@ -0,0 +1,252 @@
+"""
+Dividend runs.
+
+``calculate_payments`` sizes a dividend from one grouped aggregate over the
+active share lots, walked in member order, and inserts the payments in
+chunks with one prepared INSERT run per row (no model instances). The
+unique (dividend, member) constraint plus the backend's ignore-conflicts
+insert makes a re-run a no-op for members that already have a payment.
+
+``pay_out`` credits the unpaid payments to members' savings accounts in
+pk-ordered chunks. Each chunk advances a ``DividendPayout`` checkpoint,
+marks its payments paid, credits the accounts and writes the ledger rows in
+one transaction, so a crashed run resumes after the last committed chunk
+and no payment is credited twice. The API queues it as a background job
+(``schedule_payout``); ``manage.py pay_dividend`` runs it in the foreground.
+"""
+import time
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction as db_transaction
+from django.db.models import F, Sum
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from . import jobs, posting, rollups, summaries
+from .ids import next_id
+from .models import SavingsAccount, Transaction, Share, Dividend, DividendPayment, DividendPayout, Job
+
+
+def calculate_payments(dividend, chunk_size=5000):
+    """Create one payment per member holding active shares; returns a report dict"""
+    started = time.perf_counter()
+    holdings = (
+        Share.objects.filter(is_active=True)
+        .values('member').annotate(shares=Sum('quantity'))
+        .filter(shares__gt=0).order_by('member')
+    )
+    fields = [DividendPayment._meta.get_field(name) for name in (
+        'dividend', 'member', 'shares_owned', 'amount', 'is_paid', 'created_at')]
+    quote = connection.ops.quote_name
+    sql = (
+        f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} "
+        f"{quote(DividendPayment._meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))}) "
+        f"{connection.ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None)}"
+    )
+    created_at = fields[-1].get_db_prep_value(timezone.now(), connection)
+    is_paid = fields[-2].get_db_prep_value(False, connection)
+    members = 0
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        existing = dividend.payments.count()
+        last_member = 0
+        while True:
+            chunk = list(holdings.filter(member__gt=last_member).values_list('member', 'shares')[:chunk_size])
+            if not chunk:
+                break
+            last_member = chunk[-1][0]
+            members += len(chunk)
+            existing_members = set(
+                dividend.payments.filter(member_id__in=[member_id for member_id, _ in chunk])
+                .values_list('member_id', flat=True)
+            )
+            cursor.executemany(sql, [
+                (dividend.pk, member_id, shares, str(shares * dividend.amount_per_share), is_paid, created_at)
+                for member_id, shares in chunk
+            ])
+            summaries.adjust_many({
+                member_id: (0, 0, shares * dividend.amount_per_share, None)
+                for member_id, shares in chunk if member_id not in existing_members
+            })
+        total = dividend.payments.count()
+    return {
+        'members': members,
+        'created': total - existing,
+        'existing': existing,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def pay_out(dividend, chunk_size=1000, progress=None):
+    """
+    Credit every unpaid payment of dividend; returns a report dict.
+
+    Resumes the dividend's unfinished run if there is one. Payments of
+    members without an active savings account are skipped and stay unpaid
+    for a later run. ``progress`` is called with the checkpoint after each
+    chunk.
+    """
+    started = time.perf_counter()
+    payout = _open_payout(dividend)
+    resumed_from = payout.last_payment_id
+    paid = skipped = 0
+    amount = Decimal('0.00')
+    while True:
+        chunk = _pay_chunk(dividend, payout, chunk_size)
+        if chunk is None:
+            break
+        paid += chunk[0]
+        skipped += chunk[1]
+        amount += chunk[2]
+        if progress:
+            progress(payout)
+
+    now = timezone.now()
+    with db_transaction.atomic():
+        DividendPayout.objects.filter(pk=payout.pk).update(status='completed', completed_at=now, updated_at=now)
+        dividend_paid = not dividend.payments.filter(is_paid=False).exists()
+        if dividend_paid:
+            Dividend.objects.filter(pk=dividend.pk).update(is_paid=True, payment_date=now.date(), updated_at=now)
+    seconds = time.perf_counter() - started
+    return {
+        'payout': payout.pk,
+        'resumed_from': resumed_from,
+        'paid': paid,
+        'skipped': skipped,
+        'amount': str(amount),
+        'dividend_paid': dividend_paid,
+        'seconds': round(seconds, 3),
+        'payments_per_second': round(paid / seconds) if seconds else None,
+    }
+
+
+def pay_out_job(dividend_id):
+    pay_out(Dividend.objects.get(pk=dividend_id))
+
+
+def _payout_jobs(dividend):
+    return Job.objects.filter(task=jobs.task_path(pay_out_job), args=[dividend.pk])
+
+
+def schedule_payout(dividend):
+    """Queue a payout of dividend unless one is already queued or running; returns its checkpoint"""
+    # Opened here so the caller can report progress before a worker picks it up
+    payout = _open_payout(dividend)
+    if not _payout_jobs(dividend).filter(status__in=('queued', 'running')).exists():
+        jobs.enqueue(pay_out_job, dividend.pk)
+    return payout
+
+
+def payout_progress(dividend):
+    """Progress of dividend's latest payout and the job running it"""
+    payout = dividend.payouts.order_by('-started_at', '-pk').first()
+    job = _payout_jobs(dividend).order_by('-created_at', '-pk').first()
+    return {
+        'dividend': dividend.pk,
+        'payout': payout and {
+            'id': payout.pk,
+            'status': payout.status,
+            'payments_paid': payout.payments_paid,
+            'payments_skipped': payout.payments_skipped,
+            'amount_paid': str(payout.amount_paid),
+            'started_at': payout.started_at,
+            'updated_at': payout.updated_at,
+            'completed_at': payout.completed_at,
+        },
+        'job': job and {'status': job.status, 'attempts': job.attempts, 'last_error': job.last_error},
+        'unpaid_payments': dividend.payments.filter(is_paid=False).count(),
+    }
+
+
+def _open_payout(dividend):
+    """The dividend's running payout checkpoint, created if there is none"""
+    payout = DividendPayout.objects.filter(dividend=dividend, status='running').first()
+    if payout is None:
+        try:
+            with db_transaction.atomic():
+                payout = DividendPayout.objects.create(dividend=dividend)
+            payout.refresh_from_db()
+        except IntegrityError:
+            # Another run opened one first (unique_running_payout)
+            payout = DividendPayout.objects.get(dividend=dividend, status='running')
+    return payout
+
+
+def _payout_accounts(member_ids):
+    """Map member id to (account pk, account number), preferring regular savings"""
+    accounts = {}
+    rows = (
+        SavingsAccount.objects.filter(member_id__in=member_ids, is_active=True)
+        .order_by('member_id', 'pk').values_list('member_id', 'pk', 'account_number', 'account_type')
+    )
+    for member_id, pk, number, account_type in rows:
+        if member_id not in accounts or (account_type == 'regular' and accounts[member_id][2] != 'regular'):
+            accounts[member_id] = (pk, number, account_type)
+    return accounts
+
+
+def _pay_chunk(dividend, payout, chunk_size):
+    """Pay the next chunk after the checkpoint; returns (paid, skipped, amount) or None when done"""
+    payments = list(
+        DividendPayment.objects.filter(dividend=dividend, is_paid=False, pk__gt=payout.last_payment_id)
+        .order_by('pk').values_list('pk', 'member_id', 'amount')[:chunk_size]
+    )
+    if not payments:
+        return None
+    accounts = _payout_accounts({member_id for _, member_id, _ in payments})
+    payable = [(pk, member_id, amount, accounts[member_id]) for pk, member_id, amount in payments
+               if member_id in accounts]
+    totals = {}
+    for _, _, amount, (account_pk, _, _) in payable:
+        totals[account_pk] = totals.get(account_pk, Decimal('0.00')) + amount
+    amount = sum(totals.values(), Decimal('0.00'))
+    last_payment_id = payments[-1][0]
+    now = timezone.now()
+
+    with db_transaction.atomic():
+        # Advancing the checkpoint first serializes concurrent runners: the
+        # loser sees its expected position gone and rolls back
+        advanced = DividendPayout.objects.filter(pk=payout.pk, last_payment_id=payout.last_payment_id).update(
+            last_payment_id=last_payment_id,
+            payments_paid=F('payments_paid') + len(payable),
+            payments_skipped=F('payments_skipped') + len(payments) - len(payable),
+            amount_paid=F('amount_paid') + amount,
+            updated_at=now,
+        )
+        if not advanced:
+            raise posting.PostingError('Dividend payout is already running')
+        marked = DividendPayment.objects.filter(pk__in=[pk for pk, _, _, _ in payable], is_paid=False).update(
+            is_paid=True, payment_date=now.date(),
+        )
+        if marked != len(payable):
+            raise posting.PostingError('Dividend payments changed during payout')
+        balances = posting.credit_accounts(totals)
+
+        running = {pk: balances[pk] - total for pk, total in totals.items()}
+        ledger = []
+        for payment_pk, member_id, payment_amount, (account_pk, account_number, _) in payable:
+            running[account_pk] += payment_amount
+            ledger.append(Transaction(
+                member_id=member_id,
+                transaction_id=next_id('transaction'),
+                transaction_type='dividend',
+                amount=payment_amount,
+                description=f'Dividend {dividend.year} to {account_number}',
+                reference_number=f'DIV{dividend.pk}-{payment_pk}',
+                savings_account_id=account_pk,
+                balance_after=running[account_pk],
+            ))
+        Transaction.objects.bulk_create(ledger)
+
+        deltas = {}
+        for entry in ledger:
+            savings, _, unpaid, last = deltas.get(entry.member_id, (Decimal('0.00'), 0, 0, entry.created_at))
+            deltas[entry.member_id] = (savings + entry.amount, 0, unpaid - entry.amount, max(last, entry.created_at))
+        summaries.adjust_many(deltas)
+        rollups.record(ledger)
+
+    payout.last_payment_id = last_payment_id
+    payout.payments_paid += len(payable)
+    payout.payments_skipped += len(payments) - len(payable)
+    payout.amount_paid += amount
+    return len(payable), len(payments) - len(payable), amount
@@ -0,0 +1,115 @@
+"""
+Idempotency-Key support for money-moving endpoints.
+
+A request carrying an ``Idempotency-Key`` header runs inside one database
+transaction that also inserts the key row and stores the rendered response.
+Retries with the same key and payload replay that response without running
+the view again.
+
+A concurrent duplicate's insert blocks on the unique (user, key) index until
+the first request commits. It then finds the stored response and replays it.
+If the first request rolled back, the duplicate proceeds normally.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+
+def _file_digest(upload):
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def fingerprint(request):
+    """Hash of what the key promises: method, path with query string, and payload"""
+    data = request.data
+    if request.FILES:
+        # Uploads by content; their repr names only the file
+        data = {key: value for key, value in request.data.items() if key not in request.FILES}
+        data['files'] = {name: _file_digest(upload) for name, upload in request.FILES.items()}
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.get_full_path()}\n{payload}'.encode()).hexdigest()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response(
+            {'error': f'{HEADER} was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    response = HttpResponse(record.response_body, status=record.response_status, content_type='application/json')
+    response[REPLAY_HEADER] = 'true'
+    return response
+
+
+class _Uncacheable(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def idempotent(view_method):
+    """Honor the Idempotency-Key header on a viewset action"""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response({'error': f'{HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_hash = fingerprint(request)
+        now = timezone.now()
+        try:
+            with db_transaction.atomic():
+                IdempotencyKey.objects.filter(user=request.user, key=key, expires_at__lte=now).delete()
+                try:
+                    # A savepoint of its own, so only a clash on the key lands here;
+                    # an IntegrityError from the view propagates as it would without a key
+                    with db_transaction.atomic():
+                        record = IdempotencyKey.objects.create(
+                            user=request.user, key=key, request_hash=request_hash, response_status=0,
+                            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+                        )
+                except IntegrityError:
+                    # Another request holds (or held) this key and has committed
+                    return _replay(IdempotencyKey.objects.get(user=request.user, key=key), request_hash)
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    # Roll back so a retry runs the request again
+                    raise _Uncacheable(response)
+                record.response_status = response.status_code
+                record.response_body = JSONRenderer().render(response.data).decode()
+                record.save(update_fields=['response_status', 'response_body'])
+        except _Uncacheable as e:
+            return e.response
+        return response
+    return wrapper
+
+
+def purge_expired(batch_size=10000):
+    """Delete expired keys in pk batches; returns the number deleted"""
+    deleted = 0
+    now = timezone.now()
+    while True:
+        batch = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,134 @@
+"""
+Human-readable, collision-free identifiers.
+
+Each kind of ID (``TXN000000000042``, ``MEM000001234`` ...) is backed by a row
+in ``IdSequence``. A process reserves a block of values with one atomic
+``UPDATE`` and hands them out from memory, so most IDs cost no database round
+trip. IDs are unique across processes and are handed out in increasing
+order within each reserved block.
+
+A block reserved while the caller is inside a transaction is only shared
+with other threads once that transaction commits. If it rolls back, the
+sequence row rolls back with it and the unused remainder is dropped, so the
+same range can never be handed out twice.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+
+FORMATS = {
+    'transaction': ('TXN', 12),
+    'member': ('MEM', 9),
+    'savings_account': ('SAV', 10),
+    'loan': ('LN', 9),
+    'share': ('SHR', 9),
+}
+
+_lock = threading.Lock()
+_blocks = {}  # name -> list of committed [next, end) ranges shared by all threads
+_local = threading.local()
+
+
+class _PendingBlock:
+    """A block reserved inside a still-open transaction"""
+
+    def __init__(self, name, start, end):
+        self.name = name
+        self.next = start
+        self.end = end
+
+    def is_live(self):
+        # Django drops on_commit callbacks when the transaction (or the
+        # savepoint that registered them) rolls back
+        return any(item[1] == self.commit for item in connection.run_on_commit)
+
+    def commit(self):
+        pending = _local.__dict__.get('pending', {})
+        if pending.get(self.name) is self:
+            del pending[self.name]
+        if self.next < self.end:
+            with _lock:
+                _blocks.setdefault(self.name, []).append([self.next, self.end])
+
+
+def block_size():
+    return getattr(settings, 'ID_BLOCK_SIZE', 100)
+
+
+def next_id(name):
+    """Return the next formatted ID for ``name`` (a key of ``FORMATS``)"""
+    prefix, width = FORMATS[name]
+    return f"{prefix}{next_value(name):0{width}d}"
+
+
+def next_value(name):
+    """Return the next raw counter value for ``name``"""
+    value = _take_committed(name)
+    if value is not None:
+        return value
+
+    if connection.in_atomic_block:
+        pending = _local.__dict__.setdefault('pending', {})
+        block = pending.get(name)
+        if block is None or block.next >= block.end or not block.is_live():
+            start, end = _reserve(name, block_size())
+            block = pending[name] = _PendingBlock(name, start, end)
+            transaction.on_commit(block.commit)
+        value = block.next
+        block.next += 1
+        return value
+
+    start, end = _reserve(name, block_size())
+    if end - start > 1:
+        with _lock:
+            _blocks.setdefault(name, []).append([start + 1, end])
+    return start
+
+
+def _take_committed(name):
+    with _lock:
+        ranges = _blocks.get(name)
+        while ranges:
+            current = ranges[0]
+            if current[0] < current[1]:
+                value = current[0]
+                current[0] += 1
+                return value
+            ranges.pop(0)
+    return None
+
+
+def _reserve(name, size):
+    """Atomically claim ``size`` values; returns the [start, end) range"""
+    from .models import IdSequence
+
+    with transaction.atomic():
+        updated = IdSequence.objects.filter(name=name).update(next_value=F('next_value') + size)
+        if not updated:
+            IdSequence.objects.create(name=name, next_value=1 + size)
+            return 1, 1 + size
+        end = IdSequence.objects.values_list('next_value', flat=True).get(name=name)
+    return end - size, end
+
+
+def reset():
+    """Forget every cached block in this process"""
+    with _lock:
+        _blocks.clear()
+    _local.__dict__.pop('pending', None)
+
+
+def _after_fork():
+    # A forked worker must not reuse the parent's cached ranges; the lock is
+    # replaced too in case another thread held it at fork time
+    global _lock, _blocks, _local
+    _lock = threading.Lock()
+    _blocks = {}
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,214 @@
+"""
+Resized copies of the news and gallery images.
+
+Originals are served as uploaded, often megabytes of camera JPEG or PNG
+screenshot shown as a thumbnail. Once an upload commits, signals.py queues a
+job for it (``schedule``). The job has ``imaging.render`` make WebP and JPEG
+copies at each of ``IMAGE_DERIVATIVE_WIDTHS``, in a pool of
+``IMAGE_DERIVATIVE_WORKERS`` processes so Pillow's CPU time stays off the
+workers and web processes. Copies are stored under ``derived/`` in the media
+storage, and the row records them with the image's dimensions:
+
+    image_variants = {'source': 'gallery/x.jpg', 'files': [
+        {'format': 'webp', 'width': 320, 'height': 180, 'name': 'derived/gallery/x-320w.webp', 'size': 2438},
+        ...
+    ]}
+
+The serializers turn ``files`` into a ``srcset`` per format. ``source``
+tells whether the copies belong to the current image;
+``manage.py generate_image_derivatives`` makes the missing ones for existing
+media.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import imaging, jobs, public_cache, snapshots
+from .models import News, Gallery, Job
+
+
+# kind -> (model, public collection it is listed in)
+MODELS = {
+    'news': (News, 'news'),
+    'gallery': (Gallery, 'gallery'),
+}
+FORMATS = ('webp', 'jpeg')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def executor(workers=None):
+    # Spawned, not forked: the job workers and web servers that start pools
+    # run threads, and a forked child inherits their locks
+    return ProcessPoolExecutor(
+        max_workers=workers or settings.IMAGE_DERIVATIVE_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+    )
+
+
+def pool():
+    """The process pool of this process, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = executor()
+        return _pool
+
+
+def source(name):
+    """What render reads an image from: its path when the storage is local, else its bytes"""
+    try:
+        return default_storage.path(name)
+    except NotImplementedError:
+        with default_storage.open(name, 'rb') as handle:
+            return handle.read()
+
+
+def derived_name(name, fmt, width):
+    """Storage name of a copy of image name"""
+    path = PurePosixPath(name)
+    return str(PurePosixPath('derived') / path.parent / f"{path.stem}-{width}w.{'jpg' if fmt == 'jpeg' else fmt}")
+
+
+def delete_files(variants):
+    for entry in (variants or {}).get('files', []):
+        default_storage.delete(entry['name'])
+
+
+def store(kind, pk, name, rendered):
+    """
+    Save rendered copies of image name and record them on the row; returns
+    the bytes saved, or None when the row's image has changed meanwhile.
+    """
+    model, collection = MODELS[kind]
+    width, height, copies = rendered
+    files = [
+        {'format': fmt, 'width': w, 'height': h, 'size': len(data),
+         'name': default_storage.save(derived_name(name, fmt, w), ContentFile(data))}
+        for fmt, w, h, data in copies
+    ]
+    variants = {'source': name, 'files': files}
+    previous = model.objects.filter(pk=pk, image=name).values_list('image_variants', flat=True).first()
+    # A queryset update so the save signals do not queue this work again;
+    # updated_at moves so cached responses and snapshots pick the copies up
+    updated = previous is not None and model.objects.filter(pk=pk, image=name).update(
+        image_width=width, image_height=height, image_variants=variants, updated_at=timezone.now(),
+    )
+    if not updated:
+        delete_files(variants)
+        return None
+    delete_files({'files': [entry for entry in previous.get('files', []) if entry not in files]})
+    public_cache.invalidate(collection)
+    snapshots.schedule(collection)
+    return sum(entry['size'] for entry in files)
+
+
+def clear(kind, pk):
+    """Forget the copies of a row whose image was removed"""
+    model, collection = MODELS[kind]
+    previous = model.objects.filter(pk=pk).values_list('image_variants', flat=True).first()
+    if not previous:
+        return
+    if not model.objects.filter(Q(image='') | Q(image__isnull=True), pk=pk).update(
+        image_width=None, image_height=None, image_variants={}, updated_at=timezone.now(),
+    ):
+        return
+    delete_files(previous)
+    public_cache.invalidate(collection)
+    snapshots.schedule(collection)
+
+
+def generate(kind, pk, executor=None):
+    """Make and record the copies of a row's current image; returns the bytes saved"""
+    model, _ = MODELS[kind]
+    name = model.objects.filter(pk=pk).values_list('image', flat=True).first()
+    if not name:
+        clear(kind, pk)
+        return 0
+    rendered = (executor or pool()).submit(
+        imaging.render, source(name), settings.IMAGE_DERIVATIVE_WIDTHS, FORMATS,
+    ).result()
+    return store(kind, pk, name, rendered)
+
+
+def generate_job(kind, pk):
+    generate(kind, pk)
+
+
+def is_current(instance):
+    """Whether the recorded copies are those of the instance's image"""
+    return (instance.image.name or '') == (instance.image_variants or {}).get('source', '')
+
+
+def schedule(kind, pk):
+    """Queue the copies of a row's image unless a job for it is already waiting"""
+    if Job.objects.filter(task=jobs.task_path(generate_job), status='queued', args=[kind, pk]).exists():
+        return
+    jobs.enqueue(generate_job, kind, pk)
+
+
+def discard(variants):
+    """Delete the copies of a deleted row once its transaction commits"""
+    if variants and variants.get('files'):
+        db_transaction.on_commit(lambda: delete_files(variants))
+
+
+
+def pending(kind, force=False):
+    """(pk, image name) of the rows whose image has no current copies (every image with force)"""
+    model, _ = MODELS[kind]
+    rows = model.objects.exclude(image='').exclude(image__isnull=True).order_by('pk').values_list(
+        'pk', 'image', 'image_variants',
+    )
+    return [(pk, name) for pk, name, variants in rows if force or (variants or {}).get('source') != name]
+
+
+def backfill(kinds=None, workers=None, force=False):
+    """Make the missing copies of existing images in parallel; returns a report dict"""
+    started = time.perf_counter()
+    workers = workers or settings.IMAGE_DERIVATIVE_WORKERS
+    report = {'images': 0, 'skipped': 0, 'original_bytes': 0, 'derived_bytes': 0, 'failed': []}
+    running = {}
+
+    def collect(futures):
+        for future in futures:
+            kind, pk, name = running.pop(future)
+            try:
+                saved = store(kind, pk, name, future.result())
+            except Exception as e:
+                report['failed'].append(f'{kind} {pk} ({name}): {e}')
+                continue
+            if saved is None:
+                report['skipped'] += 1
+            else:
+                report['images'] += 1
+                report['derived_bytes'] += saved
+                report['original_bytes'] += default_storage.size(name)
+
+    with executor(workers) as processes:
+        for kind in kinds or MODELS:
+            for pk, name in pending(kind, force):
+                # A few images queued per process: enough to keep them busy
+                # without holding every original in memory
+                if len(running) >= 2 * workers:
+                    collect(wait(running, return_when=FIRST_COMPLETED).done)
+                try:
+                    image = source(name)
+                except OSError as e:
+                    report['failed'].append(f'{kind} {pk} ({name}): {e}')
+                    continue
+                running[processes.submit(imaging.render, image, settings.IMAGE_DERIVATIVE_WIDTHS, FORMATS)] = (
+                    kind, pk, name,
+                )
+        collect(wait(running).done)
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
@@ -0,0 +1,253 @@
+"""
+Images resized on request, cached on disk.
+
+``/media/resize/<w>x<h>/<path>`` serves a news or gallery image scaled down
+to fit within w x h, one of the boxes in ``IMAGE_RESIZE_SIZES``: the
+endpoint is public, so the sizes that can be made (and fill the cache) are
+few. The result is WebP for clients that accept it and JPEG otherwise. Each result is computed once and kept in
+``IMAGE_RESIZE_CACHE_DIR``, keyed by the source file's name, size and
+modification time, the box and the format:
+
+* concurrent misses for one key take the same lock file (one of 256, picked
+  by the first byte of the key) with ``flock``, so only the first computes
+  the image and the others find it written when they get the lock;
+* the total size of the cache is kept in ``stats.json`` under a global lock.
+  Once it passes ``IMAGE_RESIZE_CACHE_BYTES``, the least recently used
+  files are deleted until it is back under 80% of the budget. A hit touches
+  the file's mtime, which is what "recently used" is read from;
+* hits, misses and evictions are counted per process and added to
+  ``stats.json`` every few seconds, so ``stats`` covers every process
+  sharing the directory.
+
+Where a web server serves /media/ itself, it must pass /media/resize/
+through to Django.
+"""
+import hashlib
+import io
+import json
+import os
+import posixpath
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from . import image_derivatives, imaging, storage
+from .models import News, Gallery
+from .snapshots import write_atomic
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+# Media directories images may be resized from: those of the public image
+# fields, and the content-addressed store they are now kept in
+SOURCE_DIRS = tuple(
+    field.upload_to.rstrip('/') + '/'
+    for field in (News._meta.get_field('image'), Gallery._meta.get_field('image'))
+) + (f'{storage.PREFIX}/',)
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+CACHE_CONTROL = 'public, max-age=86400'
+LOW_WATER = 0.8
+# Seconds between touches of a file that keeps being hit, and between
+# additions of this process's counters to stats.json
+TOUCH_SECONDS = 60
+FLUSH_SECONDS = 5
+
+_counts = {}
+_counts_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+class ResizeError(ValueError):
+    """Raised for a box or source path that may not be resized"""
+
+
+def root():
+    return Path(settings.IMAGE_RESIZE_CACHE_DIR)
+
+
+@contextmanager
+def _locked(path):
+    """Hold an exclusive lock on the file at path, across processes"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+b') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_stats():
+    try:
+        return json.loads((root() / 'stats.json').read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _update_stats(changes):
+    """Add changes to the totals in stats.json; the caller holds the global lock"""
+    totals = _read_stats()
+    for name, value in changes.items():
+        totals[name] = totals.get(name, 0) + value
+    write_atomic(root() / 'stats.json', json.dumps(totals).encode())
+    return totals
+
+
+def _count(name):
+    global _flushed_at
+    with _counts_lock:
+        _counts[name] = _counts.get(name, 0) + 1
+        due = time.monotonic() - _flushed_at >= FLUSH_SECONDS
+    if due:
+        flush()
+
+
+def flush():
+    """Add this process's counters to stats.json"""
+    global _flushed_at
+    with _counts_lock:
+        pending = dict(_counts)
+        _counts.clear()
+        _flushed_at = time.monotonic()
+    if pending:
+        with _locked(root() / 'locks' / 'global.lock'):
+            _update_stats(pending)
+
+
+def source_name(path):
+    """The storage name of an image that may be resized, or ResizeError"""
+    name = posixpath.normpath(path)
+    if name.startswith(('/', '..')) or not name.startswith(SOURCE_DIRS) or '\\' in name:
+        raise ResizeError('Only news and gallery images can be resized')
+    return name
+
+
+def check_box(width, height):
+    if (width, height) not in settings.IMAGE_RESIZE_SIZES:
+        sizes = ', '.join(f'{w}x{h}' for w, h in sorted(settings.IMAGE_RESIZE_SIZES))
+        raise ResizeError(f'Size must be one of {sizes}')
+
+
+def key(name, width, height, fmt):
+    """Cache key of a resized image; None when the source does not exist"""
+    if not default_storage.exists(name):
+        return None
+    stamp = default_storage.get_modified_time(name).timestamp()
+    text = f'{name}|{default_storage.size(name)}|{stamp}|{width}x{height}|{fmt}'
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _path(cache_key, fmt):
+    return root() / cache_key[:2] / f"{cache_key}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def _hit(path):
+    """Open a cached file and mark it used; None when it is not cached"""
+    try:
+        handle = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    if time.time() - os.fstat(handle.fileno()).st_mtime > TOUCH_SECONDS:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return handle
+
+
+def _evict(totals):
+    """Delete the least recently used files until the cache is below the low-water mark"""
+    files = []
+    for directory in root().iterdir():
+        if directory.is_dir() and directory.name != 'locks':
+            for path in directory.iterdir():
+                if path.name.startswith('.'):
+                    # A file write_atomic is still writing
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    # Recounted from the files, so the total cannot drift
+    total = sum(size for _, size, _ in files)
+    target = settings.IMAGE_RESIZE_CACHE_BYTES * LOW_WATER
+    evicted = evicted_bytes = 0
+    for _, size, path in files:
+        if total <= target:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        evicted += 1
+        evicted_bytes += size
+    _update_stats({'bytes': total - totals.get('bytes', 0), 'evictions': evicted, 'evicted_bytes': evicted_bytes})
+
+
+def _store(path, data):
+    write_atomic(path, data)
+    with _locked(root() / 'locks' / 'global.lock'):
+        totals = _update_stats({'bytes': len(data)})
+        if totals['bytes'] > settings.IMAGE_RESIZE_CACHE_BYTES:
+            _evict(totals)
+
+
+def open_resized(name, width, height, fmt, cache_key):
+    """Open file of image name resized to fit width x height, computed on a miss"""
+    path = _path(cache_key, fmt)
+    handle = _hit(path)
+    if handle is not None:
+        _count('hits')
+        return handle
+    with _locked(root() / 'locks' / f'{cache_key[:2]}.lock'):
+        # Whoever held the lock before may have made it meanwhile
+        handle = _hit(path)
+        if handle is not None:
+            _count('hits')
+            return handle
+        _count('misses')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        image = image_derivatives.source(name)
+        try:
+            data = imaging.fit(image, width, height, fmt)
+        except (Image.DecompressionBombError, OSError, ValueError):
+            # Not an image, truncated or corrupt, or too many pixels to decode
+            raise ResizeError('The file is not an image that can be resized')
+        _store(path, data)
+    return io.BytesIO(data)
+
+
+def stats():
+    """Hit, miss and eviction counts and the size of the cache, across processes"""
+    flush()
+    totals = _read_stats()
+    hits, misses = totals.get('hits', 0), totals.get('misses', 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        'evictions': totals.get('evictions', 0),
+        'evicted_bytes': totals.get('evicted_bytes', 0),
+        'bytes': totals.get('bytes', 0),
+        'budget_bytes': settings.IMAGE_RESIZE_CACHE_BYTES,
+    }
@@ -0,0 +1,86 @@
+"""
+Resized WebP and JPEG copies of an image, made with Pillow.
+
+Nothing here imports Django, so ``render`` can run in the worker processes
+of the pool image_derivatives.py hands the work to. ``fit`` makes the
+one-off sizes image_resize.py serves.
+"""
+import io
+import math
+
+from PIL import Image, ImageOps
+
+
+QUALITY = {'webp': 80, 'jpeg': 82}
+SAVE_OPTIONS = {'webp': {'method': 4}, 'jpeg': {'optimize': True, 'progressive': True}}
+# EXIF orientations that turn the image a quarter, swapping width and height
+TRANSPOSED = {5, 6, 7, 8}
+
+
+def target_widths(width, widths):
+    """The configured widths below the original, plus the original when it is smaller than the largest"""
+    targets = sorted({w for w in widths if w < width})
+    if width <= max(widths):
+        targets.append(width)
+    return targets
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _flattened(image):
+    """RGB copy of an RGB or RGBA image, with transparency laid over white for JPEG"""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render(source, widths, formats=('webp', 'jpeg')):
+    """
+    (width, height, [(format, width, height, bytes)]) of an image file path
+    or its bytes.
+
+    Dimensions are those the image is displayed at, after its EXIF
+    orientation. The copies are never wider than the original and carry no
+    EXIF, XMP or ICC metadata.
+    """
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in TRANSPOSED:
+            width, height = height, width
+        targets = target_widths(width, widths)
+        # JPEG decodes straight to a fraction of its size, far faster than full size
+        scale = targets[-1] / width
+        image.draft('RGB', (math.ceil(image.size[0] * scale), math.ceil(image.size[1] * scale)))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+        copies = []
+        for target in reversed(targets):
+            size = (target, max(1, round(height * target / width)))
+            resized = image if size == image.size else image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+            for fmt in formats:
+                copies.append((fmt, size[0], size[1], encode(resized, fmt)))
+    return width, height, copies
+
+
+def encode(image, fmt):
+    """bytes of an RGB or RGBA image saved as webp or jpeg, without metadata"""
+    output = io.BytesIO()
+    frame = image if fmt == 'webp' else _flattened(image)
+    frame.save(output, fmt.upper(), quality=QUALITY[fmt], **SAVE_OPTIONS[fmt])
+    return output.getvalue()
+
+
+def fit(source, width, height, fmt):
+    """bytes of an image file path or its bytes, scaled down (never up) to fit within width x height"""
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as image:
+        box = (height, width) if image.getexif().get(0x0112) in TRANSPOSED else (width, height)
+        scale = min(box[0] / image.size[0], box[1] / image.size[1], 1)
+        image.draft('RGB', (math.ceil(image.size[0] * scale), math.ceil(image.size[1] * scale)))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+        image.thumbnail((width, height), Image.LANCZOS, reducing_gap=3.0)
+        return encode(image, fmt)
@@ -0,0 +1,160 @@
+"""
+Background jobs stored in the project database.
+
+``enqueue`` inserts a ``Job`` row naming a module-level function by dotted
+path. The row commits with the caller's transaction, so a job never runs for
+work that rolled back. ``manage.py run_workers`` runs a pool of workers that:
+
+* claim due jobs in batches with a conditional UPDATE tagged with a claim
+  token, so two workers never run the same job;
+* retry a failing job with exponential backoff until ``max_attempts``;
+* requeue jobs whose worker died mid-run once ``JOB_LOCK_TIMEOUT_SECONDS``
+  has passed.
+
+``stats`` reports queue depth, lag and per-task outcomes and durations.
+"""
+import logging
+import random
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Avg, Count, Max, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+
+def task_path(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, delay=0, max_attempts=None, **kwargs):
+    """Queue func(*args, **kwargs) to run in a worker; arguments must be JSON-serializable"""
+    return Job.objects.create(
+        task=task_path(func),
+        args=list(args),
+        kwargs=kwargs,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number `attempts`, with jitter"""
+    delay = min(settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def requeue_stale():
+    """Put back jobs whose worker stopped before finishing them"""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+    return Job.objects.filter(status='running', started_at__lt=cutoff).update(status='queued', locked_by='')
+
+
+def claim(batch_size=10):
+    """Mark up to batch_size due jobs as running for this worker and return them"""
+    now = timezone.now()
+    due = list(
+        Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not due:
+        return []
+    token = uuid.uuid4().hex
+    # Another worker may have claimed some of these since the SELECT; the
+    # status condition means each job is claimed by exactly one token
+    Job.objects.filter(pk__in=due, status='queued').update(status='running', locked_by=token, started_at=now)
+    return list(Job.objects.filter(pk__in=due, locked_by=token, status='running').order_by('run_at', 'pk'))
+
+
+def execute(job):
+    """Run one claimed job and record the outcome; returns True if it succeeded"""
+    started = time.perf_counter()
+    try:
+        import_string(job.task)(*job.args, **job.kwargs)
+    except Exception:
+        attempts = job.attempts + 1
+        values = {
+            'attempts': attempts,
+            'duration': time.perf_counter() - started,
+            'last_error': traceback.format_exc(limit=5),
+            'locked_by': '',
+        }
+        if attempts < job.max_attempts:
+            values.update(status='queued', run_at=timezone.now() + timedelta(seconds=backoff(attempts)))
+        else:
+            values.update(status='failed', finished_at=timezone.now())
+            logger.error('Job %s (%s) failed after %s attempts', job.pk, job.task, attempts)
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**values)
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status='succeeded', attempts=job.attempts + 1, finished_at=timezone.now(),
+        duration=time.perf_counter() - started, locked_by='',
+    )
+    return True
+
+
+def work(stop, batch_size=10, poll_interval=1.0, drain=False):
+    """
+    Worker loop: claim and run jobs until stop (a threading/multiprocessing Event) is set.
+
+    With drain=True, return as soon as no job is due. Returns (succeeded, failed).
+    """
+    succeeded = failed = 0
+    last_requeue = 0
+    try:
+        while not stop.is_set():
+            if time.monotonic() - last_requeue > settings.JOB_LOCK_TIMEOUT_SECONDS / 2:
+                requeue_stale()
+                last_requeue = time.monotonic()
+            jobs = claim(batch_size)
+            if not jobs:
+                if drain:
+                    break
+                stop.wait(poll_interval)
+                continue
+            for job in jobs:
+                if execute(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+    finally:
+        connection.close()
+    return succeeded, failed
+
+
+def stats():
+    """Queue depth, lag and per-task outcome counts and durations"""
+    now = timezone.now()
+    queued = Job.objects.filter(status='queued').aggregate(
+        depth=Count('pk'), due=Count('pk', filter=Q(run_at__lte=now)), oldest=Min('run_at'),
+    )
+    tasks = (
+        Job.objects.order_by().values('task').annotate(
+            queued=Count('pk', filter=Q(status='queued')),
+            running=Count('pk', filter=Q(status='running')),
+            succeeded=Count('pk', filter=Q(status='succeeded')),
+            failed=Count('pk', filter=Q(status='failed')),
+            retried=Count('pk', filter=Q(attempts__gt=1)),
+            avg_seconds=Avg('duration', filter=Q(status='succeeded')),
+            max_seconds=Max('duration', filter=Q(status='succeeded')),
+        ).order_by('task')
+    )
+    oldest = queued['oldest']
+    return {
+        'queued': queued['depth'],
+        'due': queued['due'],
+        'lag_seconds': round(max((now - oldest).total_seconds(), 0), 3) if oldest and queued['due'] else 0,
+        'tasks': [
+            {**row, 'avg_seconds': round(row['avg_seconds'] or 0, 4), 'max_seconds': round(row['max_seconds'] or 0, 4)}
+            for row in tasks
+        ],
+    }
@@ -0,0 +1,128 @@
+"""
+Shared helpers for the bench_* management commands.
+
+Benchmarks never touch the configured database: they run against a
+disposable, file-backed copy of the schema built the same way the Django
+test runner builds its test database.
+"""
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import connection, connections
+from django.utils import timezone
+
+
+@contextmanager
+def throwaway_database():
+    """Create a migrated scratch database for the duration of the block"""
+    tmpdir = tempfile.mkdtemp(prefix='sacco-bench-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    if connection.vendor == 'sqlite':
+        # A file (not :memory:) so that worker threads share one database
+        test_settings['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+@contextmanager
+def timed():
+    """Measure wall-clock time; the yielded dict gets 'seconds' on exit"""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
+
+
+def rate(count, seconds):
+    """Format a count/seconds pair as a per-second rate"""
+    return f"{count / seconds:,.0f}/s" if seconds else 'n/a'
+
+
+def create_members(count, start=1, balance=Decimal('0.00')):
+    """Bulk-create users, members and one savings account each; returns the accounts"""
+    from sacco_app import member_search, summaries
+    from sacco_app.models import User, Member, SavingsAccount
+
+    indexes = range(start, start + count)
+    today = timezone.now().date()
+    User.objects.bulk_create([
+        User(username=f'bench{i}', first_name='Bench', last_name=f'Member {i}', email=f'bench{i}@example.com')
+        for i in indexes
+    ], batch_size=500)
+    users = dict(User.objects.filter(username__in=[f'bench{i}' for i in indexes]).values_list('username', 'pk'))
+    Member.objects.bulk_create([
+        Member(user_id=users[f'bench{i}'], member_id=f'BENCH{i:08d}', membership_date=today)
+        for i in indexes
+    ], batch_size=500)
+    members = dict(Member.objects.filter(user_id__in=users.values()).values_list('member_id', 'pk'))
+    SavingsAccount.objects.bulk_create([
+        SavingsAccount(member_id=members[f'BENCH{i:08d}'], account_number=f'BSAV{i:010d}', balance=balance)
+        for i in indexes
+    ], batch_size=500)
+    # bulk_create sends no signals; give the members the summary rows and
+    # search documents they would have had
+    summaries.refresh(members.values())
+    member_search.update(members.values())
+    return list(SavingsAccount.objects.filter(member_id__in=members.values()).order_by('pk'))
+
+
+def create_member(index, balance=Decimal('0.00')):
+    """Create a single benchmark member; returns (member, account)"""
+    account = create_members(1, start=index, balance=balance)[0]
+    return account.member, account
+
+
+class _SmtpSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib to deliver messages; counts and discards them"""
+
+    def handle(self):
+        # Stands in for the TCP/TLS/greeting delay of a real server
+        time.sleep(self.server.handshake_seconds)
+        self.wfile.write(b'220 sink ESMTP\r\n')
+        self.server.connections += 1
+        for line in self.rfile:
+            command = line[:4].upper()
+            if command == b'DATA':
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                with self.server.lock:
+                    self.server.received += 1
+                self.wfile.write(b'250 OK\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+
+@contextmanager
+def smtp_sink(handshake_seconds=0.0):
+    """Run a local SMTP stand-in; yields the server (host, port, received, connections)"""
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SmtpSinkHandler)
+    server.daemon_threads = True
+    server.handshake_seconds = handshake_seconds
+    server.received = server.connections = 0
+    server.lock = threading.Lock()
+    server.host, server.port = server.server_address
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,64 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+
+from sacco_app import amortization
+from sacco_app.models import Loan, LoanSchedule
+from sacco_app.posting import CENT
+from ._bench import throwaway_database, timed, rate, create_members
+
+
+class Command(BaseCommand):
+    help = 'Measure vectorized amortization and schedule persistence for a large loan book'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=100000)
+        parser.add_argument('--members', type=int, default=5000)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(8)
+        count = options['loans']
+        with throwaway_database():
+            accounts = create_members(options['members'])
+            Loan.objects.bulk_create([
+                Loan(
+                    member_id=accounts[i % len(accounts)].member_id, loan_number=f'BLN{i:09d}',
+                    loan_type='personal', amount=Decimal(rng.randint(1000, 500000)),
+                    interest_rate=Decimal(rng.randint(0, 2400)) / 100, term_months=rng.choice([6, 12, 24, 36, 60]),
+                    interest_method=rng.choice(['reducing', 'flat']), monthly_payment=0, total_amount=0,
+                    remaining_balance=0, status='active', purpose='Benchmark',
+                )
+                for i in range(count)
+            ], batch_size=2000)
+
+            loans = list(Loan.objects.values_list('amount', 'interest_rate', 'term_months', 'interest_method'))
+            amount, interest_rate, term, method = zip(*loans)
+            with timed() as compute_time:
+                result = amortization.compute(
+                    [float(a) for a in amount], [float(r) for r in interest_rate], term, [m == 'flat' for m in method]
+                )
+            installments = int(result['mask'].sum())
+            self.stdout.write(
+                f'compute   {count} loans, {installments} installments in {compute_time["seconds"]:.2f}s '
+                f'({rate(count, compute_time["seconds"])})'
+            )
+
+            with timed() as persist_time:
+                done, rows = amortization.build_schedules(Loan.objects.all(), chunk_size=options['chunk_size'])
+            self.stdout.write(
+                f'reprice   {done} loans, {rows} installments in {persist_time["seconds"]:.2f}s '
+                f'({rate(done, persist_time["seconds"])}, {rate(rows, persist_time["seconds"])} rows)'
+            )
+
+            mismatched = [
+                row for row in LoanSchedule.objects.values('loan').annotate(
+                    installments=Count('pk'), principal=Sum('principal')
+                ).values_list('loan', 'installments', 'principal', 'loan__amount', 'loan__term_months')
+                if row[1] != row[4] or Decimal(str(row[2])).quantize(CENT) != row[3]
+            ]
+            if rows != installments or mismatched:
+                raise CommandError(f'{len(mismatched)} schedules do not repay their principal exactly')
+            self.stdout.write(self.style.SUCCESS('Every schedule repays its principal exactly'))
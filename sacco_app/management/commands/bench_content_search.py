@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from rest_framework.test import APIClient
+
+from sacco_app import content_search
+from sacco_app.models import User, News, FAQ, Download
+from ._bench import throwaway_database, timed
+from .bench_member_search import percentile
+
+
+WORDS = (
+    'loan savings dividend member share interest rate branch meeting policy deposit withdrawal account '
+    'application form report annual general agenda board election payment mobile statement emergency '
+    'development school fees asset finance guarantor repayment schedule penalty insurance welfare'
+).split()
+
+
+# Word frequencies fall off with rank, as in real text
+VOCABULARY = WORDS + [f'term{i}' for i in range(5000)]
+FREQUENCIES = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def text(rng, words):
+    return ' '.join(rng.choices(VOCABULARY, FREQUENCIES, k=words)).capitalize() + '.'
+
+
+class Command(BaseCommand):
+    help = 'Time the public content search index against icontains over news, FAQs and downloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=20000)
+        parser.add_argument('--faqs', type=int, default=2000)
+        parser.add_argument('--downloads', type=int, default=5000)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(19)
+        with throwaway_database():
+            author = User.objects.create(username='bench-author', role='admin')
+            News.objects.bulk_create([
+                News(title=text(rng, 6), content=text(rng, 300), author=author, is_published=rng.random() < 0.9)
+                for _ in range(options['news'])
+            ], batch_size=1000)
+            FAQ.objects.bulk_create([
+                FAQ(question=text(rng, 10), answer=text(rng, 60), category=rng.choice(WORDS))
+                for _ in range(options['faqs'])
+            ], batch_size=1000)
+            Download.objects.bulk_create([
+                Download(title=text(rng, 5), description=text(rng, 30), file=f'downloads/file{i}.pdf',
+                         uploaded_by=author)
+                for i in range(options['downloads'])
+            ], batch_size=1000)
+            with timed() as rebuilt:
+                report = content_search.rebuild()
+            self.stdout.write(f"rebuild    {sum(report['documents'].values())} documents in {rebuilt['seconds']:.2f}s")
+
+            queries = [' '.join(rng.choices(VOCABULARY[:1000], k=rng.randint(1, 3))) for _ in range(options['queries'])]
+            client = APIClient(HTTP_HOST='localhost')
+            samples = []
+            for query in queries:
+                started = time.perf_counter()
+                response = client.get('/api/public/search/', {'q': query, 'limit': 20})
+                samples.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.content
+            self.stdout.write(
+                f'index      {len(samples)} requests: p50 {percentile(samples, 0.5):.2f} ms, '
+                f'p99 {percentile(samples, 0.99):.2f} ms, mean {statistics.mean(samples):.2f} ms'
+            )
+
+            # What the viewsets' SearchFilter does, once per content type, unranked
+            scans = []
+            for query in queries[:50]:
+                started = time.perf_counter()
+                for queryset, fields in (
+                    (News.objects.filter(is_published=True), ('title', 'content')),
+                    (FAQ.objects.filter(is_active=True), ('question', 'answer')),
+                    (Download.objects.filter(is_active=True), ('title', 'description')),
+                ):
+                    for word in query.split():
+                        queryset = queryset.filter(Q(**{f'{fields[0]}__icontains': word}) |
+                                                   Q(**{f'{fields[1]}__icontains': word}))
+                    list(queryset.values_list('pk', flat=True)[:20])
+                scans.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'icontains  {len(scans)} queries: p50 {percentile(scans, 0.5):.2f} ms, '
+                f'p99 {percentile(scans, 0.99):.2f} ms (queries only)'
+            )
+
+            # Unpublishing must drop an item from the results as soon as it commits
+            news = News.objects.filter(is_published=True).first()
+            news.title = 'Quarterly xylophone recital'
+            news.save()
+            found = [row['id'] for row in content_search.search('xylophone', ['news'])]
+            news.is_published = False
+            news.save()
+            gone = content_search.search('xylophone', ['news'])
+            ok = found == [news.pk] and not gone
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f'Edited item found: {found}; after unpublishing: {gone}'))
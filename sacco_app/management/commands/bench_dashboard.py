@@ -0,0 +1,59 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sacco_app import dashboard
+from sacco_app.models import Loan, Transaction
+from sacco_app.querybudget import count_queries
+from ._bench import throwaway_database, timed, rate, create_members
+
+
+class Command(BaseCommand):
+    help = 'Compare computing the admin dashboard with serving it from the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=5000)
+        parser.add_argument('--transactions', type=int, default=100000)
+        parser.add_argument('--loads', type=int, default=1000, help='Dashboard loads to time per mode')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            accounts = create_members(options['members'], balance=Decimal('500.00'))
+            today = timezone.now().date()
+            Loan.objects.bulk_create([
+                Loan(
+                    member_id=account.member_id, loan_number=f'BLN{i:09d}', loan_type='personal',
+                    amount=Decimal('1000.00'), interest_rate=Decimal('12.00'), term_months=12,
+                    monthly_payment=Decimal('88.85'), total_amount=Decimal('1066.19'),
+                    remaining_balance=Decimal('1066.19'), status='active', purpose='Benchmark',
+                    disbursement_date=today - timedelta(days=i % 120),
+                )
+                for i, account in enumerate(accounts)
+            ], batch_size=1000)
+            Transaction.objects.bulk_create([
+                Transaction(
+                    member_id=accounts[i % len(accounts)].member_id, transaction_id=f'BTX{i:012d}',
+                    transaction_type='deposit' if i % 3 else 'withdrawal', amount=Decimal('25.00'),
+                    description='Benchmark', savings_account_id=accounts[i % len(accounts)].pk,
+                    balance_after=Decimal('500.00'),
+                )
+                for i in range(options['transactions'])
+            ], batch_size=2000)
+
+            loads = options['loads']
+            _, queries = count_queries(dashboard.compute)
+            with timed() as uncached:
+                for _ in range(max(loads // 100, 1)):
+                    dashboard.compute()
+            dashboard._cache().clear()
+            dashboard.get_stats()
+            _, cached_queries = count_queries(dashboard.get_stats)
+            with timed() as cached:
+                for _ in range(loads):
+                    dashboard.get_stats()
+
+            computed = max(loads // 100, 1)
+            self.stdout.write(f'compute   {queries} queries, {rate(computed, uncached["seconds"])} loads')
+            self.stdout.write(f'cached    {cached_queries} queries, {rate(loads, cached["seconds"])} loads')
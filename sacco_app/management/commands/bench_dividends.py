@@ -0,0 +1,52 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from sacco_app import dividends, summaries
+from sacco_app.models import Share, Dividend
+from ._bench import throwaway_database, rate, create_members
+
+
+class Command(BaseCommand):
+    help = 'Measure a dividend calculation run over members holding several share lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=200000)
+        parser.add_argument('--max-lots', type=int, default=3, help='Share lots per member, 1..max')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(9)
+        with throwaway_database():
+            accounts = create_members(options['members'])
+            Share.objects.bulk_create([
+                Share(member_id=account.member_id, share_number=f'BSHR{account.pk:08d}{lot}',
+                      quantity=rng.randint(1, 100), total_value=Decimal('100.00'), is_active=lot < 2 or bool(i % 2))
+                for i, account in enumerate(accounts)
+                for lot in range(rng.randint(1, options['max_lots']))
+            ], batch_size=2000)
+            summaries.refresh(account.member_id for account in accounts)
+            dividend = Dividend.objects.create(
+                year=2024, amount_per_share=Decimal('2.50'), total_amount=Decimal('0.00'),
+                declaration_date=date(2024, 12, 31),
+            )
+
+            first = dividends.calculate_payments(dividend, chunk_size=options['chunk_size'])
+            self.stdout.write(
+                f"first run  {first['created']} payments for {first['members']} members in {first['seconds']}s "
+                f"({rate(first['created'], first['seconds'])})"
+            )
+            again = dividends.calculate_payments(dividend, chunk_size=options['chunk_size'])
+            self.stdout.write(f"re-run     {again['created']} payments created in {again['seconds']}s")
+
+            expected = Share.objects.filter(is_active=True).aggregate(total=Sum('quantity'))['total']
+            paid_on = dividend.payments.aggregate(total=Sum('shares_owned'))['total']
+            if again['created'] or first['created'] != first['members'] or paid_on != expected:
+                raise CommandError(f'Expected {expected} shares across {first["members"]} payments, got {paid_on}')
+            drift = summaries.rebuild(fix=False)
+            if drift['missing'] or drift['drifted']:
+                raise CommandError(f'Member summaries drifted: {drift}')
+            self.stdout.write(self.style.SUCCESS('Every active share lot is paid exactly once'))
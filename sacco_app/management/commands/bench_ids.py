@@ -0,0 +1,65 @@
+import multiprocessing
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from sacco_app import ids
+from sacco_app.models import IdSequence
+from ._bench import throwaway_database, timed, rate
+
+
+def _allocate(count):
+    """Allocate ``count`` transaction IDs in this thread"""
+    try:
+        return [ids.next_id('transaction') for _ in range(count)]
+    finally:
+        connection.close()
+
+
+def _process_worker(args):
+    threads, count = args
+    results = [None] * threads
+
+    def run(slot):
+        results[slot] = _allocate(count)
+
+    workers = [threading.Thread(target=run, args=(slot,)) for slot in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return [value for chunk in results for value in chunk]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ID allocation from many worker processes and threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--threads', type=int, default=4, help='Threads per process')
+        parser.add_argument('--ids', type=int, default=5000, help='IDs per thread')
+
+    def handle(self, *args, **options):
+        processes, threads, count = options['processes'], options['threads'], options['ids']
+        expected = processes * threads * count
+
+        with throwaway_database():
+            ids.reset()
+            start_value = IdSequence.objects.get(name='transaction').next_value
+            connections.close_all()
+
+            context = multiprocessing.get_context('fork')
+            with timed() as elapsed:
+                with context.Pool(processes) as pool:
+                    allocated = [value for chunk in pool.map(_process_worker, [(threads, count)] * processes)
+                                 for value in chunk]
+
+            reserved = IdSequence.objects.get(name='transaction').next_value - start_value
+            self.stdout.write(f'workers={processes}x{threads} ids={len(allocated)} '
+                              f'time={elapsed["seconds"]:.2f}s rate={rate(len(allocated), elapsed["seconds"])}')
+            self.stdout.write(f'block_size={ids.block_size()} db_reservations={reserved // ids.block_size()} '
+                              f'ids_per_round_trip={len(allocated) / max(reserved // ids.block_size(), 1):.0f}')
+            if len(set(allocated)) != expected:
+                raise CommandError(f'{expected - len(set(allocated))} duplicate IDs allocated')
+            self.stdout.write(self.style.SUCCESS('All IDs unique'))
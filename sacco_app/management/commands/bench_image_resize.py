@@ -0,0 +1,111 @@
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from PIL import Image
+
+from sacco_app import image_resize, imaging
+from ._bench import timed
+from .bench_member_search import percentile
+
+
+SOURCE = 'gallery/bench.jpg'
+
+
+def photo(path, width, height):
+    """A noisy JPEG, about as hard to compress as a camera photo"""
+    noise = Image.effect_noise((width // 8, height // 8), 64).convert('RGB')
+    noise.resize((width, height), Image.BICUBIC).save(path, quality=92)
+
+
+class Command(BaseCommand):
+    help = 'Compare resizing on every request with the /media/resize/ disk cache, and check locking and eviction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='4000x3000', help='Source photo size')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent requests on a cold key')
+
+    def handle(self, *args, **options):
+        width, height = (int(value) for value in options['size'].split('x'))
+        with tempfile.TemporaryDirectory(prefix='sacco-media-') as media, \
+                tempfile.TemporaryDirectory(prefix='sacco-resized-') as cache_dir, \
+                override_settings(MEDIA_ROOT=media, IMAGE_RESIZE_CACHE_DIR=cache_dir, ALLOWED_HOSTS=['localhost'],
+                                  IMAGE_RESIZE_SIZES={(400, 300), (401, 300), (402, 300), (403, 300)}):
+            (Path(media) / 'gallery').mkdir()
+            photo(Path(media) / SOURCE, width, height)
+            client = Client(HTTP_HOST='localhost', HTTP_ACCEPT='image/webp,*/*')
+            url = f'/media/resize/400x300/{SOURCE}'
+
+            samples = []
+            for _ in range(10):
+                with timed() as uncached:
+                    imaging.fit(str(Path(media) / SOURCE), 400, 300, 'webp')
+                samples.append(uncached['seconds'] * 1000)
+            self.stdout.write(f'uncached   {len(samples)} resizes: p50 {percentile(samples, 0.5):.1f} ms')
+
+            # Cold key under concurrency: one request computes, the rest wait for it
+            barrier = threading.Barrier(options['threads'])
+            results = []
+
+            def fetch():
+                barrier.wait()
+                response = Client(HTTP_HOST='localhost', HTTP_ACCEPT='image/webp').get(url)
+                results.append((response.status_code, b''.join(response.streaming_content)))
+
+            threads = [threading.Thread(target=fetch) for _ in range(options['threads'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            misses = image_resize.stats()['misses']
+            ok = misses == 1 and {status for status, _ in results} == {200} and len({body for _, body in results}) == 1
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f'cold       {len(threads)} concurrent requests, {misses} resize'))
+
+            samples = []
+            for _ in range(options['requests']):
+                with timed() as cached:
+                    b''.join(client.get(url).streaming_content)
+                samples.append(cached['seconds'] * 1000)
+            self.stdout.write(
+                f'cached     {len(samples)} requests: p50 {percentile(samples, 0.5):.2f} ms, '
+                f'p99 {percentile(samples, 0.99):.2f} ms, mean {statistics.mean(samples):.2f} ms'
+            )
+            etag = client.get(url)['ETag']
+            status = client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+            self.stdout.write(f'conditional revalidation: {status}')
+
+            # A budget of about three results: the least recently used go first
+            size = sum(path.stat().st_size for path in Path(cache_dir).glob('??/*'))
+            with override_settings(IMAGE_RESIZE_CACHE_BYTES=int(size * 3.5)), \
+                    mock.patch.object(image_resize, 'TOUCH_SECONDS', 0):
+                boxes = ['401x300', '402x300']
+                for box in boxes:
+                    time.sleep(0.01)
+                    client.get(f'/media/resize/{box}/{SOURCE}')
+                # A hit makes the oldest result the most recently used
+                time.sleep(0.01)
+                client.get(url)
+                client.get(f'/media/resize/403x300/{SOURCE}')
+                before = image_resize.stats()
+                kept = client.get(url)
+                after = image_resize.stats()
+                first = client.get(f'/media/resize/{boxes[0]}/{SOURCE}')
+                refetched = image_resize.stats()
+            ok = (before['evictions'] > 0 and before['bytes'] <= size * 3.5 and kept.status_code == 200
+                  and after['misses'] == before['misses'] and refetched['misses'] == after['misses'] + 1
+                  and first.status_code == 200)
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(
+                f"evict      {before['evictions']} files evicted, {before['bytes']} of {int(size * 3.5)} bytes used; "
+                f"recently hit result kept, least recently used recomputed"
+            ))
+            final = image_resize.stats()
+            self.stdout.write(f"counters   {final['hits']} hits, {final['misses']} misses, hit rate {final['hit_rate']}")
@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from rest_framework.test import APIClient
+
+from sacco_app import member_search
+from sacco_app.models import User, Member
+from ._bench import throwaway_database, timed, create_members
+
+
+FIRST_NAMES = ['Jane', 'John', 'Mary', 'Peter', 'Grace', 'Joseph', 'Faith', 'David', 'Esther', 'Samuel']
+LAST_NAMES = ['Wanjiru', 'Otieno', 'Kamau', 'Achieng', 'Mwangi', 'Njeri', 'Kiprop', 'Wekesa', 'Atieno', 'Mutua']
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Time member autocomplete through the search index against icontains scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--scan-queries', type=int, default=50,
+                            help='Queries to time with icontains over users, members and accounts')
+
+    def handle(self, *args, **options):
+        rng = random.Random(18)
+        with throwaway_database():
+            accounts = create_members(options['members'])
+            users = list(User.objects.filter(username__startswith='bench').order_by('pk'))
+            for user in users:
+                user.first_name, user.last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                user.phone_number = f'07{rng.randint(10 ** 7, 10 ** 8 - 1)}'
+            User.objects.bulk_update(users, ['first_name', 'last_name', 'phone_number'], batch_size=2000)
+            with timed() as rebuilt:
+                report = member_search.rebuild()
+            self.stdout.write(f"rebuild    {report['members']} documents in {rebuilt['seconds']:.2f}s")
+
+            queries = []
+            for _ in range(options['queries']):
+                user, account = rng.choice(users), rng.choice(accounts)
+                queries.append(rng.choice([
+                    user.first_name[:rng.randint(2, 4)],
+                    f'{user.first_name} {user.last_name[:3]}',
+                    user.phone_number[:rng.randint(4, 7)],
+                    account.account_number[:rng.randint(6, 12)],
+                    f'BENCH{rng.randint(1, options["members"]):08d}'[:rng.randint(8, 13)],
+                ]))
+
+            admin = User.objects.create(username='bench-admin', role='admin')
+            client = APIClient(HTTP_HOST='localhost')
+            client.force_authenticate(admin)
+            samples = []
+            for query in queries:
+                started = time.perf_counter()
+                response = client.get('/api/members/search/', {'q': query, 'limit': 10})
+                samples.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.content
+            self.stdout.write(
+                f'index      {len(samples)} requests: p50 {percentile(samples, 0.5):.2f} ms, '
+                f'p99 {percentile(samples, 0.99):.2f} ms, mean {statistics.mean(samples):.2f} ms'
+            )
+
+            scans = []
+            for query in queries[:options['scan_queries']]:
+                members = Member.objects.all()
+                for word in member_search.terms(query):
+                    members = members.filter(
+                        Q(member_id__icontains=word) | Q(user__first_name__icontains=word)
+                        | Q(user__last_name__icontains=word) | Q(user__email__icontains=word)
+                        | Q(user__phone_number__icontains=word) | Q(savings_accounts__account_number__icontains=word)
+                    )
+                started = time.perf_counter()
+                list(members.distinct().values_list('pk', flat=True)[:10])
+                scans.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'icontains  {len(scans)} queries: p50 {percentile(scans, 0.5):.2f} ms, '
+                f'p99 {percentile(scans, 0.99):.2f} ms (query only)'
+            )
+
+            # A rename must be searchable as soon as its transaction commits
+            user = users[0]
+            user.first_name = 'Zebedee'
+            user.save()
+            found = [row['id'] for row in member_search.search('zebed')]
+            style = self.style.SUCCESS if found == [accounts[0].member_id] else self.style.ERROR
+            self.stdout.write(style(f'Renamed member found by new name: {found}'))
@@ -0,0 +1,75 @@
+import tempfile
+
+from django.core import mail
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from sacco_app import outbox
+from sacco_app.models import OutboundEmail
+from ._bench import throwaway_database, timed, rate, smtp_sink
+
+
+BACKENDS = {
+    'smtp': 'django.core.mail.backends.smtp.EmailBackend',
+    'locmem': 'django.core.mail.backends.locmem.EmailBackend',
+    'file': 'django.core.mail.backends.filebased.EmailBackend',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare one send_mail connection per message with the batched outbox flusher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--domains', type=int, default=4, help='Recipient domains to spread messages over')
+        parser.add_argument('--backend', choices=sorted(BACKENDS), default='smtp',
+                            help='smtp runs against a local SMTP stand-in')
+        parser.add_argument('--handshake-ms', type=float, default=20.0,
+                            help='Delay the SMTP stand-in adds to each new connection')
+        parser.add_argument('--baseline-messages', type=int, default=200,
+                            help='Messages to time with one send_mail call each')
+
+    def handle(self, *args, **options):
+        recipients = [f'member{i}@domain{i % options["domains"]}.example' for i in range(options['messages'])]
+        with throwaway_database(), smtp_sink(options['handshake_ms'] / 1000) as sink, \
+                tempfile.TemporaryDirectory(prefix='sacco-mail-') as mail_dir, override_settings(
+                    EMAIL_BACKEND=BACKENDS[options['backend']], EMAIL_HOST=sink.host, EMAIL_PORT=sink.port,
+                    EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='', EMAIL_FILE_PATH=mail_dir,
+                    EMAIL_RATE_LIMIT_PER_MINUTE=len(recipients) + 1, EMAIL_PROVIDER_RATE_LIMITS={},
+                ):
+            mail.outbox = []
+            baseline = recipients[:options['baseline_messages']]
+            with timed() as direct:
+                for address in baseline:
+                    send_mail('Benchmark', 'Benchmark message', None, [address])
+            direct_connections = sink.connections
+
+            for address in recipients:
+                outbox.send('Benchmark', 'Benchmark message', [address])
+            with timed() as flushed:
+                report = outbox.flush_due()
+            sent = OutboundEmail.objects.filter(status='sent').count()
+
+            self.stdout.write(
+                f'send_mail  {len(baseline)} messages, {rate(len(baseline), direct["seconds"])}'
+                + (f', {direct_connections} SMTP connections' if options['backend'] == 'smtp' else '')
+            )
+            self.stdout.write(
+                f'outbox     {report["sent"]} messages, {rate(report["sent"], flushed["seconds"])}'
+                + (f', {sink.connections - direct_connections} SMTP connections'
+                   if options['backend'] == 'smtp' else '')
+            )
+            if sent != len(recipients) or report['failed']:
+                self.stdout.write(self.style.ERROR(f'{sent} of {len(recipients)} marked sent'))
+
+            # A domain over its limit keeps the excess pending for the next window
+            domain = 'limited.example'
+            with override_settings(EMAIL_PROVIDER_RATE_LIMITS={domain: 10}):
+                outbox.send('Benchmark', 'Benchmark message', [f'member{i}@{domain}' for i in range(50)])
+                limited = outbox.flush()
+            ok = limited['sent'] == 10 and limited['deferred'] == 40
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(
+                f"rate limit {domain}=10/min: {limited['sent']} sent, {limited['deferred']} deferred"
+            ))
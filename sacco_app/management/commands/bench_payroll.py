@@ -0,0 +1,47 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from sacco_app import posting, summaries
+from sacco_app.models import SavingsAccount, Transaction
+from ._bench import throwaway_database, timed, rate, create_members
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk payroll posting against a scratch database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=50000)
+        parser.add_argument('--accounts', type=int, default=5000)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            accounts = create_members(options['accounts'])
+            rng = random.Random(42)
+            lines = [
+                {
+                    'account_number': rng.choice(accounts).account_number,
+                    'amount': f'{rng.randint(100, 50000) / 100:.2f}',
+                    'reference': f'PAY{n:07d}',
+                }
+                for n in range(options['lines'])
+            ]
+            expected = sum(Decimal(line['amount']) for line in lines)
+
+            with timed() as elapsed:
+                report = posting.bulk_deposit(lines, chunk_size=options['chunk_size'])
+
+            # SQLite sums DECIMAL columns as floats; compare to the cent
+            balances = SavingsAccount.objects.aggregate(total=Sum('balance'))['total'].quantize(posting.CENT)
+            ledger = Transaction.objects.aggregate(total=Sum('amount'))['total'].quantize(posting.CENT)
+            self.stdout.write(f"lines={report['total_lines']} posted={report['posted']} "
+                              f"time={elapsed['seconds']:.2f}s throughput={rate(report['posted'], elapsed['seconds'])}")
+            if report['posted'] != len(lines) or balances != expected or ledger != expected:
+                raise CommandError(f'Totals mismatch: expected={expected} balances={balances} ledger={ledger}')
+            drift = summaries.rebuild(fix=False)
+            if drift['missing'] or drift['drifted']:
+                raise CommandError(f'Member summaries drifted from the ledger: {drift}')
+            self.stdout.write(self.style.SUCCESS(f'Balances, ledger and member summaries agree ({expected})'))
@@ -0,0 +1,70 @@
+import threading
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from sacco_app import posting, summaries
+from sacco_app.models import SavingsAccount, Transaction
+from ._bench import throwaway_database, timed, rate, create_member
+
+
+class Command(BaseCommand):
+    help = 'Hammer one savings account from many threads and verify no updates are lost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--posts', type=int, default=250, help='Deposits per thread')
+        parser.add_argument('--amount', default='1.25')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        posts = options['posts']
+        amount = Decimal(options['amount'])
+        expected_count = threads * posts
+
+        with throwaway_database():
+            _, account = create_member(1)
+            errors = []
+
+            def worker():
+                try:
+                    for _ in range(posts):
+                        posting.deposit(account, amount)
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    connection.close()
+
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            with timed() as elapsed:
+                for t in workers:
+                    t.start()
+                for t in workers:
+                    t.join()
+
+            if errors:
+                raise CommandError(f'{len(errors)} worker(s) failed: {errors[0]!r}')
+
+            balance = SavingsAccount.objects.get(pk=account.pk).balance
+            ledger = Transaction.objects.filter(savings_account=account)
+            count = ledger.count()
+            # SQLite sums DECIMAL columns as floats; compare to the cent
+            ledger_total = ledger.aggregate(total=Sum('amount'))['total'].quantize(posting.CENT)
+            distinct_after = ledger.values('balance_after').distinct().count()
+
+            self.stdout.write(f'threads={threads} posts={expected_count} '
+                              f'time={elapsed["seconds"]:.2f}s throughput={rate(count, elapsed["seconds"])}')
+            self.stdout.write(f'balance={balance} expected={amount * expected_count} '
+                              f'ledger_rows={count} ledger_total={ledger_total}')
+
+            # Every post must land exactly once and observe its own distinct
+            # running balance; anything else means two posts interleaved
+            if (balance != amount * expected_count or count != expected_count
+                    or ledger_total != balance or distinct_after != expected_count):
+                raise CommandError('Lost or duplicated updates detected')
+            drift = summaries.rebuild(fix=False)
+            if drift['missing'] or drift['drifted']:
+                raise CommandError(f'Member summary drifted from the ledger: {drift}')
+            self.stdout.write(self.style.SUCCESS('No lost updates; member summary matches the ledger'))
@@ -0,0 +1,128 @@
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from sacco_app import public_cache
+from sacco_app.models import User, News
+from sacco_app.serializers import NewsSerializer
+from ._bench import throwaway_database, timed, rate
+
+
+URL = '/api/public/news/'
+to_representation = NewsSerializer.to_representation
+
+
+class Command(BaseCommand):
+    help = 'Compare full, cached and 304 responses of /api/public/news/ and check that misses rebuild once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=500)
+        parser.add_argument('--content-bytes', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent requests on a cold cache')
+        parser.add_argument('--backend', choices=['locmem', 'file', 'db'], default='locmem')
+
+    def handle(self, *args, **options):
+        with throwaway_database(), tempfile.TemporaryDirectory(prefix='sacco-cache-') as cache_dir, \
+                override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                                          'dashboard': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                                          'public': self.cache_settings(options['backend'], cache_dir)}):
+            if options['backend'] == 'db':
+                call_command('createcachetable', verbosity=0)
+            author = User.objects.create(username='bench-author', first_name='Bench', last_name='Author')
+            News.objects.bulk_create([
+                News(title=f'News {i}', content='Lorem ipsum ' * (options['content_bytes'] // 12),
+                     author=author, is_published=True)
+                for i in range(options['news'])
+            ], batch_size=500)
+            client = APIClient(HTTP_HOST='localhost')
+            rows = mock.patch.object(NewsSerializer, 'to_representation', autospec=True,
+                                     side_effect=to_representation)
+            count = options['requests']
+
+            with rows as serialized, timed() as full:
+                # A distinct query string per request misses the cache every time
+                for i in range(count):
+                    client.get(URL, {'n': i})
+            full_rows = serialized.call_count
+            self.stdout.write(f"full       {count} requests, {rate(count, full['seconds'])}, "
+                              f"{full_rows // count} rows serialized each")
+
+            client.get(URL)
+            with rows as serialized, CaptureQueriesContext(connection) as queries, timed() as cached:
+                for _ in range(count):
+                    client.get(URL)
+            self.stdout.write(f"cached     {count} requests, {rate(count, cached['seconds'])}, "
+                              f"{serialized.call_count} rows serialized, {len(queries) // count} queries each")
+
+            etag = client.get(URL)['ETag']
+            with rows as serialized, CaptureQueriesContext(connection) as queries, timed() as conditional:
+                statuses = {client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code for _ in range(count)}
+            ok = statuses == {304} and serialized.call_count == 0
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(
+                f"304        {count} requests, {rate(count, conditional['seconds'])}, statuses {sorted(statuses)}, "
+                f"{serialized.call_count} rows serialized, {len(queries) // count} queries each"
+            ))
+
+            # Cold cache under concurrency: one request rebuilds, the rest wait for it
+            News.objects.filter(pk=News.objects.order_by('pk').first().pk).update(title='Edited')
+            public_cache.invalidate('news')
+            barrier = threading.Barrier(options['threads'])
+            results = []
+
+            def fetch():
+                barrier.wait()
+                try:
+                    results.append(APIClient(HTTP_HOST='localhost').get(URL).status_code)
+                finally:
+                    connection.close()
+
+            with rows as serialized:
+                threads = [threading.Thread(target=fetch) for _ in range(options['threads'])]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            builds = serialized.call_count / options['news']
+            style = self.style.SUCCESS if builds == 1 and results.count(200) == len(threads) else self.style.ERROR
+            self.stdout.write(style(f"cold       {len(threads)} concurrent requests, {builds:g} rebuilds"))
+
+            # While a slow rebuild is in progress, other requests get the previous body
+            stale_etag = client.get(URL)['ETag']
+            News.objects.create(title='Breaking', content='News', author=author, is_published=True)
+
+            def slow_row(serializer, instance):
+                time.sleep(0.001)
+                return to_representation(serializer, instance)
+
+            with mock.patch.object(NewsSerializer, 'to_representation', autospec=True, side_effect=slow_row):
+                rebuild = threading.Thread(target=fetch)
+                barrier = threading.Barrier(2)
+                rebuild.start()
+                barrier.wait()
+                time.sleep(0.05)
+                with timed() as waited:
+                    stale = client.get(URL)
+                rebuild.join()
+            fresh = client.get(URL)
+            ok = stale['ETag'] == stale_etag and fresh['ETag'] != stale_etag and b'Breaking' in fresh.content
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(
+                f"stale      previous body served in {waited['seconds'] * 1000:.1f} ms during a rebuild, "
+                f"new body once it finished"
+            ))
+
+    def cache_settings(self, backend, cache_dir):
+        return {
+            'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-public'},
+            'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir},
+            'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'bench_public_cache'},
+        }[backend]
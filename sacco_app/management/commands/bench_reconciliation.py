@@ -0,0 +1,104 @@
+import csv
+import io
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from sacco_app import reconciliation
+from sacco_app.models import Transaction
+from ._bench import throwaway_database, timed, rate, create_members
+
+
+class Command(BaseCommand):
+    help = 'Reconcile a generated statement against a generated ledger and check the outcome counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=100000, help='Statement lines')
+        parser.add_argument('--transactions', type=int, default=300000, help='Ledger rows (at least --lines)')
+        parser.add_argument('--days', type=int, default=90, help='Days the ledger is spread over')
+        parser.add_argument('--members', type=int, default=2000)
+        parser.add_argument('--naive-lines', type=int, default=2000,
+                            help='Lines to time with one indexed query per line, for comparison')
+
+    def handle(self, *args, **options):
+        rng = random.Random(17)
+        total = max(options['transactions'], options['lines'])
+        with throwaway_database():
+            accounts = create_members(options['members'])
+            amounts = [Decimal(rng.randint(100, 10 ** 6)) / 100 for _ in range(total)]
+            Transaction.objects.bulk_create([
+                Transaction(
+                    member_id=accounts[i % len(accounts)].member_id, transaction_id=f'BTX{i:012d}',
+                    transaction_type='deposit', amount=amounts[i], description='Benchmark',
+                    reference_number=f'MP{i:010d}', balance_after=Decimal('0.00'),
+                )
+                for i in range(total)
+            ], batch_size=2000)
+            # auto_now_add stamped every row with now; spread them over the period
+            now = timezone.now()
+            stamps = [now - timedelta(seconds=rng.randint(3600, options['days'] * 86400)) for _ in range(total)]
+            created_at = Transaction._meta.get_field('created_at')
+            quote = connection.ops.quote_name
+            pks = list(Transaction.objects.order_by('pk').values_list('pk', flat=True))
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {quote(Transaction._meta.db_table)} SET {quote(created_at.column)} = %s "
+                    f"WHERE {quote(Transaction._meta.pk.column)} = %s",
+                    [(created_at.get_db_prep_value(stamp, connection), pk) for stamp, pk in zip(stamps, pks)],
+                )
+
+            # Statement: mostly real transactions (some dated a day off), plus
+            # wrong amounts, unknown references and unparseable rows
+            expected = {'matched': 0, 'unmatched': 0, 'invalid': 0}
+            rows = []
+            for i in rng.sample(range(total), options['lines']):
+                day = timezone.localdate(stamps[i]) + timedelta(days=rng.choice((0, 0, 0, 1, -1)))
+                kind = rng.random()
+                if kind < 0.03:
+                    rows.append((day, f'MP{i:010d}', amounts[i] + 1))
+                    expected['unmatched'] += 1
+                elif kind < 0.06:
+                    rows.append((day, f'XX{i:010d}', amounts[i]))
+                    expected['unmatched'] += 1
+                elif kind < 0.07:
+                    rows.append(('not a date', f'MP{i:010d}', amounts[i]))
+                    expected['invalid'] += 1
+                else:
+                    rows.append((day, f'MP{i:010d}', amounts[i]))
+                    expected['matched'] += 1
+            statement = io.StringIO()
+            writer = csv.writer(statement)
+            writer.writerow(['Date', 'Reference', 'Amount', 'Description'])
+            writer.writerows((day, reference, f'{amount:,.2f}', 'Statement line') for day, reference, amount in rows)
+            data = statement.getvalue().encode()
+
+            with timed() as elapsed:
+                run = reconciliation.reconcile(io.BytesIO(data), name='benchmark.csv')
+            self.stdout.write(
+                f"hash join  {run.total_lines} lines in {elapsed['seconds']:.2f}s "
+                f"({rate(run.total_lines, elapsed['seconds'])}): {run.matched} matched, {run.unmatched} unmatched, "
+                f"{run.ambiguous} ambiguous, {run.invalid} invalid"
+            )
+
+            sample = rows[:options['naive_lines']]
+            with timed() as naive:
+                for day, reference, amount in sample:
+                    list(Transaction.objects.filter(reference_number=reference, amount=amount).values_list('pk'))
+            self.stdout.write(
+                f"per line   {len(sample)} indexed lookups in {naive['seconds']:.2f}s "
+                f"({rate(len(sample), naive['seconds'])}), lookups only, nothing stored"
+            )
+
+            actual = {'matched': run.matched, 'unmatched': run.unmatched, 'invalid': run.invalid}
+            if actual == expected and not run.ambiguous:
+                self.stdout.write(self.style.SUCCESS('Outcome counts match the generated statement'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Expected {expected}, got {actual}, {run.ambiguous} ambiguous'))
+
+            rerun = reconciliation.reconcile(io.BytesIO(data), name='benchmark-again.csv')
+            style = self.style.SUCCESS if rerun.matched == 0 else self.style.ERROR
+            self.stdout.write(style(f'Re-running the same statement matched {rerun.matched} lines'))
@@ -0,0 +1,86 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from sacco_app.models import SavingsAccount, Loan, Transaction, Dividend, DividendPayment
+from sacco_app.serializers import (
+    SavingsAccountSerializer, LoanSerializer, TransactionSerializer, DividendPaymentSerializer
+)
+from sacco_app.serializers_fast import FastReadSerializer
+from ._bench import throwaway_database, timed, rate, create_members
+
+
+def seed(rows, members):
+    rng = random.Random(7)
+    accounts = create_members(members)
+    dividend = Dividend.objects.create(
+        year=2024, amount_per_share=Decimal('2.50'), total_amount=Decimal('1000.00'), declaration_date=date(2024, 12, 31)
+    )
+    Loan.objects.bulk_create([
+        Loan(
+            member_id=account.member_id, loan_number=f'BLN{i:09d}', loan_type='personal',
+            amount=Decimal('5000.00'), interest_rate=Decimal('12.50'), term_months=24,
+            monthly_payment=Decimal('236.54'), total_amount=Decimal('5676.96'),
+            remaining_balance=Decimal('5676.96'), status='active', purpose='Benchmark',
+            due_date=date(2026, 1, 1) + timedelta(days=i % 365),
+        )
+        for i, account in enumerate(accounts)
+    ])
+    Transaction.objects.bulk_create([
+        Transaction(
+            member_id=accounts[i % members].member_id, transaction_id=f'BTX{i:012d}', transaction_type='deposit',
+            amount=Decimal(rng.randint(1, 10 ** 6)) / 100, description=f'Benchmark deposit {i}',
+            reference_number=f'REF{i}' if i % 3 else None, savings_account_id=accounts[i % members].pk,
+            balance_after=Decimal(rng.randint(1, 10 ** 8)) / 100,
+        )
+        for i in range(rows)
+    ], batch_size=1000)
+    DividendPayment.objects.bulk_create([
+        DividendPayment(dividend=dividend, member_id=account.member_id, shares_owned=i % 50 + 1,
+                        amount=Decimal(i % 50 + 1) * dividend.amount_per_share, is_paid=bool(i % 2))
+        for i, account in enumerate(accounts)
+    ])
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF and fast read serializers for identical output and rows per second'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Transactions to render')
+        parser.add_argument('--members', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        cases = [
+            (Transaction, TransactionSerializer),
+            (SavingsAccount, SavingsAccountSerializer),
+            (Loan, LoanSerializer),
+            (DividendPayment, DividendPaymentSerializer),
+        ]
+        with throwaway_database():
+            seed(options['rows'], options['members'])
+            for model, serializer_class in cases:
+                queryset = model.objects.select_related(*self.related(model)).order_by('pk')
+                fast = FastReadSerializer(serializer_class)
+
+                with timed() as slow_time:
+                    expected = renderer.render(serializer_class(list(queryset), many=True).data)
+                with timed() as fast_time:
+                    actual = renderer.render(fast.render(fast.values(queryset)))
+
+                count = queryset.count()
+                self.stdout.write(
+                    f'{serializer_class.__name__:<28} rows={count:<6} '
+                    f'drf={rate(count, slow_time["seconds"]):>10} fast={rate(count, fast_time["seconds"]):>10} '
+                    f'speedup={slow_time["seconds"] / fast_time["seconds"]:.1f}x'
+                )
+                if actual != expected:
+                    raise CommandError(f'{serializer_class.__name__}: fast output differs from DRF output')
+            self.stdout.write(self.style.SUCCESS('Fast serializers produce byte-identical JSON'))
+
+    @staticmethod
+    def related(model):
+        return ['member__user', 'dividend'] if model is DividendPayment else ['member__user']
@@ -0,0 +1,87 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from sacco_app import posting, rollups
+from sacco_app.models import Transaction, TransactionDailyRollup
+from ._bench import throwaway_database, timed, create_members
+
+
+class Command(BaseCommand):
+    help = 'Compare year-long time series from the daily rollup with GROUP BY over the ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=200000)
+        parser.add_argument('--members', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=365)
+
+    def handle(self, *args, **options):
+        rng = random.Random(13)
+        types = ['deposit', 'withdrawal', 'loan_disbursement', 'loan_payment']
+        with throwaway_database():
+            accounts = create_members(options['members'])
+            Transaction.objects.bulk_create([
+                Transaction(
+                    member_id=accounts[i % len(accounts)].member_id, transaction_id=f'BTX{i:012d}',
+                    transaction_type=rng.choice(types), amount=Decimal(rng.randint(100, 10 ** 6)) / 100,
+                    description='Benchmark', balance_after=Decimal('0.00'),
+                )
+                for i in range(options['transactions'])
+            ], batch_size=2000)
+            # auto_now_add stamped every row with now; spread them over the period
+            now = timezone.now()
+            created_at = Transaction._meta.get_field('created_at')
+            quote = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {quote(Transaction._meta.db_table)} SET {quote(created_at.column)} = %s "
+                    f"WHERE {quote(Transaction._meta.pk.column)} = %s",
+                    [
+                        (created_at.get_db_prep_value(now - timedelta(seconds=rng.randint(0, options['days'] * 86400)),
+                                                      connection), pk)
+                        for pk in Transaction.objects.values_list('pk', flat=True)
+                    ],
+                )
+
+            with timed() as rebuild_time:
+                rows = rollups.rebuild()
+            self.stdout.write(f"rebuild   {rows} rollup rows from {options['transactions']} transactions "
+                              f"in {rebuild_time['seconds']:.2f}s")
+
+            # Postings through the engine must land in the rollup incrementally
+            for account in accounts[:50]:
+                posting.deposit(account, '12.34')
+            incremental = dict(TransactionDailyRollup.objects.values_list('transaction_type', 'count').filter(
+                date=timezone.localdate(), transaction_type='deposit'))
+
+            date_to = timezone.localdate()
+            date_from = date_to - timedelta(days=options['days'])
+            with timed() as rollup_time:
+                series = rollups.series('all', 'month', date_from, date_to)
+            with timed() as ledger_time:
+                ledger = {
+                    row['month'].date(): row
+                    for row in Transaction.objects.filter(created_at__date__gte=date_from)
+                    .annotate(month=TruncMonth('created_at')).order_by()
+                    .values('month').annotate(count=Count('pk'), amount=Sum('amount'))
+                }
+            self.stdout.write(f"series    rollup {rollup_time['seconds'] * 1000:.1f}ms, "
+                              f"ledger GROUP BY {ledger_time['seconds'] * 1000:.1f}ms")
+
+            rollups.rebuild(date_to, date_to)
+            rebuilt = dict(TransactionDailyRollup.objects.values_list('transaction_type', 'count').filter(
+                date=date_to, transaction_type='deposit'))
+            mismatched = [
+                point['period'] for point in series
+                if point['count'] != ledger.get(date.fromisoformat(point['period']), {}).get('count', 0)
+            ]
+            if mismatched or incremental != rebuilt:
+                raise CommandError(f'Rollup disagrees with the ledger: periods={mismatched} '
+                                   f'incremental={incremental} rebuilt={rebuilt}')
+            self.stdout.write(self.style.SUCCESS('Rollup series match the ledger'))
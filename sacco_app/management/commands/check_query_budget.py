@@ -0,0 +1,125 @@
+import warnings
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import UnorderedObjectListWarning
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from sacco_app.models import (
+    User, Loan, Transaction, Share, Dividend, DividendPayment, News, FAQ,
+    Download, Gallery, ContactInfo, CustomerFeedback, SystemSetting, Reconciliation, ReconciliationLine
+)
+from sacco_app.querybudget import count_queries
+from sacco_app.urls import router, urlpatterns
+from ._bench import throwaway_database, create_members
+
+
+def seed(start, count):
+    """Create ``count`` rows of every model, each tied to a different member/user"""
+    dividend = Dividend.objects.first() or Dividend.objects.create(
+        year=2024, amount_per_share=Decimal('2.50'), total_amount=Decimal('1000.00'), declaration_date=date(2024, 12, 31)
+    )
+    for account in create_members(count, start=start):
+        member, user = account.member, account.member.user
+        i = int(account.member.member_id[5:])
+        loan = Loan.objects.create(
+            member=member, loan_type='personal', amount=1000, interest_rate=12, term_months=12,
+            monthly_payment=90, total_amount=1080, remaining_balance=1080, purpose='Budget check',
+        )
+        entry = Transaction.objects.create(
+            member=member, transaction_type='deposit', amount=10, description='Budget check',
+            savings_account=account, loan=loan, balance_after=10, reference_number=f'REF{i}',
+        )
+        run = Reconciliation.objects.create(name=f'statement{i}.csv', total_lines=1, matched=1, created_by=user)
+        ReconciliationLine.objects.create(
+            reconciliation=run, line_number=1, reference=f'REF{i}', amount=10, status='matched', transaction=entry,
+        )
+        Share.objects.create(member=member, quantity=5, total_value=500)
+        DividendPayment.objects.create(dividend=dividend, member=member, shares_owned=5, amount=Decimal('12.50'))
+        News.objects.create(title=f'News {i}', content='Body', author=user, is_published=True)
+        Download.objects.create(title=f'Download {i}', file=f'downloads/file{i}.pdf', uploaded_by=user)
+        Gallery.objects.create(title=f'Image {i}', image=f'gallery/image{i}.png', uploaded_by=user)
+        CustomerFeedback.objects.create(
+            name=f'Customer {i}', email=f'c{i}@example.com', subject='Hi', message='Hello', responded_by=user,
+        )
+        FAQ.objects.create(question=f'Question {i}?', answer='Answer')
+        ContactInfo.objects.create(name=f'Office {i}', phone='0100', email=f'o{i}@example.com', address='Addr')
+        SystemSetting.objects.create(key=f'setting.{i}', value='1')
+
+
+def endpoints():
+    """Every list and detail GET endpoint the API exposes"""
+    urls = []
+    for prefix, viewset, basename in router.registry:
+        if not hasattr(viewset, 'list'):
+            continue
+        urls.append((f'{prefix} list', f'/api/{prefix}/'))
+        model = viewset.queryset.model
+        urls.append((f'{prefix} detail', lambda prefix=prefix, model=model: f'/api/{prefix}/{model.objects.order_by("pk").last().pk}/'))
+    member_url = lambda action: lambda: f'/api/members/{User.objects.order_by("pk").last().member_profile.pk}/{action}/'
+    for action in ('accounts', 'loans', 'transactions'):
+        urls.append((f'members {action}', member_url(action)))
+    urls.append(('members search', '/api/members/search/?q=bench'))
+    urls.append(('public search', '/api/public/search/?q=news'))
+    urls.append(('public news summary page', '/api/public/news/?summary=true&limit=5'))
+    urls.append(('public gallery fields page', '/api/public/gallery/?fields=id,title,image_url&limit=5'))
+    urls.append((
+        'reconciliations lines',
+        lambda: f'/api/reconciliations/{Reconciliation.objects.order_by("pk").last().pk}/lines/',
+    ))
+    for pattern in urlpatterns:
+        name = getattr(pattern, 'name', None) or ''
+        if name.startswith('public-') or name == 'dashboard':
+            urls.append((name, reverse(name)))
+    return urls
+
+
+class Command(BaseCommand):
+    help = 'Fail when any list or detail endpoint issues more queries as its result set grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=2, help='Rows per model in the first pass')
+        parser.add_argument('--large', type=int, default=20, help='Rows per model in the second pass')
+        parser.add_argument('--budget', type=int, default=12, help='Maximum queries for any endpoint')
+
+    def handle(self, *args, **options):
+        warnings.simplefilter('ignore', UnorderedObjectListWarning)
+        with throwaway_database():
+            admin = User.objects.create(username='budget-admin', role='admin')
+            client = APIClient(HTTP_HOST='localhost')
+            client.force_authenticate(admin)
+
+            def measure():
+                counts = {}
+                for label, url in endpoints():
+                    url = url() if callable(url) else url
+                    response, queries = count_queries(client.get, url)
+                    if response.status_code != 200:
+                        raise CommandError(f'{label}: GET {url} returned {response.status_code}')
+                    counts[label] = queries
+                return counts
+
+            seed(1, options['small'])
+            small = measure()
+            seed(1 + options['small'], options['large'] - options['small'])
+            large = measure()
+
+            failures = []
+            for label, queries in large.items():
+                problems = []
+                if queries > small[label]:
+                    problems.append(f'grew from {small[label]}')
+                if queries > options['budget']:
+                    problems.append(f"over budget of {options['budget']}")
+                line = f'{label:<28} {queries:>3} queries'
+                if problems:
+                    failures.append(f"{label}: {queries} queries ({', '.join(problems)})")
+                    self.stdout.write(self.style.ERROR(f"{line}  {', '.join(problems)}"))
+                else:
+                    self.stdout.write(line)
+
+            if failures:
+                raise CommandError('Query budget exceeded:\n' + '\n'.join(failures))
+            self.stdout.write(self.style.SUCCESS(f'{len(large)} endpoints within budget'))
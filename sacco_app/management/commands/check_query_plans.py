@@ -0,0 +1,96 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from sacco_app.pagination import KeysetPagination
+from sacco_app.models import (
+    Transaction, TransactionDailyRollup, Loan, SavingsAccount, Share, DividendPayment, CustomerFeedback,
+    ReconciliationLine
+)
+from ._bench import throwaway_database
+
+
+CURSOR_AT = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def keyset(queryset):
+    """The continuation query KeysetPagination issues for page two onwards"""
+    return KeysetPagination.seek(queryset, CURSOR_AT, 1000)
+
+
+def hot_queries():
+    """The filters and orderings the viewsets actually issue"""
+    return {
+        'transactions by member (statement)': Transaction.objects.filter(member=1).order_by('-created_at', '-id')[:20],
+        'transactions by member (keyset page)': keyset(Transaction.objects.filter(member=1))[:20],
+        'transactions by type': Transaction.objects.filter(transaction_type='deposit').order_by('-created_at')[:20],
+        'transactions by type and date range': Transaction.objects.filter(
+            transaction_type='deposit', created_at__gte=CURSOR_AT, created_at__lt=datetime(2024, 2, 1, tzinfo=dt_timezone.utc)
+        ),
+        'transaction ledger (keyset page)': keyset(Transaction.objects.all())[:20],
+        'transactions by reference': Transaction.objects.filter(reference_number='MP0000001234'),
+        'statement ledger slice': Transaction.objects.filter(
+            created_at__gte=CURSOR_AT, created_at__lt=datetime(2024, 2, 1, tzinfo=dt_timezone.utc),
+            reference_number__isnull=False,
+        ).exclude(reference_number=''),
+        'reconciliation lines by status': ReconciliationLine.objects.filter(
+            reconciliation=1, status='unmatched'
+        ).order_by('line_number')[:20],
+        'reconciliation lines': ReconciliationLine.objects.filter(reconciliation=1).order_by('line_number')[:20],
+        'daily rollup date range': TransactionDailyRollup.objects.filter(
+            date__gte=CURSOR_AT.date(), date__lte=datetime(2024, 12, 31).date(), transaction_type='deposit'
+        ),
+        'loans by status due soonest': Loan.objects.filter(status='active').order_by('due_date')[:20],
+        'overdue loans': Loan.objects.filter(status='active', due_date__lt=CURSOR_AT.date()),
+        'loans by type and status': Loan.objects.filter(loan_type='personal', status='pending'),
+        'savings by type and state': SavingsAccount.objects.filter(account_type='regular', is_active=True),
+        'active shares of member': Share.objects.filter(is_active=True, member=1),
+        'active shares': Share.objects.filter(is_active=True).order_by('member'),
+        'dividend payment of member': DividendPayment.objects.filter(dividend=1, member=1),
+        'dividend payments (keyset page)': keyset(DividendPayment.objects.all())[:20],
+        'unpaid dividend payments (payout chunk)': DividendPayment.objects.filter(
+            dividend=1, is_paid=False, pk__gt=1000
+        ).order_by('pk')[:1000],
+        'feedback by status (keyset page)': keyset(CustomerFeedback.objects.filter(status='new'))[:20],
+        'feedback (keyset page)': keyset(CustomerFeedback.objects.all())[:20],
+    }
+
+
+# "SCAN <table>" without "USING ... INDEX" is a full table scan; a temporary
+# b-tree means rows are sorted after being fetched rather than read in order.
+# Keyset pages must also SEARCH (seek into) an index, not scan it from the top
+FULL_SCAN = re.compile(r'\bSCAN (?!.*\bUSING\b.*\bINDEX\b)(\S+)')
+SORT_STEP = re.compile(r'USE TEMP B-TREE FOR ORDER BY')
+SEEK = re.compile(r'\bSEARCH \S+ USING (COVERING )?INDEX')
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot financial queries on SQLite and fail on full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            if connection.vendor != 'sqlite':
+                raise CommandError('Query plan checks are written against SQLite EXPLAIN QUERY PLAN output')
+
+            failures = []
+            for name, queryset in hot_queries().items():
+                plan = queryset.explain()
+                problems = [m.group(0) for m in FULL_SCAN.finditer(plan)]
+                if queryset.query.order_by and SORT_STEP.search(plan):
+                    problems.append('sorts in a temp b-tree')
+                if 'keyset' in name and not SEEK.search(plan):
+                    problems.append('does not seek into an index')
+                if options['verbose_plans'] or problems:
+                    self.stdout.write(f'{name}:\n  ' + plan.replace('\n', '\n  '))
+                if problems:
+                    failures.append(f"{name}: {', '.join(problems)}")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok    {name}'))
+
+            if failures:
+                raise CommandError('Query plan regressions:\n' + '\n'.join(failures))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from sacco_app import public_cache, snapshots, storage
+
+
+class Command(BaseCommand):
+    help = 'Move existing downloads, gallery and news images into the content-addressed store, one copy per content'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be reclaimed without moving files')
+
+    def handle(self, *args, **options):
+        report = storage.dedupe_existing(dry_run=options['dry_run'])
+        for name in report['missing']:
+            self.stderr.write(f'Missing file, row left as it is: {name}')
+        if not options['dry_run']:
+            corrected = storage.recount()
+            if corrected:
+                self.stdout.write(f'Corrected {corrected} reference counts')
+            # Rows were updated without signals; lists and snapshots still link the old files
+            for name in ('news', 'downloads', 'gallery'):
+                public_cache.invalidate(name)
+                snapshots.schedule(name)
+        verb = 'Would reclaim' if options['dry_run'] else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['files']} files ({report['rows']} rows, {report['bytes_before']} bytes) -> "
+            f"{report['blobs']} blobs ({report['bytes_after']} bytes). "
+            f"{verb} {report['bytes_reclaimed']} bytes"
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from sacco_app import outbox
+
+
+class Command(BaseCommand):
+    help = 'Send every due email in the outbox, one connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        report = outbox.flush_due(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {report['sent']} emails; {report['failed']} failed, "
+            f"{report['deferred']} deferred by rate limits"
+        ))
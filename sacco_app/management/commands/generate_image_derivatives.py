@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from sacco_app import image_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Make the resized WebP and JPEG copies of existing news and gallery images in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', choices=[[]] + list(image_derivatives.MODELS),
+                            help='Images to process (default all)')
+        parser.add_argument('--workers', type=int, help='Processes (default IMAGE_DERIVATIVE_WORKERS)')
+        parser.add_argument('--force', action='store_true', help='Remake copies that are already current')
+
+    def handle(self, *args, **options):
+        report = image_derivatives.backfill(options['kinds'], options['workers'], options['force'])
+        for failure in report['failed']:
+            self.stderr.write(f'Failed: {failure}')
+        if report['skipped']:
+            self.stdout.write(f"{report['skipped']} images changed while processing; their own jobs make their copies")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {report['images']} images ({report['original_bytes']} bytes of originals, "
+            f"{report['derived_bytes']} bytes of copies) in {report['seconds']}s"
+        ))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sacco_app import dividends, posting
+from sacco_app.models import Dividend
+from ._bench import rate
+
+
+class Command(BaseCommand):
+    help = "Pay a dividend's unpaid payments into members' savings accounts, resuming an interrupted run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dividend', type=int, help='Dividend id')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            dividend = Dividend.objects.get(pk=options['dividend'])
+        except Dividend.DoesNotExist:
+            raise CommandError(f"Dividend {options['dividend']} does not exist")
+
+        def progress(payout):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'checkpoint after payment {payout.last_payment_id}: '
+                    f'{payout.payments_paid} paid, {payout.amount_paid} credited'
+                )
+
+        try:
+            report = dividends.pay_out(dividend, chunk_size=options['chunk_size'], progress=progress)
+        except posting.PostingError as e:
+            raise CommandError(str(e))
+
+        if report['resumed_from']:
+            self.stdout.write(f"Resumed after payment {report['resumed_from']}")
+        if report['skipped']:
+            self.stdout.write(self.style.WARNING(
+                f"{report['skipped']} payments skipped: member has no active savings account"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Paid {report['paid']} payments ({report['amount']}) in {report['seconds']}s, "
+            f"{rate(report['paid'], report['seconds'])}"
+        ))
@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sacco_app import posting
+
+
+class Command(BaseCommand):
+    help = 'Post a payroll deduction batch (CSV with account_number,amount,reference header, or JSON array)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Batch file (.csv or .json)')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, post nothing')
+        parser.add_argument('--report', help='Write the per-line JSON report to this path')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('json' if path.lower().endswith('.json') else 'csv')
+        try:
+            with open(path, 'rb') as stream:
+                lines = posting.read_batch(stream, fmt)
+        except (OSError, ValueError, posting.PostingError) as e:
+            raise CommandError(f'Could not read batch: {e}')
+
+        report = posting.bulk_deposit(lines, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+
+        if options['report']:
+            with open(options['report'], 'w') as out:
+                json.dump(report, out, indent=2)
+        else:
+            for result in report['results']:
+                if result['status'] == 'rejected':
+                    self.stdout.write(self.style.WARNING(f"line {result['line']}: {result['error']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['posted']} posted, {report['rejected']} rejected, "
+            f"total {report['total_amount']} in {report['seconds']}s"
+        ))
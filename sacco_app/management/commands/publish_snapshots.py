@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from sacco_app import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Write the static JSON snapshots of the public collections (with .gz and, if available, .br copies)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', choices=[[]] + list(snapshots.COLLECTIONS),
+                            help='Collections to publish (default all)')
+        parser.add_argument('--dir', help='Directory to write to (default SNAPSHOT_DIR)')
+
+    def handle(self, *args, **options):
+        written = snapshots.publish(options['names'], options['dir'])
+        for name, size in written.items():
+            self.stdout.write(f'{name:<13} ' + (f'{size} bytes written' if size else 'unchanged'))
+        if snapshots.brotli is None:
+            self.stdout.write('brotli is not installed; only .gz copies were written')
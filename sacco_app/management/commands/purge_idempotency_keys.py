@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from sacco_app import idempotency
+from ._bench import timed
+
+
+class Command(BaseCommand):
+    help = 'Delete expired Idempotency-Key responses in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        with timed() as elapsed:
+            deleted = idempotency.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired keys in {elapsed['seconds']:.2f}s"))
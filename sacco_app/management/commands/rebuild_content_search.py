@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from sacco_app import content_search
+
+
+class Command(BaseCommand):
+    help = 'Recompute the search documents of all public content and rebuild the full-text index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        report = content_search.rebuild(chunk_size=options['chunk_size'])
+        counts = ', '.join(f'{count} {kind}' for kind, count in report['documents'].items())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {counts} in {report['seconds']}s"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sacco_app import member_search
+
+
+class Command(BaseCommand):
+    help = "Recompute every member's search document and rebuild the full-text index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        report = member_search.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {report['members']} members in {report['seconds']}s"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sacco_app import summaries
+
+
+class Command(BaseCommand):
+    help = 'Verify member summaries against the ledger tables and rebuild rows that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Report drift without fixing it; fail if any')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        report = summaries.rebuild(chunk_size=options['chunk_size'], fix=not options['verify'])
+        for example in report['examples']:
+            self.stdout.write(self.style.WARNING(f"member {example['member']}: {', '.join(example['fields'])} differ"))
+        line = (
+            f"{report['members']} members checked in {report['seconds']}s: "
+            f"{report['missing']} missing, {report['drifted']} drifted"
+        )
+        if options['verify'] and (report['missing'] or report['drifted']):
+            raise CommandError(line)
+        if report['fixed']:
+            line += f", {report['fixed']} rebuilt"
+        self.stdout.write(self.style.SUCCESS(line))
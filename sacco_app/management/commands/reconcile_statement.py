@@ -0,0 +1,35 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sacco_app import reconciliation
+from sacco_app.models import Reconciliation
+
+
+class Command(BaseCommand):
+    help = 'Match a bank or mobile-money statement CSV (date, reference, amount columns) against the ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Statement CSV file')
+        parser.add_argument('--source', choices=[choice for choice, _ in Reconciliation.SOURCE_CHOICES], default='bank')
+        parser.add_argument('--window-days', type=int, default=2,
+                            help='Days a statement date may differ from the transaction date')
+        parser.add_argument('--date-format', help='strptime format of the date column (default YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['window_days'] <= reconciliation.MAX_WINDOW_DAYS:
+            raise CommandError(f'--window-days must be between 0 and {reconciliation.MAX_WINDOW_DAYS}')
+        try:
+            with open(options['path'], 'rb') as stream:
+                run = reconciliation.reconcile(
+                    stream, name=os.path.basename(options['path']), source=options['source'],
+                    window_days=options['window_days'], date_format=options['date_format'],
+                )
+        except (OSError, reconciliation.StatementError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciliation {run.pk}: {run.total_lines} lines, {run.matched} matched ({run.matched_amount}), '
+            f'{run.unmatched} unmatched ({run.unmatched_amount}), {run.ambiguous} ambiguous, '
+            f'{run.invalid} invalid in {run.seconds}s'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from sacco_app import amortization
+from sacco_app.models import Loan
+from ._bench import timed, rate
+
+
+class Command(BaseCommand):
+    help = 'Recompute terms and repayment schedules for loans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='append', choices=[choice for choice, _ in Loan.LOAN_STATUS_CHOICES],
+                            help='Only loans with this status (repeatable); defaults to all loans')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        queryset = Loan.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status__in=options['status'])
+        with timed() as elapsed:
+            loans, rows = amortization.build_schedules(queryset, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Repriced {loans} loans ({rows} installments) in {elapsed['seconds']:.2f}s, "
+            f"{rate(loans, elapsed['seconds'])}"
+        ))
@@ -0,0 +1,88 @@
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from sacco_app import jobs
+
+
+def _process_worker(stop, batch_size, poll_interval, drain, results):
+    # Under the spawn start method the child starts without Django set up
+    django.setup()
+    # Ctrl-C reaches every process in the group; the parent sets stop instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    results.put(jobs.work(stop, batch_size, poll_interval, drain))
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs with a pool of worker threads or processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                            help='Threads suit I/O-bound jobs such as email; processes suit CPU-bound ones')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs a worker claims at a time')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when no job is due')
+        parser.add_argument('--drain', action='store_true', help='Exit once no job is due')
+        parser.add_argument('--stats', action='store_true', help='Print queue metrics and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        worker_args = (options['batch_size'], options['poll_interval'], options['drain'])
+        if options['mode'] == 'process':
+            stop = multiprocessing.Event()
+            results = multiprocessing.Queue()
+            # Children must not inherit the parent's open database connections
+            connections.close_all()
+            workers = [
+                multiprocessing.Process(target=_process_worker, args=(stop, *worker_args, results), daemon=True)
+                for _ in range(options['workers'])
+            ]
+        else:
+            stop = threading.Event()
+            outcomes = []
+            workers = [
+                threading.Thread(target=lambda: outcomes.append(jobs.work(stop, *worker_args)), daemon=True)
+                for _ in range(options['workers'])
+            ]
+
+        def shut_down(signum, frame):
+            self.stdout.write('Stopping after the current jobs...')
+            stop.set()
+
+        previous = {signum: signal.signal(signum, shut_down) for signum in (signal.SIGINT, signal.SIGTERM)}
+        self.stdout.write(f"Started {options['workers']} {options['mode']} workers")
+        try:
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                # Join with a timeout so the main thread keeps handling signals
+                while worker.is_alive():
+                    worker.join(0.5)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        if options['mode'] == 'process':
+            outcomes = [results.get() for worker in workers if worker.exitcode == 0]
+        succeeded = sum(ok for ok, _ in outcomes)
+        failed = sum(failed for _, failed in outcomes)
+        self.stdout.write(self.style.SUCCESS(f'Workers stopped: {succeeded} jobs succeeded, {failed} attempts failed'))
+        if options['verbosity'] > 1:
+            self.print_stats()
+
+    def print_stats(self):
+        stats = jobs.stats()
+        self.stdout.write(f"queued: {stats['queued']} ({stats['due']} due), lag {stats['lag_seconds']}s")
+        for row in stats['tasks']:
+            self.stdout.write(
+                f"{row['task']}: {row['succeeded']} succeeded, {row['failed']} failed, {row['retried']} retried, "
+                f"{row['queued']} queued, {row['running']} running; "
+                f"avg {row['avg_seconds']}s, max {row['max_seconds']}s"
+            )
@@ -0,0 +1,187 @@
+"""
+Member search index.
+
+``MemberSearchDocument`` holds one row of searchable text per member: name,
+email, phone digits, member number and account numbers. The database's
+full-text engine indexes it (migration 0013):
+
+* SQLite: an external-content FTS5 table with prefix indexes, kept in step
+  with the document table by triggers;
+* PostgreSQL: a GIN index on a 'simple' tsvector of the document, plus a
+  trigram index on the name.
+
+Documents are rewritten once the transaction commits after a User, Member or
+SavingsAccount save (signals.py); ``rebuild`` recomputes them all. ``search``
+treats each word of the query as a prefix and returns the best matches
+first.
+"""
+import re
+import threading
+import time
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import Q
+
+from .models import Member, SavingsAccount, MemberSearchDocument
+
+
+FTS_TABLE = 'sacco_app_membersearch_fts'
+# Must match the expression of the PostgreSQL GIN index in migration 0013
+TSVECTOR = (
+    "to_tsvector('simple', name || ' ' || email || ' ' || phone || ' ' || member_number || ' ' || account_numbers)"
+)
+MAX_TERMS = 6
+# Queries matching more members than this are not ranked
+RANKED_MATCHES = 500
+LOCAL_NUMBER_DIGITS = 9
+
+_pending = threading.local()
+
+
+def phone_variants(phone):
+    """Digits of a phone number as typed, without leading zeros, and the local number alone"""
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return ''
+    variants = [digits, digits.lstrip('0'), digits[-LOCAL_NUMBER_DIGITS:]]
+    return ' '.join(dict.fromkeys(variant for variant in variants if variant))
+
+
+def documents(member_ids):
+    """Build the search documents of the given members"""
+    accounts = {}
+    for member_id, number in (
+        SavingsAccount.objects.filter(member_id__in=member_ids).order_by('pk').values_list('member_id', 'account_number')
+    ):
+        accounts.setdefault(member_id, []).append(number)
+    rows = Member.objects.filter(pk__in=member_ids).values_list(
+        'pk', 'member_id', 'user__first_name', 'user__last_name', 'user__email', 'user__phone_number'
+    )
+    return [
+        MemberSearchDocument(
+            member_id=pk, member_number=member_number, name=f'{first_name} {last_name}'.strip(),
+            email=email or '', phone=phone_variants(phone), account_numbers=' '.join(accounts.get(pk, [])),
+        )
+        for pk, member_number, first_name, last_name, email, phone in rows
+    ]
+
+
+def update(member_ids, chunk_size=1000):
+    """Rewrite the search documents of the given members"""
+    member_ids = list(member_ids)
+    for start in range(0, len(member_ids), chunk_size):
+        MemberSearchDocument.objects.bulk_create(
+            documents(member_ids[start:start + chunk_size]),
+            update_conflicts=True, unique_fields=['member'],
+            update_fields=['name', 'email', 'phone', 'member_number', 'account_numbers', 'updated_at'],
+        )
+
+
+def schedule_update(member_id=None, user_id=None):
+    """Rewrite a member's document (given the member or its user) once the current transaction commits"""
+    pending = getattr(_pending, 'keys', None)
+    if pending is None:
+        pending = _pending.keys = set()
+    pending.add(('member', member_id) if member_id else ('user', user_id))
+    db_transaction.on_commit(_flush)
+
+
+def _flush():
+    pending = getattr(_pending, 'keys', None)
+    if not pending:
+        return
+    keys, _pending.keys = pending, set()
+    members = [key for kind, key in keys if kind == 'member']
+    users = [key for kind, key in keys if kind == 'user']
+    update(Member.objects.filter(Q(pk__in=members) | Q(user_id__in=users)).values_list('pk', flat=True))
+
+
+def rebuild(chunk_size=2000):
+    """Recompute every member's document and rebuild the full-text index; returns a report dict"""
+    started = time.perf_counter()
+    members = 0
+    last_pk = 0
+    while True:
+        member_ids = list(
+            Member.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not member_ids:
+            break
+        last_pk = member_ids[-1]
+        members += len(member_ids)
+        update(member_ids)
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return {'members': members, 'seconds': round(time.perf_counter() - started, 3)}
+
+
+def terms(query):
+    """Lower-cased query words; leading zeros are dropped from numbers, as phone variants store them"""
+    words = re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+    return [word.lstrip('0') or word if word.isdigit() else word for word in words]
+
+
+def search_ids(query, limit=20):
+    """Member ids whose document has a word starting with every word of query, best first"""
+    words = terms(query)
+    if not words:
+        return []
+    if connection.vendor == 'sqlite':
+        # Quoted, so words are never read as FTS5 operators; * makes each a prefix
+        match = ' '.join(f'"{word}"*' for word in words)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s",
+                           [match, RANKED_MATCHES + 1])
+            candidates = [row[0] for row in cursor.fetchall()]
+        if len(candidates) > RANKED_MATCHES:
+            # Scoring every match of a one- or two-letter prefix costs more
+            # than the lookup itself and the order means little until the
+            # query narrows, so broad queries come back in member order
+            return candidates[:limit]
+        sql = (
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, 4.0, 1.0, 4.0, 10.0, 8.0) LIMIT %s"
+        )
+        params = [match, limit]
+    elif connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT member_id FROM {MemberSearchDocument._meta.db_table} "
+            f"WHERE {TSVECTOR} @@ to_tsquery('simple', %s) "
+            f"ORDER BY ts_rank({TSVECTOR}, to_tsquery('simple', %s)) DESC LIMIT %s"
+        )
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        params = [tsquery, tsquery, limit]
+    else:
+        documents = MemberSearchDocument.objects.all()
+        for word in words:
+            documents = documents.filter(
+                Q(name__icontains=word) | Q(email__icontains=word) | Q(phone__contains=word)
+                | Q(member_number__icontains=word) | Q(account_numbers__icontains=word)
+            )
+        return list(documents.values_list('member_id', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(query, limit=20):
+    """Autocomplete results for query, best first"""
+    member_ids = search_ids(query, limit)
+    rows = MemberSearchDocument.objects.filter(member_id__in=member_ids).values(
+        'member_id', 'member_number', 'name', 'email', 'phone', 'account_numbers', 'member__status'
+    )
+    found = {row['member_id']: row for row in rows}
+    return [
+        {
+            'id': member_id,
+            'member_id': found[member_id]['member_number'],
+            'name': found[member_id]['name'],
+            'email': found[member_id]['email'],
+            'phone': found[member_id]['phone'].split(' ')[0],
+            'account_numbers': found[member_id]['account_numbers'].split(),
+            'status': found[member_id]['member__status'],
+        }
+        for member_id in member_ids if member_id in found
+    ]
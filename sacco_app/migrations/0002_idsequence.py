@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+SEQUENCES = ['transaction', 'member', 'savings_account', 'loan', 'share']
+
+
+def seed_sequences(apps, schema_editor):
+    IdSequence = apps.get_model('sacco_app', 'IdSequence')
+    IdSequence.objects.bulk_create([IdSequence(name=name) for name in SEQUENCES])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0002_idsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerfeedback',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='feedback_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerfeedback',
+            index=models.Index(fields=['-created_at', '-id'], name='feedback_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dividendpayment',
+            index=models.Index(fields=['dividend', 'member'], name='divpay_dividend_member_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dividendpayment',
+            index=models.Index(fields=['-created_at', '-id'], name='divpay_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'due_date'], name='loan_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['loan_type', 'status'], name='loan_type_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingsaccount',
+            index=models.Index(fields=['account_type', 'is_active'], name='savings_type_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='share',
+            index=models.Index(fields=['is_active', 'member'], name='share_active_member_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['member', '-created_at', '-id'], name='txn_member_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['transaction_type', 'created_at'], name='txn_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-created_at', '-id'], name='txn_created_idx'),
+        ),
+    ]
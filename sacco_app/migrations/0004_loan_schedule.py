@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0003_financial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='interest_method',
+            field=models.CharField(choices=[('reducing', 'Reducing Balance'), ('flat', 'Flat Rate')], default='reducing', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='LoanSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('installment_number', models.IntegerField()),
+                ('due_date', models.DateField()),
+                ('opening_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('principal', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('interest', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('payment', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('closing_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('loan', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='sacco_app.loan')),
+            ],
+            options={
+                'ordering': ['loan', 'installment_number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='loanschedule',
+            constraint=models.UniqueConstraint(fields=('loan', 'installment_number'), name='unique_loan_installment'),
+        ),
+    ]
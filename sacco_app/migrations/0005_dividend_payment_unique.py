@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:59
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_payments(apps, schema_editor):
+    """
+    Fold each dividend and member's unpaid duplicate payments into one row.
+
+    Paid rows record money already paid out and are never merged or deleted:
+    the migration stops, listing them, when a dividend and member have more
+    than one paid row, or a paid row and unpaid ones beside it.
+    """
+    DividendPayment = apps.get_model('sacco_app', 'DividendPayment')
+    duplicated = (
+        DividendPayment.objects.values('dividend', 'member')
+        .annotate(rows=Count('pk')).filter(rows__gt=1)
+    )
+    conflicts = []
+    merges = []
+    for pair in duplicated:
+        payments = list(
+            DividendPayment.objects.filter(dividend=pair['dividend'], member=pair['member']).order_by('pk')
+        )
+        if any(payment.is_paid for payment in payments):
+            conflicts.append(
+                f"dividend {pair['dividend']}, member {pair['member']}: payments "
+                + ', '.join(f"{payment.pk}{' (paid)' if payment.is_paid else ''}" for payment in payments)
+            )
+        else:
+            merges.append(payments)
+    if conflicts:
+        raise RuntimeError(
+            'Duplicate dividend payments include paid ones; reconcile them by hand and migrate again:\n'
+            + '\n'.join(conflicts)
+        )
+    for keep, *duplicates in merges:
+        keep.amount = sum((payment.amount for payment in duplicates), keep.amount)
+        keep.shares_owned = sum((payment.shares_owned for payment in duplicates), keep.shares_owned)
+        keep.save(update_fields=['amount', 'shares_owned'])
+        DividendPayment.objects.filter(pk__in=[payment.pk for payment in duplicates]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0004_loan_schedule'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_payments, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='dividendpayment',
+            name='divpay_dividend_member_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='dividendpayment',
+            constraint=models.UniqueConstraint(fields=('dividend', 'member'), name='unique_dividend_member'),
+        ),
+    ]
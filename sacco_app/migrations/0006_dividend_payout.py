@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0005_dividend_payment_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DividendPayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed')], default='running', max_length=20)),
+                ('last_payment_id', models.BigIntegerField(default=0)),
+                ('payments_paid', models.IntegerField(default=0)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('payments_skipped', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('loan_disbursement', 'Loan Disbursement'), ('loan_payment', 'Loan Payment'), ('interest', 'Interest'), ('fee', 'Fee'), ('transfer', 'Transfer'), ('dividend', 'Dividend')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='dividendpayment',
+            index=models.Index(fields=['dividend', 'is_paid', 'id'], name='divpay_dividend_unpaid_idx'),
+        ),
+        migrations.AddField(
+            model_name='dividendpayout',
+            name='dividend',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payouts', to='sacco_app.dividend'),
+        ),
+        migrations.AddConstraint(
+            model_name='dividendpayout',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'running')), fields=('dividend',), name='unique_running_payout'),
+        ),
+    ]
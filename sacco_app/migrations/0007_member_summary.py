@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0006_dividend_payout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_savings', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('outstanding_loans', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('share_count', models.IntegerField(default=0)),
+                ('share_value', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('unpaid_dividends', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('last_transaction_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='sacco_app.member')),
+            ],
+            options={
+                'verbose_name_plural': 'Member summaries',
+            },
+        ),
+    ]
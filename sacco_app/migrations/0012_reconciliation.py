@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0011_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reconciliation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('source', models.CharField(choices=[('bank', 'Bank'), ('mobile_money', 'Mobile Money')], default='bank', max_length=20)),
+                ('window_days', models.PositiveIntegerField(default=2)),
+                ('statement_from', models.DateField(blank=True, null=True)),
+                ('statement_to', models.DateField(blank=True, null=True)),
+                ('total_lines', models.PositiveIntegerField(default=0)),
+                ('matched', models.PositiveIntegerField(default=0)),
+                ('unmatched', models.PositiveIntegerField(default=0)),
+                ('ambiguous', models.PositiveIntegerField(default=0)),
+                ('invalid', models.PositiveIntegerField(default=0)),
+                ('matched_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=16)),
+                ('unmatched_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=16)),
+                ('seconds', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line_number', models.PositiveIntegerField()),
+                ('value_date', models.DateField(blank=True, null=True)),
+                ('reference', models.CharField(blank=True, max_length=50)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('description', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('matched', 'Matched'), ('unmatched', 'Unmatched'), ('ambiguous', 'Ambiguous'), ('invalid', 'Invalid')], max_length=20)),
+                ('candidates', models.JSONField(blank=True, default=list, help_text='Transaction ids an ambiguous line could be')),
+                ('note', models.CharField(blank=True, max_length=255)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['reference_number'], name='txn_reference_idx'),
+        ),
+        migrations.AddField(
+            model_name='reconciliationline',
+            name='reconciliation',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='sacco_app.reconciliation'),
+        ),
+        migrations.AddField(
+            model_name='reconciliationline',
+            name='transaction',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reconciliation_lines', to='sacco_app.transaction'),
+        ),
+        migrations.AddField(
+            model_name='reconciliation',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='reconciliationline',
+            index=models.Index(fields=['reconciliation', 'status', 'line_number'], name='recon_line_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reconciliationline',
+            index=models.Index(fields=['reconciliation', 'line_number'], name='recon_line_number_idx'),
+        ),
+    ]
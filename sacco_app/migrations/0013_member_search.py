@@ -0,0 +1,96 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:37
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+DOCUMENTS = 'sacco_app_membersearchdocument'
+FTS = 'sacco_app_membersearch_fts'
+COLUMNS = ('name', 'email', 'phone', 'member_number', 'account_numbers')
+TSVECTOR = (
+    "to_tsvector('simple', name || ' ' || email || ' ' || phone || ' ' || member_number || ' ' || account_numbers)"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """Full-text index over the document table for the engines that have one"""
+    columns = ', '.join(COLUMNS)
+    new = ', '.join(f'new.{column}' for column in COLUMNS)
+    old = ', '.join(f'old.{column}' for column in COLUMNS)
+    if schema_editor.connection.vendor == 'sqlite':
+        statements = [
+            f"CREATE VIRTUAL TABLE {FTS} USING fts5({columns}, content='{DOCUMENTS}', content_rowid='member_id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='1 2 3 4')",
+            f"CREATE TRIGGER {FTS}_ai AFTER INSERT ON {DOCUMENTS} BEGIN "
+            f"INSERT INTO {FTS}(rowid, {columns}) VALUES (new.member_id, {new}); END",
+            f"CREATE TRIGGER {FTS}_ad AFTER DELETE ON {DOCUMENTS} BEGIN "
+            f"INSERT INTO {FTS}({FTS}, rowid, {columns}) VALUES ('delete', old.member_id, {old}); END",
+            f"CREATE TRIGGER {FTS}_au AFTER UPDATE ON {DOCUMENTS} BEGIN "
+            f"INSERT INTO {FTS}({FTS}, rowid, {columns}) VALUES ('delete', old.member_id, {old}); "
+            f"INSERT INTO {FTS}(rowid, {columns}) VALUES (new.member_id, {new}); END",
+        ]
+    elif schema_editor.connection.vendor == 'postgresql':
+        statements = [
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            f'CREATE INDEX member_search_tsv_idx ON {DOCUMENTS} USING GIN (({TSVECTOR}))',
+            f'CREATE INDEX member_search_name_trgm_idx ON {DOCUMENTS} USING GIN (name gin_trgm_ops)',
+        ]
+    else:
+        statements = []
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS}')
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS member_search_tsv_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS member_search_name_trgm_idx')
+
+
+def build_documents(apps, schema_editor):
+    """Index the members that already exist"""
+    Member = apps.get_model('sacco_app', 'Member')
+    SavingsAccount = apps.get_model('sacco_app', 'SavingsAccount')
+    MemberSearchDocument = apps.get_model('sacco_app', 'MemberSearchDocument')
+    accounts = {}
+    for member_id, number in SavingsAccount.objects.order_by('pk').values_list('member_id', 'account_number'):
+        accounts.setdefault(member_id, []).append(number)
+    documents = []
+    for pk, member_number, first_name, last_name, email, phone in Member.objects.values_list(
+        'pk', 'member_id', 'user__first_name', 'user__last_name', 'user__email', 'user__phone_number'
+    ):
+        digits = re.sub(r'\D', '', phone or '')
+        variants = dict.fromkeys(v for v in (digits, digits.lstrip('0'), digits[-9:]) if v)
+        documents.append(MemberSearchDocument(
+            member_id=pk, member_number=member_number, name=f'{first_name} {last_name}'.strip(),
+            email=email or '', phone=' '.join(variants), account_numbers=' '.join(accounts.get(pk, [])),
+        ))
+    MemberSearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0012_reconciliation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSearchDocument',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='sacco_app.member')),
+                ('name', models.CharField(blank=True, max_length=301)),
+                ('email', models.CharField(blank=True, max_length=254)),
+                ('phone', models.CharField(blank=True, help_text='Digits, with and without the leading 0 or country code', max_length=100)),
+                ('member_number', models.CharField(max_length=20)),
+                ('account_numbers', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
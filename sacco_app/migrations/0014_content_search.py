@@ -0,0 +1,100 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+DOCUMENTS = 'sacco_app_contentsearchdocument'
+FTS = 'sacco_app_contentsearch_fts'
+COLUMNS = ('title', 'body')
+TSVECTOR = "to_tsvector('english', title || ' ' || body)"
+
+
+def create_search_index(apps, schema_editor):
+    """Full-text index over the document table for the engines that have one"""
+    columns = ', '.join(COLUMNS)
+    new = ', '.join(f'new.{column}' for column in COLUMNS)
+    old = ', '.join(f'old.{column}' for column in COLUMNS)
+    if schema_editor.connection.vendor == 'sqlite':
+        statements = [
+            f"CREATE VIRTUAL TABLE {FTS} USING fts5({columns}, content='{DOCUMENTS}', content_rowid='id', "
+            f"tokenize='porter unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER {FTS}_ai AFTER INSERT ON {DOCUMENTS} BEGIN "
+            f"INSERT INTO {FTS}(rowid, {columns}) VALUES (new.id, {new}); END",
+            f"CREATE TRIGGER {FTS}_ad AFTER DELETE ON {DOCUMENTS} BEGIN "
+            f"INSERT INTO {FTS}({FTS}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+            f"CREATE TRIGGER {FTS}_au AFTER UPDATE ON {DOCUMENTS} BEGIN "
+            f"INSERT INTO {FTS}({FTS}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {FTS}(rowid, {columns}) VALUES (new.id, {new}); END",
+        ]
+    elif schema_editor.connection.vendor == 'postgresql':
+        statements = [f'CREATE INDEX content_search_tsv_idx ON {DOCUMENTS} USING GIN (({TSVECTOR}))']
+    else:
+        statements = []
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS}')
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS content_search_tsv_idx')
+
+
+def build_documents(apps, schema_editor):
+    """Index the content that is already published"""
+    ContentSearchDocument = apps.get_model('sacco_app', 'ContentSearchDocument')
+    News = apps.get_model('sacco_app', 'News')
+    FAQ = apps.get_model('sacco_app', 'FAQ')
+    Download = apps.get_model('sacco_app', 'Download')
+    documents = [
+        ContentSearchDocument(kind='news', object_id=pk, title=title, body=content,
+                              published_at=published_date or created_at)
+        for pk, title, content, published_date, created_at in News.objects.filter(is_published=True).values_list(
+            'pk', 'title', 'content', 'published_date', 'created_at'
+        )
+    ]
+    documents += [
+        ContentSearchDocument(kind='faq', object_id=pk, title=question, body=answer, category=category or '',
+                              published_at=created_at)
+        for pk, question, answer, category, created_at in FAQ.objects.filter(is_active=True).values_list(
+            'pk', 'question', 'answer', 'category', 'created_at'
+        )
+    ]
+    documents += [
+        ContentSearchDocument(kind='download', object_id=pk, title=title, body=description or '',
+                              category=file_type, published_at=created_at)
+        for pk, title, description, file_type, created_at in Download.objects.filter(is_active=True).values_list(
+            'pk', 'title', 'description', 'file_type', 'created_at'
+        )
+    ]
+    ContentSearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0013_member_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('news', 'News'), ('faq', 'FAQ'), ('download', 'Download')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.TextField()),
+                ('body', models.TextField(blank=True)),
+                ('category', models.CharField(blank=True, max_length=50)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='contentsearchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_content_search_object'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+def fill_excerpts(apps, schema_editor):
+    """Excerpt the news already written, as News.save does for new ones"""
+    News = apps.get_model('sacco_app', 'News')
+    rows = []
+    for news in News.objects.only('pk', 'content').iterator(chunk_size=1000):
+        text = ' '.join((news.content or '').split())
+        if len(text) > 200:
+            text = text[:199].rsplit(' ', 1)[0].rstrip(' .,;:') + '\u2026'
+        news.excerpt = text
+        rows.append(news)
+    News.objects.bulk_update(rows, ['excerpt'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0014_content_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, help_text='Start of the content, for summary listings', max_length=200),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
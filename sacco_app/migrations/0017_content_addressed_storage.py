@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:18
+
+from django.db import migrations, models
+import django.utils.timezone
+import sacco_app.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0016_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='download',
+            name='file',
+            field=models.FileField(storage=sacco_app.storage.content_storage, upload_to='downloads/'),
+        ),
+        migrations.AlterField(
+            model_name='download',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='gallery',
+            name='image',
+            field=models.ImageField(storage=sacco_app.storage.content_storage, upload_to='gallery/'),
+        ),
+        migrations.AlterField(
+            model_name='news',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=sacco_app.storage.content_storage, upload_to='news/'),
+        ),
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='storedblob_unreferenced')],
+            },
+        ),
+    ]
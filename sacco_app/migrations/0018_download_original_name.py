@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:49
+
+import os
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def fill_original_names(apps, schema_editor):
+    """Name existing downloads after their file, or after their title once the file is a blob"""
+    Download = apps.get_model('sacco_app', 'Download')
+    for pk, title, name in Download.objects.exclude(file='').values_list('pk', 'title', 'file'):
+        if name.startswith('blobs/'):
+            original_name = (slugify(title) or 'download') + os.path.splitext(name)[1]
+        else:
+            original_name = os.path.basename(name)
+        Download.objects.filter(pk=pk).update(original_name=original_name[-255:])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sacco_app', '0017_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='download',
+            name='original_name',
+            field=models.CharField(blank=True, editable=False, help_text='Name the file was uploaded under, which it is downloaded as', max_length=255),
+        ),
+        migrations.RunPython(fill_original_names, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
+import os
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-import uuid
+from .ids import next_id
+from .storage import content_storage, saving
 
 
 class User(AbstractUser):
@@ -57,7 +60,7 @@ class Member(models.Model):
     def save(self, *args, **kwargs):
         if not self.member_id:
             # Generate unique member ID
-            self.member_id = f"MEM{str(uuid.uuid4())[:8].upper()}"
+            self.member_id = next_id('member')
         super().save(*args, **kwargs)
 
 
@@ -78,8 +81,18 @@ class SavingsAccount(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['account_type', 'is_active'], name='savings_type_active_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.account_number} - {self.member.user.get_full_name()}"
+    
+    def save(self, *args, **kwargs):
+        if not self.account_number:
+            self.account_number = next_id('savings_account')
+        super().save(*args, **kwargs)
 
 
 class Loan(models.Model):
@@ -100,11 +113,17 @@ class Loan(models.Model):
         ('education', 'Education Loan'),
     ]
     
+    INTEREST_METHOD_CHOICES = [
+        ('reducing', 'Reducing Balance'),
+        ('flat', 'Flat Rate'),
+    ]
+    
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='loans')
     loan_number = models.CharField(max_length=20, unique=True)
     loan_type = models.CharField(max_length=20, choices=LOAN_TYPE_CHOICES)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
-    interest_rate = models.DecimalField(max_digits=5, decimal_places=2)
+    interest_rate = models.DecimalField(max_digits=5, decimal_places=2)  # annual, percent
+    interest_method = models.CharField(max_length=20, choices=INTEREST_METHOD_CHOICES, default='reducing')
     term_months = models.IntegerField()
     monthly_payment = models.DecimalField(max_digits=12, decimal_places=2)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -120,8 +139,42 @@ class Loan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='loan_status_due_idx'),
+            models.Index(fields=['loan_type', 'status'], name='loan_type_status_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.loan_number} - {self.member.user.get_full_name()}"
+    
+    def save(self, *args, **kwargs):
+        if not self.loan_number:
+            self.loan_number = next_id('loan')
+        super().save(*args, **kwargs)
+
+
+class LoanSchedule(models.Model):
+    """One installment of a loan's repayment schedule"""
+    # Indexed through unique_loan_installment, which leads with loan
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='schedule', db_index=False)
+    installment_number = models.IntegerField()
+    due_date = models.DateField()
+    opening_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    principal = models.DecimalField(max_digits=12, decimal_places=2)
+    interest = models.DecimalField(max_digits=12, decimal_places=2)
+    payment = models.DecimalField(max_digits=12, decimal_places=2)
+    closing_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['loan', 'installment_number']
+        constraints = [
+            models.UniqueConstraint(fields=['loan', 'installment_number'], name='unique_loan_installment'),
+        ]
+    
+    def __str__(self):
+        return f"{self.loan.loan_number} #{self.installment_number} - {self.payment}"
 
 
 class Transaction(models.Model):
@@ -134,6 +187,7 @@ class Transaction(models.Model):
         ('interest', 'Interest'),
         ('fee', 'Fee'),
         ('transfer', 'Transfer'),
+        ('dividend', 'Dividend'),
     ]
     
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='transactions')
@@ -147,8 +201,42 @@ class Transaction(models.Model):
     balance_after = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # Member statements and keyset pages: newest first per member
+            models.Index(fields=['member', '-created_at', '-id'], name='txn_member_created_idx'),
+            models.Index(fields=['transaction_type', 'created_at'], name='txn_type_created_idx'),
+            # Unfiltered ledger keyset pages
+            models.Index(fields=['-created_at', '-id'], name='txn_created_idx'),
+            # Statement reconciliation and lookups by external reference
+            models.Index(fields=['reference_number'], name='txn_reference_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.transaction_id} - {self.member.user.get_full_name()}"
+    
+    def save(self, *args, **kwargs):
+        if not self.transaction_id:
+            self.transaction_id = next_id('transaction')
+        super().save(*args, **kwargs)
+
+
+class TransactionDailyRollup(models.Model):
+    """Count and volume of transactions per day and type, kept current by sacco_app.rollups"""
+    date = models.DateField()
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0.00)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date', 'transaction_type']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'transaction_type'], name='unique_rollup_day_type'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.transaction_type} - {self.count}"
 
 
 class Share(models.Model):
@@ -163,8 +251,18 @@ class Share(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'member'], name='share_active_member_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.share_number} - {self.member.user.get_full_name()}"
+    
+    def save(self, *args, **kwargs):
+        if not self.share_number:
+            self.share_number = next_id('share')
+        super().save(*args, **kwargs)
 
 
 class Dividend(models.Model):
@@ -192,15 +290,100 @@ class DividendPayment(models.Model):
     payment_date = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='divpay_created_idx'),
+            # Payout runs walk a dividend's unpaid payments in pk order
+            models.Index(fields=['dividend', 'is_paid', 'id'], name='divpay_dividend_unpaid_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dividend', 'member'], name='unique_dividend_member'),
+        ]
+    
     def __str__(self):
         return f"{self.member.user.get_full_name()} - {self.amount}"
 
 
+class DividendPayout(models.Model):
+    """Progress checkpoint of a dividend payout run"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+    ]
+    
+    dividend = models.ForeignKey(Dividend, on_delete=models.CASCADE, related_name='payouts')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    last_payment_id = models.BigIntegerField(default=0)
+    payments_paid = models.IntegerField(default=0)
+    amount_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    payments_skipped = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-started_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dividend'], condition=models.Q(status='running'), name='unique_running_payout'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.dividend} payout - {self.status}"
+
+
+class MemberSummary(models.Model):
+    """Denormalized financial position of a member, kept current by sacco_app.summaries"""
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, related_name='summary')
+    total_savings = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    outstanding_loans = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    share_count = models.IntegerField(default=0)
+    share_value = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    unpaid_dividends = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    last_transaction_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Member summaries'
+    
+    def __str__(self):
+        return f"{self.member.member_id} summary"
+
+
+class MemberSearchDocument(models.Model):
+    """Searchable text of a member, indexed by the database's full-text engine (see sacco_app.member_search)"""
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    name = models.CharField(max_length=301, blank=True)
+    email = models.CharField(max_length=254, blank=True)
+    phone = models.CharField(max_length=100, blank=True, help_text='Digits, with and without the leading 0 or country code')
+    member_number = models.CharField(max_length=20)
+    account_numbers = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.member_number} - {self.name}"
+
+
+def make_excerpt(text, length=200):
+    """Whitespace-collapsed start of text, cut at a word boundary"""
+    text = ' '.join((text or '').split())
+    if len(text) <= length:
+        return text
+    return text[:length - 1].rsplit(' ', 1)[0].rstrip(' .,;:') + '\u2026'
+
+
 class News(models.Model):
     """News and announcements model"""
     title = models.CharField(max_length=200)
     content = models.TextField()
-    image = models.ImageField(upload_to='news/', blank=True, null=True)
+    excerpt = models.CharField(max_length=200, blank=True, editable=False,
+                               help_text='Start of the content, for summary listings')
+    image = models.ImageField(upload_to='news/', storage=content_storage, blank=True, null=True)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False,
+                                      help_text='Resized copies of the image (see image_derivatives.py)')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     is_published = models.BooleanField(default=False)
     published_date = models.DateTimeField(blank=True, null=True)
@@ -209,6 +392,14 @@ class News(models.Model):
     
     def __str__(self):
         return self.title
+    
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        with saving(self, ['image']):
+            super().save(*args, **kwargs)
 
 
 class FAQ(models.Model):
@@ -240,9 +431,11 @@ class Download(models.Model):
     
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
-    file = models.FileField(upload_to='downloads/')
+    file = models.FileField(upload_to='downloads/', storage=content_storage)
+    original_name = models.CharField(max_length=255, blank=True, editable=False,
+                                     help_text='Name the file was uploaded under, which it is downloaded as')
     file_type = models.CharField(max_length=20, choices=FILE_TYPE_CHOICES, default='other')
-    file_size = models.IntegerField(blank=True, null=True)  # in bytes
+    file_size = models.BigIntegerField(blank=True, null=True, editable=False)  # in bytes, set on save
     download_count = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -251,13 +444,34 @@ class Download(models.Model):
     
     def __str__(self):
         return self.title
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # A new upload knows its size and name; a stored file is only measured once
+        if self.file and not self.file._committed:
+            self.original_name = os.path.basename(self.file.name)[-255:]
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, 'original_name'}
+        if self.file and (self.file_size is None or not self.file._committed):
+            try:
+                self.file_size = self.file.size
+            except FileNotFoundError:
+                self.file_size = None
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'file_size'}
+        with saving(self, ['file']):
+            super().save(*args, **kwargs)
 
 
 class Gallery(models.Model):
     """Gallery images model"""
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
-    image = models.ImageField(upload_to='gallery/')
+    image = models.ImageField(upload_to='gallery/', storage=content_storage)
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False,
+                                      help_text='Resized copies of the image (see image_derivatives.py)')
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -265,6 +479,10 @@ class Gallery(models.Model):
     
     def __str__(self):
         return self.title
+    
+    def save(self, *args, **kwargs):
+        with saving(self, ['image']):
+            super().save(*args, **kwargs)
 
 
 class ContactInfo(models.Model):
@@ -290,6 +508,31 @@ class ContactInfo(models.Model):
         return f"{self.get_branch_display()} - {self.name}"
 
 
+class ContentSearchDocument(models.Model):
+    """Searchable text of a published news item, FAQ or download (see sacco_app.content_search)"""
+    KIND_CHOICES = [
+        ('news', 'News'),
+        ('faq', 'FAQ'),
+        ('download', 'Download'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.TextField()
+    body = models.TextField(blank=True)
+    category = models.CharField(max_length=50, blank=True)
+    published_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_content_search_object'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
 class CustomerFeedback(models.Model):
     """Customer feedback model"""
     STATUS_CHOICES = [
@@ -311,6 +554,12 @@ class CustomerFeedback(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-created_at', '-id'], name='feedback_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='feedback_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.subject}"
 
@@ -333,4 +582,176 @@ class SystemSetting(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return self.key 
\ No newline at end of file
+        return self.key
+
+
+class IdSequence(models.Model):
+    """Counters behind the human-readable member/account/loan/share/transaction IDs"""
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} - {self.next_value}"
+
+
+class IdempotencyKey(models.Model):
+    """Stored response of a request sent with an Idempotency-Key header (see sacco_app/idempotency.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_user_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.key}"
+
+
+class Job(models.Model):
+    """Background job run by `manage.py run_workers` (see sacco_app/jobs.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    duration = models.FloatField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} - {self.status}"
+
+
+class OutboundEmail(models.Model):
+    """One email to one recipient, queued until sacco_app.outbox flushes it"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.EmailField()
+    provider = models.CharField(max_length=254, help_text='Recipient domain, the unit of rate limiting')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_status_next_idx'),
+            models.Index(fields=['provider', 'sent_at'], name='email_provider_sent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to} - {self.subject} - {self.status}"
+
+
+class Reconciliation(models.Model):
+    """One bank or mobile-money statement matched against the ledger (see sacco_app/reconciliation.py)"""
+    SOURCE_CHOICES = [
+        ('bank', 'Bank'),
+        ('mobile_money', 'Mobile Money'),
+    ]
+
+    name = models.CharField(max_length=255)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='bank')
+    window_days = models.PositiveIntegerField(default=2)
+    statement_from = models.DateField(blank=True, null=True)
+    statement_to = models.DateField(blank=True, null=True)
+    total_lines = models.PositiveIntegerField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    unmatched = models.PositiveIntegerField(default=0)
+    ambiguous = models.PositiveIntegerField(default=0)
+    invalid = models.PositiveIntegerField(default=0)
+    matched_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0.00)
+    unmatched_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0.00)
+    seconds = models.FloatField(default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} - {self.matched}/{self.total_lines} matched"
+
+
+class ReconciliationLine(models.Model):
+    """A statement line and the outcome of matching it"""
+    STATUS_CHOICES = [
+        ('matched', 'Matched'),
+        ('unmatched', 'Unmatched'),
+        ('ambiguous', 'Ambiguous'),
+        ('invalid', 'Invalid'),
+    ]
+
+    reconciliation = models.ForeignKey(Reconciliation, on_delete=models.CASCADE, related_name='lines',
+                                       db_index=False)
+    line_number = models.PositiveIntegerField()
+    value_date = models.DateField(blank=True, null=True)
+    reference = models.CharField(max_length=50, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, blank=True, null=True,
+                                    related_name='reconciliation_lines')
+    candidates = models.JSONField(default=list, blank=True, help_text='Transaction ids an ambiguous line could be')
+    note = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            # A run's lines in file order, optionally of one status
+            models.Index(fields=['reconciliation', 'status', 'line_number'], name='recon_line_status_idx'),
+            models.Index(fields=['reconciliation', 'line_number'], name='recon_line_number_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reconciliation_id} line {self.line_number} - {self.status}"
+
+
+class StoredBlob(models.Model):
+    """One stored copy of uploaded content, shared by every file naming it (see sacco_app/storage.py)"""
+    name = models.CharField(max_length=100, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['ref_count', 'updated_at'], name='storedblob_unreferenced')]
+
+    def __str__(self):
+        return self.name
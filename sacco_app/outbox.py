@@ -0,0 +1,187 @@
+"""
+Email outbox.
+
+``send`` stores one ``OutboundEmail`` row per recipient and, once the
+transaction commits, queues a ``flush_due`` background job unless one is
+already queued. ``flush`` claims a batch of due messages and sends them over
+one backend connection opened for the whole batch, recording each message's
+outcome on its row:
+
+* at most ``EMAIL_RATE_LIMIT_PER_MINUTE`` messages (or the recipient
+  domain's ``EMAIL_PROVIDER_RATE_LIMITS`` entry) go to one domain in any
+  60 seconds; the rest wait for the window to move on;
+* a failed message is retried with the job queue's backoff and gives up
+  after ``JOB_MAX_ATTEMPTS`` attempts.
+"""
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction as db_transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from . import jobs
+from .models import Job, OutboundEmail
+
+
+RATE_WINDOW = timedelta(minutes=1)
+
+
+def provider(address):
+    return address.rpartition('@')[2].strip().lower()
+
+
+def rate_limit(domain):
+    return settings.EMAIL_PROVIDER_RATE_LIMITS.get(domain, settings.EMAIL_RATE_LIMIT_PER_MINUTE)
+
+
+def send(subject, body, recipient_list, from_email=None):
+    """Queue one message per recipient; they are sent after the transaction commits"""
+    messages = OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=subject, body=body, from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=address, provider=provider(address),
+        )
+        for address in recipient_list
+    ])
+    db_transaction.on_commit(schedule_flush)
+    return messages
+
+
+def schedule_flush(at=None):
+    """Queue a flush job for `at` (default now) unless one is already queued to run by then"""
+    now = timezone.now()
+    at = max(at or now, now)
+    # A flush deferred by the rate limit or a retry backoff runs too late for new mail
+    if Job.objects.filter(task=jobs.task_path(flush_due), status='queued', run_at__lte=at).exists():
+        return
+    jobs.enqueue(flush_due, delay=(at - now).total_seconds())
+
+
+def requeue_stale():
+    """Put back messages claimed by a flusher that stopped before finishing them"""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+    return OutboundEmail.objects.filter(status='sending', claimed_at__lt=cutoff).update(
+        status='pending', claimed_by='',
+    )
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    due = list(
+        OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not due:
+        return []
+    token = uuid.uuid4().hex
+    OutboundEmail.objects.filter(pk__in=due, status='pending').update(
+        status='sending', claimed_by=token, claimed_at=now,
+    )
+    return list(OutboundEmail.objects.filter(pk__in=due, claimed_by=token, status='sending').order_by('pk'))
+
+
+def _apply_rate_limits(messages):
+    """Split claimed messages into (sendable, {domain: (deferred, retry at)})"""
+    now = timezone.now()
+    domains = {message.provider for message in messages}
+    recent = {
+        row['provider']: row
+        for row in OutboundEmail.objects.filter(provider__in=domains, status='sent', sent_at__gt=now - RATE_WINDOW)
+        .order_by().values('provider').annotate(sent=Count('pk'), oldest=Min('sent_at'))
+    }
+    sendable, deferred = [], {}
+    room = {domain: max(rate_limit(domain) - recent.get(domain, {}).get('sent', 0), 0) for domain in domains}
+    for message in messages:
+        if room[message.provider]:
+            room[message.provider] -= 1
+            sendable.append(message)
+        else:
+            oldest = recent.get(message.provider, {}).get('oldest') or now
+            deferred.setdefault(message.provider, ([], oldest + RATE_WINDOW))[0].append(message)
+    return sendable, deferred
+
+
+def flush(batch_size=500, connection=None):
+    """Send one batch of due messages over a single connection; returns a report dict"""
+    started = time.perf_counter()
+    requeue_stale()
+    messages = _claim(batch_size)
+    sendable, deferred = _apply_rate_limits(messages)
+    for batch, retry_at in deferred.values():
+        OutboundEmail.objects.filter(pk__in=[message.pk for message in batch]).update(
+            status='pending', claimed_by='', next_attempt_at=retry_at,
+        )
+
+    sent, failed = _deliver(sendable, connection) if sendable else ([], 0)
+    seconds = time.perf_counter() - started
+    return {
+        'claimed': len(messages),
+        'sent': len(sent),
+        'failed': failed,
+        'deferred': sum(len(batch) for batch, _ in deferred.values()),
+        'seconds': round(seconds, 3),
+    }
+
+
+def _deliver(messages, connection=None):
+    """Send messages over one connection; returns (sent pks, failure count)"""
+    sent, failed = [], 0
+    attempted = 0
+    connection = connection or get_connection()
+    try:
+        connection.open()
+        for message in messages:
+            attempted += 1
+            email = EmailMessage(message.subject, message.body, message.from_email, [message.to])
+            try:
+                connection.send_messages([email])
+            except Exception:
+                failed += 1
+                _record_failure(message, traceback.format_exc(limit=3))
+                # The connection may be unusable after an error; start a fresh one
+                connection.close()
+                connection.open()
+            else:
+                sent.append(message.pk)
+    finally:
+        connection.close()
+        OutboundEmail.objects.filter(pk__in=sent).update(
+            status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1, claimed_by='', last_error='',
+        )
+        # If the connection could not be (re)opened, hand the rest back untouched
+        OutboundEmail.objects.filter(pk__in=[message.pk for message in messages[attempted:]]).update(
+            status='pending', claimed_by='',
+        )
+    return sent, failed
+
+
+def _record_failure(message, error):
+    attempts = message.attempts + 1
+    values = {'attempts': attempts, 'last_error': error, 'claimed_by': ''}
+    if attempts < settings.JOB_MAX_ATTEMPTS:
+        values.update(status='pending', next_attempt_at=timezone.now() + timedelta(seconds=jobs.backoff(attempts)))
+    else:
+        values['status'] = 'failed'
+    OutboundEmail.objects.filter(pk=message.pk).update(**values)
+
+
+def flush_due(batch_size=500):
+    """Flush until nothing is due, then schedule the next flush for deferred or retried messages"""
+    totals = {'claimed': 0, 'sent': 0, 'failed': 0, 'deferred': 0}
+    while True:
+        report = flush(batch_size)
+        for key in totals:
+            totals[key] += report[key]
+        # A batch that sent nothing is entirely deferred or failed; stop
+        # rather than spin on messages that are not due yet
+        if report['claimed'] < batch_size or not report['sent']:
+            break
+    next_at = OutboundEmail.objects.filter(status='pending').aggregate(next_at=Min('next_attempt_at'))['next_at']
+    if next_at is not None:
+        schedule_flush(next_at)
+    return totals
@@ -0,0 +1,205 @@
+"""
+Pagination classes.
+
+``KeysetPagination`` seeks on ``(created_at, id)`` instead of counting and
+offsetting, so every page costs the same no matter how deep the client is.
+``OptInKeysetPagination`` keeps the project's page-number pagination and
+switches to keyset mode when the request carries a ``cursor`` parameter (an
+empty ``?cursor=`` requests the first page). ``LimitCursorPagination`` is
+the forward-only ``?limit=``/``?cursor=`` variant the public lists use, on
+any descending column, nulls last.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Newest-first keyset pagination on (created_at, id) with opaque cursors"""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse = False
+            queryset = queryset.order_by('-created_at', '-id')
+        else:
+            created_at, pk, reverse = cursor
+            queryset = self.seek(queryset, created_at, pk, reverse)
+
+        rows = list(queryset[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        # Walking backwards we came from a later page, walking forwards from
+        # an earlier one (unless this is the first page)
+        has_next = True if reverse else has_more
+        has_previous = has_more if reverse else cursor is not None
+        self.next_key = self._key(rows[-1]) if rows and has_next else None
+        self.previous_key = self._key(rows[0]) if rows and has_previous else None
+        return rows
+
+    @staticmethod
+    def seek(queryset, created_at, pk, reverse=False):
+        """Rows strictly after (or, reversed, before) the (created_at, id) key"""
+        # Written as a range on created_at plus a tie-break rather than a bare
+        # OR, so the database can seek into the index instead of scanning it
+        if reverse:
+            return queryset.filter(
+                Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+            ).order_by('created_at', 'id')
+        return queryset.filter(
+            Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+        ).order_by('-created_at', '-id')
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(*self.next_key, False))
+
+    def get_previous_link(self):
+        if self.previous_key is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(*self.previous_key, True))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def _key(row):
+        if isinstance(row, dict):
+            return row['created_at'], row['id']
+        return row.created_at, row.id
+
+    def encode_cursor(self, created_at, pk, reverse):
+        payload = json.dumps([created_at.isoformat(), pk, int(reverse)], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            created_at, pk, reverse = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(created_at), int(pk), bool(reverse)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class OptInKeysetPagination(PageNumberPagination):
+    """Page-number pagination unless ``?cursor=`` asks for keyset pagination"""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class LimitCursorPagination(BasePagination):
+    """Forward-only keyset pagination on (field, id), newest first and nulls last"""
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, field='created_at'):
+        self.field = field
+
+    @classmethod
+    def requested(cls, request):
+        """Whether the request asks for a page rather than the whole list"""
+        return cls.limit_query_param in request.query_params or cls.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        limit = self.get_limit(request)
+        queryset = queryset.order_by(F(self.field).desc(nulls_last=True), '-id')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = self.seek(queryset, *cursor)
+        rows = list(queryset[:limit + 1])
+        self.next_key = self._key(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit]
+
+    def seek(self, queryset, value, pk):
+        """Rows after the (field, id) key in the page order"""
+        if value is None:
+            return queryset.filter(Q(**{f'{self.field}__isnull': True}) & Q(id__lt=pk))
+        return queryset.filter(
+            Q(**{f'{self.field}__lt': value}) | Q(**{self.field: value, 'id__lt': pk})
+            | Q(**{f'{self.field}__isnull': True})
+        )
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def _key(self, row):
+        if isinstance(row, dict):
+            return row[self.field], row['id']
+        return getattr(row, self.field), row.id
+
+    def get_paginated_data(self, data):
+        return {'next': self.get_next_link(), 'results': data}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        value, pk = self.next_key
+        payload = json.dumps([value.isoformat() if value is not None else None, pk], separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return (datetime.fromisoformat(value) if value is not None else None), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,338 @@
+"""
+Posting engine for money-moving operations.
+
+Every balance change is applied with a single conditional ``UPDATE ... SET
+balance = balance + x`` and the ledger row is written in the same database
+transaction. The update takes the row lock (or the SQLite write lock) before
+anything is read, so concurrent posts to the same account serialize instead
+of overwriting each other.
+"""
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import amortization, rollups, summaries
+from .ids import next_id
+from .models import SavingsAccount, Loan, Transaction
+
+
+CENT = Decimal('0.01')
+_balance = SavingsAccount._meta.get_field('balance')
+# Balances and amounts are DecimalField(max_digits=12, decimal_places=2):
+# anything from here up no longer fits the column
+MAX_BALANCE = Decimal(10) ** (_balance.max_digits - _balance.decimal_places)
+
+
+class PostingError(Exception):
+    """Raised when a posting is rejected (bad amount, insufficient funds, wrong state)"""
+
+
+def parse_amount(value):
+    """Parse a request amount into a positive two-place Decimal"""
+    try:
+        amount = Decimal(str(value)).quantize(CENT)
+    except (InvalidOperation, TypeError, ValueError):
+        raise PostingError('Invalid amount')
+    if not amount.is_finite() or amount <= 0:
+        raise PostingError('Invalid amount')
+    if amount >= MAX_BALANCE:
+        raise PostingError('Amount is too large')
+    return amount
+
+
+def deposit(account, amount, description=None, reference_number=None):
+    """Credit a savings account and record the deposit"""
+    amount = parse_amount(amount)
+    with db_transaction.atomic():
+        # The new balance must still fit the column
+        updated = SavingsAccount.objects.filter(pk=account.pk, balance__lt=MAX_BALANCE - amount).update(
+            balance=F('balance') + amount,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            if not SavingsAccount.objects.filter(pk=account.pk).exists():
+                raise PostingError('Account not found')
+            raise PostingError('Deposit would exceed the maximum balance')
+        balance = SavingsAccount.objects.values_list('balance', flat=True).get(pk=account.pk)
+        entry = Transaction.objects.create(
+            member_id=account.member_id,
+            transaction_id=next_id('transaction'),
+            transaction_type='deposit',
+            amount=amount,
+            description=description or f'Deposit to {account.account_number}',
+            reference_number=reference_number,
+            savings_account_id=account.pk,
+            balance_after=balance,
+        )
+        summaries.adjust(account.member_id, savings=amount, at=entry.created_at)
+        rollups.record([entry])
+        return entry
+
+
+def withdraw(account, amount, description=None, reference_number=None):
+    """Debit a savings account if funds allow and record the withdrawal"""
+    amount = parse_amount(amount)
+    with db_transaction.atomic():
+        # The balance guard lives in the UPDATE itself so the check and the
+        # debit cannot be separated by a concurrent withdrawal
+        updated = SavingsAccount.objects.filter(pk=account.pk, balance__gte=amount).update(
+            balance=F('balance') - amount,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise PostingError('Insufficient funds')
+        balance = SavingsAccount.objects.values_list('balance', flat=True).get(pk=account.pk)
+        entry = Transaction.objects.create(
+            member_id=account.member_id,
+            transaction_id=next_id('transaction'),
+            transaction_type='withdrawal',
+            amount=amount,
+            description=description or f'Withdrawal from {account.account_number}',
+            reference_number=reference_number,
+            savings_account_id=account.pk,
+            balance_after=balance,
+        )
+        summaries.adjust(account.member_id, savings=-amount, at=entry.created_at)
+        rollups.record([entry])
+        return entry
+
+
+def disburse_loan(loan):
+    """Move an approved loan to active and record the disbursement"""
+    with db_transaction.atomic():
+        today = timezone.now().date()
+        updated = Loan.objects.filter(pk=loan.pk, status='approved').update(
+            status='active',
+            disbursement_date=today,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise PostingError('Loan is not approved')
+        loan.status = 'active'
+        loan.disbursement_date = today
+        entry = Transaction.objects.create(
+            member_id=loan.member_id,
+            transaction_id=next_id('transaction'),
+            transaction_type='loan_disbursement',
+            amount=loan.amount,
+            description=f'Loan disbursement for {loan.loan_number}',
+            loan_id=loan.pk,
+            balance_after=loan.remaining_balance,
+        )
+        summaries.adjust(loan.member_id, loans=loan.remaining_balance, at=entry.created_at)
+        rollups.record([entry])
+        # Installments now fall due from the disbursement date
+        amortization.build_schedules(Loan.objects.filter(pk=loan.pk))
+        return entry
+
+
+def loan_payment(loan, amount, description=None, reference_number=None):
+    """Reduce a loan's remaining balance and record the repayment"""
+    amount = parse_amount(amount)
+    with db_transaction.atomic():
+        # Only loans the member summaries count as outstanding take payments,
+        # so the adjustment below always lands on a counted balance
+        updated = Loan.objects.filter(
+            pk=loan.pk, status__in=summaries.OUTSTANDING_STATUSES, remaining_balance__gte=amount
+        ).update(
+            remaining_balance=F('remaining_balance') - amount,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            if not Loan.objects.filter(pk=loan.pk, status__in=summaries.OUTSTANDING_STATUSES).exists():
+                raise PostingError('Loan is not active')
+            raise PostingError('Payment amount exceeds remaining balance')
+        Loan.objects.filter(pk=loan.pk, remaining_balance__lte=0).update(status='completed')
+        balance = Loan.objects.values_list('remaining_balance', flat=True).get(pk=loan.pk)
+        entry = Transaction.objects.create(
+            member_id=loan.member_id,
+            transaction_id=next_id('transaction'),
+            transaction_type='loan_payment',
+            amount=amount,
+            description=description or f'Loan payment for {loan.loan_number}',
+            reference_number=reference_number,
+            loan_id=loan.pk,
+            balance_after=balance,
+        )
+        summaries.adjust(loan.member_id, loans=-amount, at=entry.created_at)
+        rollups.record([entry])
+        return entry
+
+
+BATCH_FIELDS = ('account_number', 'amount', 'reference')
+
+
+def read_batch(stream, fmt='csv'):
+    """Read payroll lines from a CSV (with header) or JSON array stream"""
+    if fmt not in ('csv', 'json'):
+        raise PostingError(f'Unsupported batch format: {fmt}')
+    try:
+        if fmt == 'json':
+            data = json.load(stream)
+            if isinstance(data, dict):
+                data = data.get('lines', [])
+            if not isinstance(data, list):
+                raise PostingError('Expected a JSON array of lines')
+            return data
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig') if isinstance(stream.read(0), bytes) else stream
+        return list(csv.DictReader(text))
+    except (csv.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise PostingError(f'Malformed {fmt.upper()} batch: {e}')
+
+
+def _normalize_line(raw):
+    """Return (account_number, amount, reference) from a dict or sequence line"""
+    if isinstance(raw, dict):
+        values = [raw.get(field) for field in BATCH_FIELDS]
+    elif isinstance(raw, (list, tuple)):
+        values = (list(raw) + [None] * len(BATCH_FIELDS))[:len(BATCH_FIELDS)]
+    else:
+        raise PostingError('Malformed line')
+    account_number, amount, reference = values
+    account_number = str(account_number or '').strip()
+    if not account_number:
+        raise PostingError('Missing account number')
+    reference = str(reference or '').strip() or None
+    return account_number, parse_amount(amount), reference
+
+
+def bulk_deposit(lines, chunk_size=1000, dry_run=False, description='Payroll deduction'):
+    """
+    Validate and post a batch of deposits.
+
+    All lines are validated up front; valid lines are then posted in chunks,
+    each chunk in its own transaction with one prepared relative balance
+    UPDATE per account it touches and one bulk insert of ledger rows. Returns a
+    report with one result per input line.
+    """
+    started = time.perf_counter()
+    results = []
+    parsed = []
+    for number, raw in enumerate(lines, start=1):
+        result = {'line': number, 'status': 'rejected'}
+        results.append(result)
+        try:
+            account_number, amount, reference = _normalize_line(raw)
+        except PostingError as e:
+            result['error'] = str(e)
+            continue
+        result.update(account_number=account_number, amount=str(amount), reference=reference)
+        parsed.append((result, account_number, amount, reference))
+
+    accounts = SavingsAccount.objects.only('id', 'member_id', 'account_number', 'is_active', 'balance').in_bulk(
+        {account_number for _, account_number, _, _ in parsed}, field_name='account_number'
+    )
+    valid = []
+    projected = {}
+    for result, account_number, amount, reference in parsed:
+        account = accounts.get(account_number)
+        if account is None:
+            result['error'] = 'Account not found'
+        elif not account.is_active:
+            result['error'] = 'Account is inactive'
+        elif projected.get(account.pk, account.balance) + amount >= MAX_BALANCE:
+            result['error'] = 'Deposit would exceed the maximum balance'
+        else:
+            projected[account.pk] = projected.get(account.pk, account.balance) + amount
+            result['status'] = 'valid'
+            valid.append((result, account, amount, reference))
+
+    if not dry_run:
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            try:
+                _post_deposit_chunk(chunk, description)
+            except PostingError as e:
+                # A balance moved since validation; the chunk was rolled back
+                for result, _, _, _ in chunk:
+                    result.update(status='rejected', error=str(e))
+
+    posted = sum(1 for r in results if r['status'] == 'posted')
+    return {
+        'total_lines': len(results),
+        'posted': posted,
+        'rejected': sum(1 for r in results if r['status'] == 'rejected'),
+        'total_amount': str(sum((amount for r, _, amount, _ in valid if r['status'] == 'posted'), Decimal('0.00'))),
+        'dry_run': dry_run,
+        'seconds': round(time.perf_counter() - started, 3),
+        'results': results,
+    }
+
+
+def credit_accounts(totals):
+    """
+    Add {account pk: amount} to many savings accounts at once.
+
+    Must run inside a transaction; returns the post-update balances so the
+    caller can write ledger rows in the same transaction. Raises PostingError,
+    for the caller to roll back, when a balance would no longer fit the column.
+    """
+    now = timezone.now()
+    balance_field = SavingsAccount._meta.get_field('balance')
+    updated_field = SavingsAccount._meta.get_field('updated_at')
+    quote = connection.ops.quote_name
+    sql = (
+        f"UPDATE {quote(SavingsAccount._meta.db_table)} "
+        f"SET {quote(balance_field.column)} = {quote(balance_field.column)} + %s, "
+        f"{quote(updated_field.column)} = %s WHERE {quote(SavingsAccount._meta.pk.column)} = %s "
+        f"AND {quote(balance_field.column)} < %s"
+    )
+    # Relative update (balance = balance + x), one prepared statement run
+    # once per account, so concurrent teller posts are never overwritten
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (
+                balance_field.get_db_prep_value(total, connection),
+                updated_field.get_db_prep_value(now, connection),
+                pk,
+                balance_field.get_db_prep_value(MAX_BALANCE - total, connection),
+            )
+            for pk, total in totals.items()
+        ])
+        # executemany sums the rows each run updated
+        if 0 <= cursor.rowcount < len(totals):
+            raise PostingError('Deposit would exceed the maximum balance')
+    return dict(SavingsAccount.objects.filter(pk__in=totals).values_list('pk', 'balance'))
+
+
+def _post_deposit_chunk(chunk, description):
+    """Apply one chunk of validated deposit lines atomically"""
+    totals = {}
+    for _, account, amount, _ in chunk:
+        totals[account.pk] = totals.get(account.pk, Decimal('0.00')) + amount
+
+    with db_transaction.atomic():
+        balances = credit_accounts(totals)
+
+        # Rebuild each line's running balance from the post-update balance
+        running = {pk: balances[pk] - total for pk, total in totals.items()}
+        ledger = []
+        for result, account, amount, reference in chunk:
+            running[account.pk] += amount
+            ledger.append(Transaction(
+                member_id=account.member_id,
+                transaction_id=next_id('transaction'),
+                transaction_type='deposit',
+                amount=amount,
+                description=f'{description} to {account.account_number}',
+                reference_number=reference,
+                savings_account_id=account.pk,
+                balance_after=running[account.pk],
+            ))
+        Transaction.objects.bulk_create(ledger)
+
+        deltas = {}
+        for entry in ledger:
+            total, _, _, last = deltas.get(entry.member_id, (Decimal('0.00'), 0, 0, entry.created_at))
+            deltas[entry.member_id] = (total + entry.amount, 0, 0, max(last, entry.created_at))
+        summaries.adjust_many(deltas)
+        rollups.record(ledger)
+
+    for (result, _, _, _), entry in zip(chunk, ledger):
+        result.update(status='posted', transaction_id=entry.transaction_id, balance_after=str(entry.balance_after))
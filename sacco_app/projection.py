@@ -0,0 +1,65 @@
+"""
+``?fields=`` projection for list endpoints.
+
+``requested_fields`` reads the output fields a client asked for, and
+``project`` narrows the queryset to the columns those fields are rendered
+from with ``.only()``. It joins only the relations they read through. The
+serializer is then cut down to the same fields with ``restrict``, so a
+request for titles never loads an article body.
+"""
+from .serializers_fast import METHOD_SOURCES
+
+
+class ProjectionError(ValueError):
+    """Raised for a ?fields= list naming fields the serializer does not have"""
+
+
+def requested_fields(request, serializer_class, default=None):
+    """Output fields named by ?fields= (comma separated), else default; None means all"""
+    value = request.query_params.get('fields')
+    if not value:
+        return default
+    names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    available = serializer_class().fields
+    unknown = [name for name in names if name not in available or available[name].write_only]
+    if unknown:
+        raise ProjectionError(
+            f"Unknown field(s): {', '.join(unknown)}; available: {', '.join(available)}"
+        )
+    return names
+
+
+def columns(serializer_class, names, sources=None):
+    """Model columns (as lookups) the given output fields are rendered from"""
+    sources = sources or {}
+    available = serializer_class().fields
+    needed = []
+    for name in names:
+        if name in sources:
+            keys = sources[name]
+        else:
+            attrs = list(available[name].source_attrs)
+            if attrs and attrs[-1] in METHOD_SOURCES:
+                keys = ['__'.join(attrs[:-1] + [part]) for part in METHOD_SOURCES[attrs[-1]][0]]
+            else:
+                keys = ['__'.join(attrs)]
+        needed.extend(key for key in keys if key not in needed)
+    return needed
+
+
+def project(queryset, serializer_class, names, sources=None, extra=()):
+    """queryset loading only what the named output fields (plus extra columns) need"""
+    needed = columns(serializer_class, names, sources) + [key for key in extra if key]
+    relations = sorted({key.rsplit('__', 1)[0] for key in needed if '__' in key})
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*needed)
+
+
+def restrict(serializer, names):
+    """Drop every output field of a (many=True) serializer but the named ones"""
+    fields = serializer.child.fields
+    for name in [name for name in fields if name not in names]:
+        fields.pop(name)
+    return serializer
@@ -0,0 +1,177 @@
+"""
+Conditional GET and a server-side response cache for the public content endpoints.
+
+Every public collection has a version: its row count and latest
+``updated_at`` (one aggregate query), plus a generation that signals.py
+bumps through ``invalidate`` whenever one of its rows is saved or deleted,
+or something the rows are serialized with changes, such as an uploader's
+name. ``invalidate`` also records when it ran. From the version:
+
+* ``ETag`` hashes the collection, version, query string, host and format,
+  and ``Last-Modified`` is the later of the latest ``updated_at`` and the
+  last invalidation, so unpublishing or deleting any row moves it too. A
+  request whose If-None-Match (or, without one, If-Modified-Since) still
+  matches gets a 304 before any row is read or serialized;
+* the rendered JSON body is kept in the ``public`` cache (locmem, file or
+  database, see ``PUBLIC_CACHE_BACKEND``) and served for as long as its
+  version is current;
+* when it is out of date, one request per variant takes a lock and rebuilds
+  it. The others serve the previous body meanwhile if it is no older than
+  ``PUBLIC_CACHE_STALE_SECONDS``, or wait for the rebuild.
+
+With the ``locmem`` backend each worker process has its own generation and
+invalidation time, and only sees the writes it handled itself; use ``file``
+or ``db`` when several workers serve these endpoints.
+"""
+import hashlib
+import math
+import time
+from calendar import timegm
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+CACHE_ALIAS = 'public'
+LOCK_SECONDS = 30
+WAIT_SECONDS = 5
+POLL_SECONDS = 0.01
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _generation_key(name):
+    return f'sacco:public:{name}:generation'
+
+
+def _changed_at_key(name):
+    return f'sacco:public:{name}:changed_at'
+
+
+def invalidate(name):
+    """Make every cached response of a collection out of date"""
+    cache = _cache()
+    try:
+        cache.incr(_generation_key(name))
+    except ValueError:
+        cache.set(_generation_key(name), 1, None)
+    # Whole seconds, as HTTP dates have them, rounded up so the change is
+    # after any Last-Modified already sent
+    cache.set(_changed_at_key(name), math.ceil(time.time()), None)
+
+
+def _changed_at(name):
+    """When the collection was last invalidated, as a timestamp"""
+    cache = _cache()
+    changed_at = cache.get(_changed_at_key(name))
+    if changed_at is None:
+        # Unknown to this cache (new, cleared or evicted): any earlier change
+        # may have gone unrecorded, so count from now
+        cache.add(_changed_at_key(name), math.ceil(time.time()), None)
+        changed_at = cache.get(_changed_at_key(name), math.ceil(time.time()))
+    return changed_at
+
+
+def version(name, queryset):
+    """(row count, Last-Modified, generation) of a collection"""
+    stats = queryset.order_by().aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+    changed_at = datetime.fromtimestamp(_changed_at(name), dt_timezone.utc)
+    last_modified = max(stats['last_modified'], changed_at) if stats['last_modified'] else changed_at
+    return stats['count'], last_modified, _cache().get(_generation_key(name), 0)
+
+
+def _variant(name, request):
+    """What, besides the collection version, a response body depends on"""
+    return '|'.join([
+        name, request.get_full_path(), request.scheme, request.get_host(), request.accepted_renderer.format,
+    ])
+
+
+def _etag(variant, current):
+    count, last_modified, generation = current
+    tag = f"{variant}|{count}|{last_modified.isoformat() if last_modified else ''}|{generation}"
+    return '"%s"' % hashlib.sha256(tag.encode()).hexdigest()[:32]
+
+
+def _not_modified(request, etag, last_modified):
+    """Whether the client's copy is current, per RFC 9110 precedence"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = parse_etags(if_none_match)
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return bool(if_modified_since and timegm(last_modified.utctimetuple()) <= if_modified_since)
+
+
+def _headers(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    response['Cache-Control'] = settings.PUBLIC_CACHE_CONTROL
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def _build(key, current, etag, serialize):
+    entry = {
+        'version': current, 'etag': etag, 'last_modified': current[1],
+        'body': JSONRenderer().render(serialize()), 'built_at': time.time(),
+    }
+    _cache().set(key, entry, settings.PUBLIC_CACHE_TIMEOUT)
+    return entry
+
+
+def _entry(key, current, etag, serialize):
+    """The cached entry for key, rebuilt by at most one request at a time when out of date"""
+    cache = _cache()
+    entry = cache.get(key)
+    if entry is not None and entry['version'] == current:
+        return entry
+    lock_key = f'{key}:rebuilding'
+    if cache.add(lock_key, True, LOCK_SECONDS):
+        try:
+            return _build(key, current, etag, serialize)
+        finally:
+            cache.delete(lock_key)
+    if entry is not None and time.time() - entry['built_at'] <= settings.PUBLIC_CACHE_STALE_SECONDS:
+        return entry
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(POLL_SECONDS)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] == current:
+            return entry
+        if not cache.get(lock_key):
+            break
+    # The rebuilding request failed or is too slow; do it here instead
+    return _build(key, current, etag, serialize)
+
+
+def respond(request, name, queryset, serialize):
+    """
+    Response for a public collection endpoint.
+
+    ``serialize`` returns the response data and is only called when neither
+    the client nor the cache has the current version.
+    """
+    current = version(name, queryset)
+    variant = _variant(name, request)
+    etag = _etag(variant, current)
+    last_modified = current[1]
+    if _not_modified(request, etag, last_modified):
+        return _headers(HttpResponseNotModified(), etag, last_modified)
+    if request.accepted_renderer.format != 'json':
+        # The browsable API renders through the view; only JSON bodies are cached
+        return _headers(Response(serialize()), etag, last_modified)
+    key = f'sacco:public:{name}:{hashlib.sha256(variant.encode()).hexdigest()[:32]}'
+    entry = _entry(key, current, etag, serialize)
+    response = HttpResponse(entry['body'], content_type='application/json')
+    return _headers(response, entry['etag'], entry['last_modified'])
@@ -0,0 +1,33 @@
+"""
+Query budget assertions.
+
+``query_budget`` fails a block that issues more queries than allowed;
+``count_queries`` lets callers compare the same call at two data sizes,
+where any growth is the signature of an N+1 pattern.
+"""
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block of code issues more queries than budgeted"""
+
+
+def count_queries(func, *args, **kwargs):
+    """Call func and return (result, number of queries it issued)"""
+    with CaptureQueriesContext(connection) as captured:
+        result = func(*args, **kwargs)
+    return result, len(captured)
+
+
+@contextmanager
+def query_budget(max_queries, label='block'):
+    """Fail if the enclosed block issues more than max_queries queries"""
+    with CaptureQueriesContext(connection) as captured:
+        yield captured
+    if len(captured) > max_queries:
+        statements = '\n'.join(q['sql'] for q in captured.captured_queries)
+        raise QueryBudgetExceeded(f'{label}: {len(captured)} queries, budget {max_queries}\n{statements}')
+
@@ -0,0 +1,235 @@
+"""
+Statement reconciliation.
+
+``reconcile`` reads a bank or mobile-money statement CSV row by row, keeping
+only a compact tuple per line. It loads the ledger once, for the statement's
+date range widened by the matching window. Those transactions are hashed on
+(reference, amount in cents) and each line probes that table. A line is:
+
+* ``matched`` when exactly one unreconciled transaction with its reference
+  and amount falls within ``window_days`` of its date;
+* ``ambiguous`` when several do (their ids are kept for review);
+* ``unmatched`` otherwise, with a note when the reference was seen with
+  another amount, outside the window, or already reconciled;
+* ``invalid`` when the row cannot be parsed.
+
+A transaction matches at most one line, across all runs.
+"""
+import csv
+import io
+import json
+import time
+from bisect import bisect_right
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Transaction, Reconciliation, ReconciliationLine
+
+
+CENT = Decimal('0.01')
+MAX_WINDOW_DAYS = 31
+# Accepted header names for each statement column
+COLUMNS = {
+    'date': ('date', 'value_date', 'transaction_date', 'posting_date'),
+    'reference': ('reference', 'reference_number', 'ref', 'receipt', 'receipt_no'),
+    'amount': ('amount', 'credit', 'value'),
+    'description': ('description', 'details', 'narrative', 'particulars'),
+}
+
+
+class StatementError(Exception):
+    """Raised when a statement file cannot be read at all"""
+
+
+def normalize_reference(value):
+    return str(value or '').strip().upper()
+
+
+def _columns(fieldnames):
+    """Map each statement column to the header it appears under"""
+    headers = {(name or '').strip().lower(): name for name in fieldnames or []}
+    found = {}
+    for column, aliases in COLUMNS.items():
+        for alias in aliases:
+            if alias in headers:
+                found[column] = headers[alias]
+                break
+    missing = [column for column in ('date', 'reference', 'amount') if column not in found]
+    if missing:
+        raise StatementError(f"Statement is missing column(s): {', '.join(missing)}")
+    return found
+
+
+def _parse_date(value, date_format):
+    value = (value or '').strip()
+    if date_format:
+        return datetime.strptime(value, date_format).date()
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def read_statement(stream, date_format=None):
+    """
+    Yield (line number, date, reference, amount, description, error) for each CSV row.
+
+    Rows are parsed as they are read. Amounts are absolute values: debits and
+    credits both match a ledger amount, which is always positive.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='') if isinstance(stream.read(0), bytes) else stream
+    reader = csv.DictReader(text)
+    columns = _columns(reader.fieldnames)
+    for number, row in enumerate(reader, start=1):
+        description = (row.get(columns['description']) or '').strip() if 'description' in columns else ''
+        reference = normalize_reference(row.get(columns['reference']))
+        try:
+            value_date = _parse_date(row.get(columns['date']), date_format)
+        except (TypeError, ValueError):
+            yield number, None, reference, None, description, 'Invalid date'
+            continue
+        try:
+            amount = abs(Decimal((row.get(columns['amount']) or '').replace(',', '').strip())).quantize(CENT)
+        except InvalidOperation:
+            amount = None
+        if amount is None or not amount.is_finite() or not amount:
+            yield number, value_date, reference, None, description, 'Invalid amount'
+            continue
+        if not reference:
+            yield number, value_date, reference, amount, description, 'Missing reference'
+            continue
+        yield number, value_date, reference, amount, description, None
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def _ledger_slice(date_from, date_to):
+    """
+    Hash the referenced transactions of a date range.
+
+    Returns ({(reference, cents): [(pk, day)]}, {reference}, {already reconciled pks}).
+    """
+    start, end = _day_start(date_from), _day_start(date_to + timedelta(days=1))
+    table, references = {}, set()
+    rows = (
+        Transaction.objects.filter(created_at__gte=start, created_at__lt=end, reference_number__isnull=False)
+        .exclude(reference_number='').annotate(cents=Cast(Round(F('amount') * 100), IntegerField()))
+        .values_list('pk', 'reference_number', 'created_at', 'cents')
+    )
+    # Read through a plain cursor: per-row field converters cost more than
+    # the join itself. Each timestamp is placed in its local day by
+    # bisecting the slice's day boundaries instead of converting time zones.
+    days = [date_from + timedelta(days=n) for n in range((date_to - date_from).days + 1)]
+    bounds = [_day_start(day) for day in days]
+    sql, params = rows.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(10000)
+            if not batch:
+                break
+            # Plain SQL lists model columns before annotations
+            for pk, reference, stamp, cents in batch:
+                reference = normalize_reference(reference)
+                references.add(reference)
+                if stamp.tzinfo is None:
+                    # Backends without time zone support return naive UTC
+                    stamp = stamp.replace(tzinfo=dt_timezone.utc)
+                table.setdefault((reference, cents), []).append((pk, days[bisect_right(bounds, stamp) - 1]))
+    reconciled = set(
+        ReconciliationLine.objects.filter(
+            status='matched', transaction__created_at__gte=start, transaction__created_at__lt=end,
+        ).values_list('transaction_id', flat=True)
+    )
+    return table, references, reconciled
+
+
+def _match(line, table, references, consumed, window):
+    """Return (status, transaction pk, candidate pks, note) for one parsed line"""
+    _, value_date, reference, amount, _, error = line
+    if error:
+        return 'invalid', None, [], error
+    entries = table.get((reference, int(amount * 100)))
+    if not entries:
+        if reference in references:
+            return 'unmatched', None, [], 'Reference found with a different amount'
+        return 'unmatched', None, [], 'No transaction with this reference'
+    in_window = [pk for pk, day in entries if abs((day - value_date).days) <= window]
+    if not in_window:
+        return 'unmatched', None, [], 'Transaction outside the date window'
+    open_candidates = [pk for pk in in_window if pk not in consumed]
+    if not open_candidates:
+        return 'unmatched', None, [], 'Transaction already reconciled'
+    if len(open_candidates) > 1:
+        return 'ambiguous', None, sorted(open_candidates), f'{len(open_candidates)} candidate transactions'
+    return 'matched', open_candidates[0], [], ''
+
+
+def _store_lines(run, results, chunk_size):
+    """Insert the line outcomes with one prepared INSERT per chunk (no model instances)"""
+    names = ('reconciliation', 'line_number', 'value_date', 'reference', 'amount', 'description',
+             'status', 'transaction', 'candidates', 'note')
+    fields = [ReconciliationLine._meta.get_field(name) for name in names]
+    quote = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {quote(ReconciliationLine._meta.db_table)} "
+        f"({', '.join(quote(field.column) for field in fields)}) VALUES ({', '.join(['%s'] * len(fields))})"
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(results), chunk_size):
+            cursor.executemany(sql, [
+                (
+                    run.pk, number, day and day.isoformat(), reference[:50],
+                    line_amount and str(line_amount), description, status, transaction_id,
+                    json.dumps(candidates), note,
+                )
+                for (number, day, reference, line_amount, description, _), status, transaction_id, candidates, note
+                in results[start:start + chunk_size]
+            ])
+
+
+def reconcile(stream, name, source='bank', window_days=2, date_format=None, user=None, chunk_size=2000):
+    """Match a statement CSV against the ledger and store the results; returns the Reconciliation"""
+    started = time.perf_counter()
+    try:
+        lines = list(read_statement(stream, date_format))
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise StatementError(f'Could not read statement: {e}')
+    dates = [line[1] for line in lines if line[1] is not None]
+    window = timedelta(days=window_days)
+    if dates:
+        table, references, consumed = _ledger_slice(min(dates) - window, max(dates) + window)
+    else:
+        table, references, consumed = {}, set(), set()
+
+    counts = {'matched': 0, 'unmatched': 0, 'ambiguous': 0, 'invalid': 0}
+    amounts = {'matched': Decimal('0.00'), 'unmatched': Decimal('0.00')}
+    results = []
+    for line in lines:
+        status, transaction_id, candidates, note = _match(line, table, references, consumed, window_days)
+        if transaction_id:
+            consumed.add(transaction_id)
+        counts[status] += 1
+        if status in amounts:
+            amounts[status] += line[3]
+        results.append((line, status, transaction_id, candidates, note))
+
+    with db_transaction.atomic():
+        run = Reconciliation.objects.create(
+            name=name, source=source, window_days=window_days, created_by=user,
+            statement_from=min(dates) if dates else None, statement_to=max(dates) if dates else None,
+            total_lines=len(lines), matched_amount=amounts['matched'], unmatched_amount=amounts['unmatched'],
+            **counts,
+        )
+        _store_lines(run, results, chunk_size)
+        run.seconds = round(time.perf_counter() - started, 3)
+        run.save(update_fields=['seconds'])
+    return run
@@ -0,0 +1,132 @@
+"""
+Daily transaction rollups.
+
+``TransactionDailyRollup`` holds one row per local calendar day and
+transaction type with the count and total amount posted. Posting paths call
+``record`` inside their transaction, which adds to the day's row with an
+``INSERT ... ON CONFLICT DO UPDATE`` increment. ``rebuild`` recomputes any
+date range from the ledger. ``series`` answers report queries from the
+rollup alone, so their cost depends on the date range, not the ledger size.
+"""
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Transaction, TransactionDailyRollup
+
+
+CENT = Decimal('0.01')
+METRICS = [choice for choice, _ in Transaction.TRANSACTION_TYPE_CHOICES]
+GRANULARITIES = {'day': None, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def record(entries):
+    """Add posted Transaction objects to their days' rollup rows"""
+    totals = {}
+    for entry in entries:
+        key = (timezone.localdate(entry.created_at), entry.transaction_type)
+        count, amount = totals.get(key, (0, Decimal('0.00')))
+        totals[key] = (count + 1, amount + Decimal(entry.amount))
+    if not totals:
+        return
+
+    meta = TransactionDailyRollup._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    column = {name: quote(meta.get_field(name).column)
+              for name in ('date', 'transaction_type', 'count', 'amount', 'updated_at')}
+    amount_field = meta.get_field('amount')
+    now = meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} ({column['date']}, {column['transaction_type']}, {column['count']}, "
+            f"{column['amount']}, {column['updated_at']}) VALUES (%s, %s, %s, %s, %s) "
+            f"ON CONFLICT ({column['date']}, {column['transaction_type']}) DO UPDATE SET "
+            f"{column['count']} = {table}.{column['count']} + EXCLUDED.{column['count']}, "
+            f"{column['amount']} = {table}.{column['amount']} + EXCLUDED.{column['amount']}, "
+            f"{column['updated_at']} = EXCLUDED.{column['updated_at']}",
+            [
+                (day.isoformat(), transaction_type, count, amount_field.get_db_prep_value(amount, connection), now)
+                for (day, transaction_type), (count, amount) in sorted(totals.items())
+            ],
+        )
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def _money(value):
+    # SQLite sums decimal columns as floats
+    return Decimal('0.00') if value is None else Decimal(str(value)).quantize(CENT)
+
+
+def rebuild(date_from=None, date_to=None):
+    """Recompute the rollup rows for a date range (inclusive, default all) from the ledger; returns rows written"""
+    ledger = Transaction.objects.all()
+    if date_from is None or date_to is None:
+        bounds = ledger.aggregate(first=Min('created_at'), last=Max('created_at'))
+        if bounds['first'] is None:
+            TransactionDailyRollup.objects.all().delete()
+            return 0
+        date_from = date_from or timezone.localdate(bounds['first'])
+        date_to = date_to or timezone.localdate(bounds['last'])
+
+    rows = (
+        ledger.filter(created_at__gte=_day_start(date_from), created_at__lt=_day_start(date_to + timedelta(days=1)))
+        .annotate(day=TruncDate('created_at')).order_by()
+        .values('day', 'transaction_type').annotate(count=Count('pk'), amount=Sum('amount'))
+    )
+    with db_transaction.atomic():
+        TransactionDailyRollup.objects.filter(date__gte=date_from, date__lte=date_to).delete()
+        created = TransactionDailyRollup.objects.bulk_create([
+            TransactionDailyRollup(
+                date=row['day'], transaction_type=row['transaction_type'],
+                count=row['count'], amount=_money(row['amount']),
+            )
+            for row in rows
+        ], batch_size=1000)
+    return len(created)
+
+
+def _periods(granularity, date_from, date_to):
+    """Every period start from date_from's period up to date_to"""
+    if granularity == 'week':
+        current = date_from - timedelta(days=date_from.weekday())
+    elif granularity == 'month':
+        current = date_from.replace(day=1)
+    else:
+        current = date_from
+    while current <= date_to:
+        yield current
+        if granularity == 'week':
+            current += timedelta(days=7)
+        elif granularity == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=1)
+
+
+def series(metric, granularity, date_from, date_to):
+    """Count and amount per period for one transaction type (or 'all'), zero-filled"""
+    rows = TransactionDailyRollup.objects.filter(date__gte=date_from, date__lte=date_to)
+    if metric != 'all':
+        rows = rows.filter(transaction_type=metric)
+    trunc = GRANULARITIES[granularity]
+    totals = {
+        row['period']: row
+        for row in rows.annotate(period=trunc('date') if trunc else F('date')).order_by()
+        .values('period').annotate(count=Sum('count'), amount=Sum('amount'))
+    }
+    return [
+        {
+            'period': period.isoformat(),
+            'count': totals[period]['count'] if period in totals else 0,
+            'amount': str(_money(totals[period]['amount'] if period in totals else None)),
+        }
+        for period in _periods(granularity, date_from, date_to)
+    ]
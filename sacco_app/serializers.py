@@ -1,10 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.core.files.storage import default_storage
+from django.urls import reverse
 from django.contrib.auth.password_validation import validate_password
 from .models import (
-    User, Member, SavingsAccount, Loan, Transaction, Share, 
+    User, Member, MemberSummary, SavingsAccount, Loan, LoanSchedule, Transaction, Share, 
     Dividend, DividendPayment, News, FAQ, Download, Gallery, 
-    ContactInfo, CustomerFeedback, SystemSetting
+    ContactInfo, CustomerFeedback, SystemSetting, Reconciliation, ReconciliationLine
 )
 
 
@@ -84,6 +86,15 @@ class MemberSerializer(serializers.ModelSerializer):
         read_only_fields = ['member_id', 'created_at', 'updated_at']
 
 
+class MemberSummarySerializer(serializers.ModelSerializer):
+    """Member financial summary serializer"""
+    member_id = serializers.CharField(source='member.member_id', read_only=True)
+    
+    class Meta:
+        model = MemberSummary
+        exclude = ['id', 'member']
+
+
 class SavingsAccountSerializer(serializers.ModelSerializer):
     """Savings account serializer"""
     member_name = serializers.CharField(source='member.user.get_full_name', read_only=True)
@@ -101,7 +112,41 @@ class LoanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Loan
         fields = '__all__'
-        read_only_fields = ['loan_number', 'application_date', 'created_at', 'updated_at']
+        read_only_fields = [
+            'loan_number', 'application_date', 'monthly_payment', 'total_amount',
+            'remaining_balance', 'created_at', 'updated_at'
+        ]
+
+    # Terms the schedule and balances are priced from
+    TERM_FIELDS = ['amount', 'interest_rate', 'term_months', 'interest_method']
+    DISBURSED_STATUSES = ('active', 'completed', 'defaulted')
+
+    def validate_term_months(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Term must be at least one month')
+        return value
+
+    def validate(self, attrs):
+        # A disbursed loan's balance and the member's summary were posted
+        # from its terms, so they stay as they were disbursed
+        if self.instance is not None and self.instance.status in self.DISBURSED_STATUSES:
+            changed = [
+                name for name in self.TERM_FIELDS
+                if name in attrs and attrs[name] != getattr(self.instance, name)
+            ]
+            if changed:
+                raise serializers.ValidationError(
+                    {name: 'Cannot be changed once the loan is disbursed' for name in changed}
+                )
+        return attrs
+
+
+class LoanScheduleSerializer(serializers.ModelSerializer):
+    """Loan repayment schedule serializer"""
+    
+    class Meta:
+        model = LoanSchedule
+        exclude = ['loan', 'created_at']
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -114,6 +159,24 @@ class TransactionSerializer(serializers.ModelSerializer):
         read_only_fields = ['transaction_id', 'created_at']
 
 
+class ReconciliationSerializer(serializers.ModelSerializer):
+    """Statement reconciliation run serializer"""
+    created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True, default=None)
+    
+    class Meta:
+        model = Reconciliation
+        fields = '__all__'
+        read_only_fields = [field.name for field in Reconciliation._meta.fields]
+
+
+class ReconciliationLineSerializer(serializers.ModelSerializer):
+    """Statement line outcome serializer"""
+    
+    class Meta:
+        model = ReconciliationLine
+        exclude = ['reconciliation']
+
+
 class ShareSerializer(serializers.ModelSerializer):
     """Share serializer"""
     member_name = serializers.CharField(source='member.user.get_full_name', read_only=True)
@@ -143,13 +206,31 @@ class DividendPaymentSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """{format: srcset} of the resized copies of an image (see image_derivatives.py)"""
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image_variants')
+        super().__init__(**kwargs)
+    
+    def to_representation(self, variants):
+        absolute = self.context['request'].build_absolute_uri
+        srcset = {}
+        for entry in sorted((variants or {}).get('files', []), key=lambda entry: entry['width']):
+            srcset.setdefault(entry['format'], []).append(
+                f"{absolute(default_storage.url(entry['name']))} {entry['width']}w"
+            )
+        return {fmt: ', '.join(entries) for fmt, entries in srcset.items()} or None
+
+
 class NewsSerializer(serializers.ModelSerializer):
     """News serializer"""
     author_name = serializers.CharField(source='author.get_full_name', read_only=True)
+    srcset = ImageSrcsetField()
     
     class Meta:
         model = News
-        fields = '__all__'
+        exclude = ['image_variants']
         read_only_fields = ['author', 'created_at', 'updated_at']
 
 
@@ -172,8 +253,9 @@ class DownloadSerializer(serializers.ModelSerializer):
         read_only_fields = ['uploaded_by', 'download_count', 'created_at', 'updated_at']
     
     def get_file_url(self, obj):
+        # Served by the API, which names the file as it was uploaded
         if obj.file:
-            return self.context['request'].build_absolute_uri(obj.file.url)
+            return self.context['request'].build_absolute_uri(reverse('download-file', args=[obj.pk]))
         return None
 
 
@@ -181,10 +263,11 @@ class GallerySerializer(serializers.ModelSerializer):
     """Gallery serializer"""
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
     image_url = serializers.SerializerMethodField()
+    srcset = ImageSrcsetField()
     
     class Meta:
         model = Gallery
-        fields = '__all__'
+        exclude = ['image_variants']
         read_only_fields = ['uploaded_by', 'created_at', 'updated_at']
     
     def get_image_url(self, obj):
@@ -230,4 +313,17 @@ class DashboardStatsSerializer(serializers.Serializer):
     published_news = serializers.IntegerField()
     active_faqs = serializers.IntegerField()
     active_downloads = serializers.IntegerField()
-    active_gallery = serializers.IntegerField() 
\ No newline at end of file
+    active_gallery = serializers.IntegerField()
+    total_members = serializers.IntegerField()
+    active_members = serializers.IntegerField()
+    total_deposits = serializers.DecimalField(max_digits=14, decimal_places=2)
+    loan_book = serializers.DecimalField(max_digits=14, decimal_places=2)
+    active_loans = serializers.IntegerField()
+    pending_loans = serializers.IntegerField()
+    par30_balance = serializers.DecimalField(max_digits=14, decimal_places=2)
+    par30_ratio = serializers.DecimalField(max_digits=5, decimal_places=2)
+    transactions_today = serializers.IntegerField()
+    transaction_volume_today = serializers.DecimalField(max_digits=14, decimal_places=2)
+    deposits_today = serializers.DecimalField(max_digits=14, decimal_places=2)
+    withdrawals_today = serializers.DecimalField(max_digits=14, decimal_places=2)
+    generated_at = serializers.DateTimeField() 
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Read-only fast path for high-volume list endpoints.
+
+``FastReadSerializer`` inspects an existing DRF serializer once, works out
+which ``.values()`` columns each output field needs and precompiles a
+converter per field. Rows are then rendered straight from ``.values()``
+dicts without instantiating models or per-row field objects, producing the
+same JSON as the original serializer.
+"""
+import decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import fields, relations
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+# Model methods the serializers expose through ``source``, rebuilt from columns
+METHOD_SOURCES = {
+    'get_full_name': (('first_name', 'last_name'), lambda first, last: f"{first} {last}".strip()),
+}
+
+
+def _identity(value):
+    return value
+
+
+def _decimal_converter(field):
+    coerce = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or field.decimal_places is None:
+        return field.to_representation
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        quantized = value.quantize(exponent, rounding=rounding, context=context)
+        return '{:f}'.format(quantized) if coerce else quantized
+    return convert
+
+
+def _datetime_converter(field):
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() != 'iso-8601':
+        return field.to_representation
+
+    def convert(value):
+        if not value:
+            return None
+        if timezone.is_aware(value):
+            value = value.astimezone(timezone.get_current_timezone())
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _date_converter(field):
+    if getattr(field, 'format', api_settings.DATE_FORMAT).lower() != 'iso-8601':
+        return field.to_representation
+    return lambda value: value.isoformat() if value else None
+
+
+def _converter(field):
+    """Pick the cheapest converter that matches field.to_representation"""
+    if isinstance(field, fields.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, fields.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, fields.DateField):
+        return _date_converter(field)
+    if isinstance(field, fields.ChoiceField):
+        choices = field.choice_strings_to_values
+        return lambda value: choices.get(str(value), value) if value != '' else value
+    if isinstance(field, fields.IntegerField):
+        return int
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        return _identity
+    if isinstance(field, fields.BooleanField):
+        return bool
+    if isinstance(field, fields.CharField):
+        return str
+    return field.to_representation
+
+
+class FastReadSerializer:
+    """Render rows of ``serializer_class`` directly from ``.values()``"""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        # Built lazily: serializer fields can only be built once apps are ready
+        if self._compiled is None:
+            self._compiled = self._compile()
+        return self._compiled
+
+    def _compile(self):
+        plan = []
+        columns = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (fields.SerializerMethodField, relations.ManyRelatedField)) or hasattr(field, 'fields'):
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{name} cannot be rendered from .values()'
+                )
+            attrs = list(field.source_attrs)
+            if attrs[-1] in METHOD_SOURCES:
+                parts, combine = METHOD_SOURCES[attrs[-1]]
+                keys = ['__'.join(attrs[:-1] + [part]) for part in parts]
+            else:
+                keys, combine = ['__'.join(attrs)], None
+            columns.extend(key for key in keys if key not in columns)
+            plan.append((name, keys, combine, _converter(field)))
+        return plan, columns
+
+    def values(self, queryset):
+        """The queryset narrowed to the columns the output needs"""
+        _, columns = self.compiled
+        return queryset.values(*columns)
+
+    def render_row(self, row):
+        plan, _ = self.compiled
+        data = {}
+        for name, keys, combine, convert in plan:
+            if combine is None:
+                value = row[keys[0]]
+            else:
+                value = combine(*(row[key] for key in keys))
+            data[name] = None if value is None else convert(value)
+        return data
+
+    def render(self, rows):
+        return [self.render_row(row) for row in rows]
+
+
+class FastListMixin:
+    """Serve ``list`` through the viewset's ``fast_serializer``"""
+    fast_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.fast_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fast_serializer.render(page))
+        return Response(self.fast_serializer.render(queryset))
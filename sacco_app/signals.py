@@ -0,0 +1,177 @@
+"""
+Keep derived data current when records change through the ORM.
+
+Posting paths update balances with queryset ``update()`` calls, which send
+no signals, and adjust member summaries themselves; these receivers cover
+everything else (API and admin edits, approvals, deletes).
+"""
+from django.db import transaction as db_transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    User, Member, SavingsAccount, Loan, Share, DividendPayment, News, FAQ, Download, Gallery, ContactInfo,
+    CustomerFeedback
+)
+from . import content_search, dashboard, image_derivatives, member_search, public_cache, snapshots, summaries
+from .storage import content_storage
+
+
+@receiver(post_save, sender=Member)
+def member_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        summaries.schedule_refresh(instance.pk)
+
+
+# Fields whose change alters a member's search document
+SEARCHED_FIELDS = {
+    User: {'first_name', 'last_name', 'email', 'phone_number'},
+    Member: {'member_id', 'user'},
+    SavingsAccount: {'account_number', 'member'},
+}
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Member)
+@receiver(post_save, sender=SavingsAccount)
+@receiver(post_delete, sender=SavingsAccount)
+def member_search_text_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Saves such as the last_login stamp on every login do not touch the index
+    if raw or (update_fields and not SEARCHED_FIELDS[sender] & set(update_fields)):
+        return
+    if sender is User:
+        member_search.schedule_update(user_id=instance.pk)
+    else:
+        member_search.schedule_update(member_id=instance.pk if sender is Member else instance.member_id)
+
+
+# Content kind of each searched model, and the fields its document is built from
+SEARCHED_CONTENT = {
+    News: ('news', {'title', 'content', 'is_published', 'published_date'}),
+    FAQ: ('faq', {'question', 'answer', 'category', 'is_active'}),
+    Download: ('download', {'title', 'description', 'file_type', 'is_active'}),
+}
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+@receiver(post_save, sender=Download)
+@receiver(post_delete, sender=Download)
+def content_text_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    kind, fields = SEARCHED_CONTENT[sender]
+    if raw or (update_fields and not fields & set(update_fields)):
+        return
+    content_search.schedule_update(kind, instance.pk)
+
+
+# Public collection each content model is served in (see public_cache.py)
+PUBLIC_COLLECTIONS = {News: 'news', FAQ: 'faqs', Download: 'downloads', Gallery: 'gallery', ContactInfo: 'contact-info'}
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+@receiver(post_save, sender=Download)
+@receiver(post_delete, sender=Download)
+@receiver(post_save, sender=Gallery)
+@receiver(post_delete, sender=Gallery)
+@receiver(post_save, sender=ContactInfo)
+@receiver(post_delete, sender=ContactInfo)
+def public_content_changed(sender, raw=False, **kwargs):
+    if not raw:
+        db_transaction.on_commit(lambda: public_collection_changed(PUBLIC_COLLECTIONS[sender]))
+
+
+@receiver(post_save, sender=User)
+def public_author_changed(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # News, downloads and gallery items are listed with their author's name
+    if raw or created or (update_fields and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    for name in ('news', 'downloads', 'gallery'):
+        db_transaction.on_commit(lambda name=name: public_collection_changed(name))
+
+
+def public_collection_changed(name):
+    public_cache.invalidate(name)
+    snapshots.schedule(name)
+
+
+# Derivative kind of each model with resized image copies
+DERIVED_IMAGES = {News: 'news', Gallery: 'gallery'}
+
+
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=Gallery)
+def image_changed(sender, instance, raw=False, **kwargs):
+    if raw or image_derivatives.is_current(instance):
+        return
+    db_transaction.on_commit(lambda: image_derivatives.schedule(DERIVED_IMAGES[sender], instance.pk))
+
+
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=Gallery)
+def image_deleted(sender, instance, **kwargs):
+    image_derivatives.discard(instance.image_variants)
+
+
+# File field of each model kept in the content-addressed store (see storage.py)
+STORED_FILES = {Download: 'file', Gallery: 'image', News: 'image'}
+
+
+@receiver(pre_save, sender=Download)
+@receiver(pre_save, sender=Gallery)
+@receiver(pre_save, sender=News)
+def stored_file_replaced(sender, instance, raw=False, update_fields=None, **kwargs):
+    field = STORED_FILES[sender]
+    if raw or instance.pk is None or (update_fields is not None and field not in update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    if previous and previous != getattr(instance, field).name:
+        # Released once the change commits, so a rollback keeps the old file's reference
+        db_transaction.on_commit(lambda: content_storage().delete(previous))
+
+
+@receiver(post_delete, sender=Download)
+@receiver(post_delete, sender=Gallery)
+@receiver(post_delete, sender=News)
+def stored_file_deleted(sender, instance, **kwargs):
+    name = getattr(instance, STORED_FILES[sender]).name
+    if name:
+        db_transaction.on_commit(lambda: content_storage().delete(name))
+
+
+@receiver(post_save, sender=SavingsAccount)
+@receiver(post_delete, sender=SavingsAccount)
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+@receiver(post_save, sender=Share)
+@receiver(post_delete, sender=Share)
+@receiver(post_save, sender=DividendPayment)
+@receiver(post_delete, sender=DividendPayment)
+def member_figures_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        summaries.schedule_refresh(instance.member_id)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+@receiver(post_save, sender=Download)
+@receiver(post_delete, sender=Download)
+@receiver(post_save, sender=Gallery)
+@receiver(post_delete, sender=Gallery)
+@receiver(post_save, sender=CustomerFeedback)
+@receiver(post_delete, sender=CustomerFeedback)
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=SavingsAccount)
+@receiver(post_delete, sender=SavingsAccount)
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+def dashboard_figures_changed(sender, raw=False, **kwargs):
+    if not raw:
+        db_transaction.on_commit(dashboard.invalidate)
@@ -0,0 +1,123 @@
+"""
+Static JSON snapshots of the public collections.
+
+``publish`` writes ``<name>.json`` for news, FAQs, downloads, gallery and
+contact info into ``SNAPSHOT_DIR``. Each holds what the matching
+/api/public/ endpoint returns. Next to it are ``.json.gz`` and, when the
+brotli package is installed, ``.json.br`` for static file servers that serve
+precompressed files. Every file is written to a temporary name and renamed
+into place, so readers never see a partial file. A snapshot whose content
+has not changed is left alone.
+
+signals.py calls ``schedule`` after every change. It queues one publish job
+per collection, ``SNAPSHOT_DEBOUNCE_SECONDS`` ahead, and the changes made in
+the meantime ride along with it.
+"""
+import gzip
+import os
+import tempfile
+from pathlib import Path
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+from . import jobs
+from .models import News, FAQ, Download, Gallery, ContactInfo, Job
+from .serializers import NewsSerializer, FAQSerializer, DownloadSerializer, GallerySerializer, ContactInfoSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# name -> (rows as the public endpoint lists them, serializer)
+COLLECTIONS = {
+    'news': (
+        lambda: News.objects.filter(is_published=True).select_related('author')
+        .order_by(F('published_date').desc(nulls_last=True), '-id'),
+        NewsSerializer,
+    ),
+    'faqs': (lambda: FAQ.objects.filter(is_active=True).order_by('order', 'created_at'), FAQSerializer),
+    'downloads': (
+        lambda: Download.objects.filter(is_active=True).select_related('uploaded_by').order_by('-created_at', '-id'),
+        DownloadSerializer,
+    ),
+    'gallery': (
+        lambda: Gallery.objects.filter(is_active=True).select_related('uploaded_by').order_by('-created_at', '-id'),
+        GallerySerializer,
+    ),
+    'contact-info': (lambda: ContactInfo.objects.filter(is_active=True).order_by('branch'), ContactInfoSerializer),
+}
+
+
+class _Links:
+    """Stands in for the request the serializers build file and image URLs from"""
+
+    def build_absolute_uri(self, location):
+        return urljoin(settings.SNAPSHOT_BASE_URL, location)
+
+
+def render(name):
+    """The JSON bytes of a collection's snapshot"""
+    rows, serializer_class = COLLECTIONS[name]
+    return JSONRenderer().render(serializer_class(rows(), many=True, context={'request': _Links()}).data)
+
+
+def _compressed(data):
+    """{suffix: bytes} of each precompressed variant"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+def write_atomic(path, data):
+    """Replace path with data in one rename, so readers see the old file or the new one"""
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+
+
+def publish(names=None, directory=None):
+    """Write the snapshots of the given collections (default all); returns {name: bytes written or 0}"""
+    directory = Path(directory or settings.SNAPSHOT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    written = {}
+    for name in names or COLLECTIONS:
+        data = render(name)
+        path = directory / f'{name}.json'
+        suffixes = ['.gz', '.br'] if brotli is not None else ['.gz']
+        if path.exists() and path.read_bytes() == data and all(
+            path.with_name(path.name + suffix).exists() for suffix in suffixes
+        ):
+            written[name] = 0
+            continue
+        for suffix, body in _compressed(data).items():
+            write_atomic(path.with_name(path.name + suffix), body)
+        # The plain file goes last: a rewrite is due whenever it differs
+        write_atomic(path, data)
+        written[name] = len(data)
+    return written
+
+
+def publish_job(names):
+    publish(names)
+
+
+def schedule(name):
+    """Queue a publish of one collection unless one is already waiting"""
+    if Job.objects.filter(task=jobs.task_path(publish_job), status='queued', args=[[name]]).exists():
+        return
+    jobs.enqueue(publish_job, [name], delay=settings.SNAPSHOT_DEBOUNCE_SECONDS)
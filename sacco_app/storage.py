@@ -0,0 +1,271 @@
+"""
+Content-addressed storage for uploaded downloads, gallery and news images.
+
+Re-uploading a file used to store another copy of it under a suffixed name.
+``ContentAddressedStorage`` instead names every upload after its content:
+
+* the upload is hashed with SHA-256 while it is copied to a temporary file,
+  in chunks, so large files are never held in memory;
+* it is kept once, as ``blobs/<aa>/<sha256><ext>``. An upload whose blob
+  already exists is dropped and the existing name returned;
+* ``StoredBlob`` counts the references to each blob. Saving a file adds
+  one; ``delete``, which signals.py calls once a row's file is replaced or
+  the row deleted, takes one away.
+
+A blob left without references is removed by ``sweep`` an hour later, in a
+background job, unless an upload has claimed it again meanwhile. Removing
+it in the same transaction as its ``StoredBlob`` row means an upload of the
+same content waits for the removal and then writes the file anew.
+
+The reference a save takes is counted as the file is stored, before the
+row is written; models save inside ``saving``, which undoes it if the row
+write fails. Blob names say nothing of the uploaded file's name, so
+``Download`` keeps that as ``original_name`` to serve the file under.
+
+Files stored before this (not under ``blobs/``) are left alone by
+``delete``; ``manage.py dedupe_media`` moves them into the store.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+PREFIX = 'blobs'
+CHUNK_SIZE = 1024 * 1024
+# How long an unreferenced blob is kept for a row that may still name it
+GRACE = timedelta(hours=1)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores each distinct upload once, named by its SHA-256"""
+
+    def get_available_name(self, name, max_length=None):
+        # Names are chosen by _save from the content
+        return name
+
+    def blob_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        return f'{PREFIX}/{digest[:2]}/{digest}{extension}'
+
+    def spool(self, content):
+        """Copy a File to a temporary file next to the blobs; returns (sha256, size, temporary path)"""
+        directory = os.path.join(self.location, PREFIX)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    handle.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return digest.hexdigest(), size, temporary
+
+    def ingest(self, digest, size, temporary, name, references=1):
+        """Count references to the blob of a spooled file, moving it into place unless it is there"""
+        from .models import StoredBlob
+
+        blob = self.blob_name(digest, name)
+        path = self.path(blob)
+        # The row first: a sweep removing the blob holds it until the file is gone
+        created = False
+        if not StoredBlob.objects.filter(name=blob).update(
+            ref_count=F('ref_count') + references, updated_at=timezone.now()
+        ):
+            try:
+                with transaction.atomic():
+                    StoredBlob.objects.create(name=blob, sha256=digest, size=size, ref_count=references)
+                created = True
+            except IntegrityError:
+                # Another upload of the same content created it meanwhile
+                StoredBlob.objects.filter(name=blob).update(
+                    ref_count=F('ref_count') + references, updated_at=timezone.now()
+                )
+        if os.path.exists(path) and not created:
+            os.unlink(temporary)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, path)
+        return blob
+
+    def _save(self, name, content):
+        return self.ingest(*self.spool(content), name)
+
+    def delete(self, name):
+        """Drop one reference to a blob; sweep removes it once none are left"""
+        from .models import StoredBlob
+
+        if not name or not name.startswith(f'{PREFIX}/'):
+            return
+        if StoredBlob.objects.filter(name=name, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1, updated_at=timezone.now()
+        ):
+            schedule_sweep()
+
+
+_storage = ContentAddressedStorage()
+
+
+@contextmanager
+def saving(instance, field_names):
+    """
+    Around a model save: run it in a savepoint, so a failed row write also
+    rolls back the references its uploads took. A blob the failed save
+    stored is left with none, for sweep to remove.
+    """
+    from .models import StoredBlob
+
+    uploading = [name for name in field_names if getattr(instance, name) and not getattr(instance, name)._committed]
+    try:
+        with transaction.atomic():
+            yield
+    except Exception:
+        for field_name in uploading:
+            name = getattr(instance, field_name).name
+            if getattr(instance, field_name)._committed and name.startswith(f'{PREFIX}/'):
+                # The savepoint took away the row the upload created, if it did
+                StoredBlob.objects.get_or_create(name=name, defaults={
+                    'sha256': os.path.splitext(os.path.basename(name))[0],
+                    'size': _storage.size(name) if _storage.exists(name) else 0,
+                    'ref_count': 0,
+                })
+                schedule_sweep()
+        raise
+
+
+def content_storage():
+    """The storage of the deduplicated file fields (a callable, so migrations name it rather than copy it)"""
+    return _storage
+
+
+def fields():
+    """(model, field name) of every file field kept in the content-addressed store"""
+    from .models import News, Download, Gallery
+
+    return [(Download, 'file'), (Gallery, 'image'), (News, 'image')]
+
+
+def referenced(name):
+    """Rows whose file field names the blob"""
+    return sum(model.objects.filter(**{field: name}).count() for model, field in fields())
+
+
+def recount():
+    """Set every blob's reference count from the rows naming it; returns the counts corrected"""
+    from .models import StoredBlob
+
+    references = {}
+    for model, field in fields():
+        for name in model.objects.filter(**{f'{field}__startswith': f'{PREFIX}/'}).values_list(field, flat=True):
+            references[name] = references.get(name, 0) + 1
+    corrected = 0
+    for pk, name, count in list(StoredBlob.objects.values_list('pk', 'name', 'ref_count')):
+        if count != references.get(name, 0):
+            StoredBlob.objects.filter(pk=pk).update(ref_count=references.get(name, 0), updated_at=timezone.now())
+            corrected += 1
+    return corrected
+
+
+def sweep(grace=GRACE):
+    """Remove the blobs unreferenced for longer than grace; returns (blobs, bytes) removed"""
+    from .models import StoredBlob
+
+    cutoff = timezone.now() - grace
+    removed = removed_bytes = 0
+    for pk, name, size in list(
+        StoredBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).values_list('pk', 'name', 'size')
+    ):
+        count = referenced(name)
+        if count:
+            # Named by rows that were never counted, such as a copied file name
+            StoredBlob.objects.filter(pk=pk).update(ref_count=count, updated_at=timezone.now())
+            continue
+        with transaction.atomic():
+            if not StoredBlob.objects.filter(pk=pk, ref_count=0, updated_at__lt=cutoff).delete()[0]:
+                continue
+            FileSystemStorage.delete(_storage, name)
+        removed += 1
+        removed_bytes += size
+    return removed, removed_bytes
+
+
+def sweep_job():
+    sweep()
+
+
+def schedule_sweep():
+    """Queue a sweep for after the grace period unless one is already waiting"""
+    from . import jobs
+    from .models import Job
+
+    if not Job.objects.filter(task=jobs.task_path(sweep_job), status='queued').exists():
+        jobs.enqueue(sweep_job, delay=GRACE.total_seconds() + 60)
+
+
+def dedupe_existing(dry_run=False):
+    """
+    Move the files stored before content addressing into the store, one blob
+    per distinct content, and point their rows at the blobs; returns a report
+    dict. The old files are deleted once their rows are updated.
+    """
+    report = {'files': 0, 'rows': 0, 'blobs': 0, 'bytes_before': 0, 'bytes_after': 0, 'missing': []}
+    holders = {}
+    for model, field in fields():
+        rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).exclude(
+            **{f'{field}__startswith': f'{PREFIX}/'}
+        )
+        for pk, name in rows.values_list('pk', field):
+            holders.setdefault(name, []).append((model, field, pk))
+    planned = set()
+    for name, rows in holders.items():
+        if not _storage.exists(name):
+            report['missing'].append(name)
+            continue
+        with _storage.open(name, 'rb') as handle:
+            digest, size, temporary = _storage.spool(File(handle))
+        blob = _storage.blob_name(digest, name)
+        report['files'] += 1
+        report['rows'] += len(rows)
+        report['bytes_before'] += size
+        if blob not in planned and not _storage.exists(blob):
+            report['blobs'] += 1
+            report['bytes_after'] += size
+        planned.add(blob)
+        if dry_run:
+            os.unlink(temporary)
+            continue
+        with transaction.atomic():
+            _storage.ingest(digest, size, temporary, name, references=len(rows))
+            for model, field, pk in rows:
+                _repoint(model, field, pk, name, blob, size)
+        FileSystemStorage.delete(_storage, name)
+    report['bytes_reclaimed'] = report['bytes_before'] - report['bytes_after']
+    return report
+
+
+def _repoint(model, field, pk, name, blob, size):
+    """Make a row name blob instead of its old file, keeping what was recorded about the file"""
+    values = {field: blob}
+    if field == 'file':
+        values['file_size'] = size
+        # The blob's name no longer says what the file was called
+        model.objects.filter(pk=pk, original_name='').update(original_name=os.path.basename(name))
+    else:
+        variants = model.objects.filter(pk=pk).values_list('image_variants', flat=True).first()
+        if variants and variants.get('source') == name:
+            # Still the copies of this content; see image_derivatives.py
+            values['image_variants'] = {**variants, 'source': blob}
+    model.objects.filter(pk=pk, **{field: name}).update(**values)
@@ -0,0 +1,202 @@
+"""
+Member financial summaries.
+
+``MemberSummary`` keeps one row per member with the totals member screens
+need, so they read one row instead of aggregating four tables.
+
+* Posting paths apply their own deltas with relative updates inside the
+  posting transaction (``adjust`` / ``adjust_many``).
+* ORM saves and deletes of accounts, loans, shares and dividend payments
+  recompute the affected members once the transaction commits (signals.py).
+* ``rebuild`` recomputes rows from the source tables, reporting and
+  optionally fixing any that drifted.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Member, SavingsAccount, Loan, Transaction, Share, DividendPayment, MemberSummary
+
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+OUTSTANDING_STATUSES = ('active', 'defaulted')
+MONEY_FIELDS = ('total_savings', 'outstanding_loans', 'share_value', 'unpaid_dividends')
+FIELDS = MONEY_FIELDS + ('share_count', 'last_transaction_at')
+
+_pending = threading.local()
+
+
+def _money(value):
+    # SQLite sums decimal columns as floats
+    return ZERO if value is None else Decimal(str(value)).quantize(CENT)
+
+
+def _grouped(queryset, **aggregates):
+    """{member id: aggregates} for a per-member GROUP BY"""
+    rows = queryset.order_by().values('member').annotate(**aggregates)
+    return {row.pop('member'): row for row in rows}
+
+
+def compute(member_ids):
+    """Current totals for each member id, straight from the source tables"""
+    member_ids = list(member_ids)
+    savings = _grouped(SavingsAccount.objects.filter(member_id__in=member_ids), total=Sum('balance'))
+    loans = _grouped(
+        Loan.objects.filter(member_id__in=member_ids, status__in=OUTSTANDING_STATUSES), total=Sum('remaining_balance')
+    )
+    shares = _grouped(
+        Share.objects.filter(member_id__in=member_ids, is_active=True), count=Sum('quantity'), value=Sum('total_value')
+    )
+    dividends = _grouped(
+        DividendPayment.objects.filter(member_id__in=member_ids, is_paid=False), total=Sum('amount')
+    )
+    transactions = _grouped(Transaction.objects.filter(member_id__in=member_ids), last=Max('created_at'))
+    return {
+        member_id: {
+            'total_savings': _money(savings.get(member_id, {}).get('total')),
+            'outstanding_loans': _money(loans.get(member_id, {}).get('total')),
+            'share_count': shares.get(member_id, {}).get('count') or 0,
+            'share_value': _money(shares.get(member_id, {}).get('value')),
+            'unpaid_dividends': _money(dividends.get(member_id, {}).get('total')),
+            'last_transaction_at': transactions.get(member_id, {}).get('last'),
+        }
+        for member_id in member_ids
+    }
+
+
+def refresh(member_ids, chunk_size=500):
+    """Recompute and upsert the summaries of the given members"""
+    member_ids = list(member_ids)
+    for start in range(0, len(member_ids), chunk_size):
+        # Members deleted in the meantime have no summary to write
+        existing = Member.objects.filter(pk__in=member_ids[start:start + chunk_size]).values_list('pk', flat=True)
+        _upsert(compute(existing))
+
+
+def _upsert(totals):
+    MemberSummary.objects.bulk_create(
+        [MemberSummary(member_id=member_id, **values) for member_id, values in totals.items()],
+        update_conflicts=True, unique_fields=['member'], update_fields=list(FIELDS) + ['updated_at'],
+    )
+
+
+def adjust(member_id, savings=ZERO, loans=ZERO, dividends=ZERO, at=None):
+    """Apply one posting's deltas to a member's summary (call inside the posting transaction)"""
+    values = {'updated_at': timezone.now()}
+    for field, delta in (('total_savings', savings), ('outstanding_loans', loans), ('unpaid_dividends', dividends)):
+        if delta:
+            values[field] = F(field) + delta
+    if at is not None:
+        values['last_transaction_at'] = Greatest(Coalesce('last_transaction_at', Value(at)), Value(at))
+    if not MemberSummary.objects.filter(member_id=member_id).update(**values):
+        # No row yet: computing it now already includes this posting
+        refresh([member_id])
+
+
+def adjust_many(deltas):
+    """
+    Apply {member id: (savings, loans, dividends, last transaction time)} in one prepared statement.
+
+    Call inside the posting transaction, after the posting's own writes.
+    """
+    if not deltas:
+        return
+    meta = MemberSummary._meta
+    quote = connection.ops.quote_name
+    column = {name: quote(meta.get_field(name).column) for name in FIELDS + ('updated_at', 'member')}
+    money = [meta.get_field(name) for name in ('total_savings', 'outstanding_loans', 'unpaid_dividends')]
+    stamp = meta.get_field('last_transaction_at')
+    last = column['last_transaction_at']
+    sql = (
+        f"UPDATE {quote(meta.db_table)} SET "
+        f"{column['total_savings']} = {column['total_savings']} + %s, "
+        f"{column['outstanding_loans']} = {column['outstanding_loans']} + %s, "
+        f"{column['unpaid_dividends']} = {column['unpaid_dividends']} + %s, "
+        f"{last} = CASE WHEN {last} IS NULL OR {last} < %s THEN %s ELSE {last} END, "
+        f"{column['updated_at']} = %s WHERE {column['member']} = %s"
+    )
+    now = meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+    params = []
+    for member_id, (*values, at) in deltas.items():
+        at = stamp.get_db_prep_value(at, connection)
+        params.append(
+            [field.get_db_prep_value(delta, connection) for field, delta in zip(money, values)]
+            + [at, at, now, member_id]
+        )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+        updated = cursor.rowcount
+    if updated != len(deltas):
+        have = set(MemberSummary.objects.filter(member_id__in=deltas).values_list('member_id', flat=True))
+        refresh(member_id for member_id in deltas if member_id not in have)
+
+
+def schedule_refresh(member_id):
+    """Recompute a member's summary once the current transaction commits"""
+    pending = getattr(_pending, 'members', None)
+    if pending is None:
+        pending = _pending.members = set()
+    pending.add(member_id)
+    # One callback per call: if a savepoint rolls back its callback, the ids
+    # stay pending and the next callback to run picks them up
+    db_transaction.on_commit(_flush)
+
+
+def _flush():
+    pending = getattr(_pending, 'members', None)
+    if pending:
+        members, _pending.members = pending, set()
+        refresh(members)
+
+
+def rebuild(chunk_size=2000, fix=True):
+    """Compare every member's summary with the source tables; returns a report dict"""
+    started = time.perf_counter()
+    members = drifted = missing = 0
+    examples = []
+    last_pk = 0
+    while True:
+        member_ids = list(
+            Member.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not member_ids:
+            break
+        last_pk = member_ids[-1]
+        members += len(member_ids)
+        expected = compute(member_ids)
+        stored = {
+            row['member_id']: row
+            for row in MemberSummary.objects.filter(member_id__in=member_ids).values('member_id', *FIELDS)
+        }
+        wrong = {}
+        for member_id, values in expected.items():
+            row = stored.get(member_id)
+            if row is None:
+                missing += 1
+                wrong[member_id] = values
+                continue
+            actual = {field: _money(row[field]) if field in MONEY_FIELDS else row[field] for field in FIELDS}
+            if actual != values:
+                drifted += 1
+                wrong[member_id] = values
+                if len(examples) < 10:
+                    examples.append({
+                        'member': member_id,
+                        'fields': [field for field in FIELDS if actual[field] != values[field]],
+                    })
+        if fix and wrong:
+            _upsert(wrong)
+    return {
+        'members': members,
+        'missing': missing,
+        'drifted': drifted,
+        'fixed': (missing + drifted) if fix else 0,
+        'examples': examples,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
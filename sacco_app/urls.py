@@ -19,6 +19,7 @@ router.register(r'members', views_financial.MemberViewSet)
 router.register(r'savings-accounts', views_financial.SavingsAccountViewSet)
 router.register(r'loans', views_financial.LoanViewSet)
 router.register(r'transactions', views_financial.TransactionViewSet)
+router.register(r'reconciliations', views_financial.ReconciliationViewSet)
 
 # Shares and dividends
 router.register(r'shares', views.ShareViewSet)
@@ -43,11 +44,18 @@ urlpatterns = [
     # Dashboard endpoint
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
     
+    # Reports
+    path('reports/timeseries/', views_financial.TimeseriesReportView.as_view(), name='reports-timeseries'),
+    
+    # Resized image cache counters
+    path('media/resize-stats/', views_content.ResizedImageStatsView.as_view(), name='media-resize-stats'),
+    
     # Public endpoints (no authentication required)
     path('public/news/', views_content.NewsViewSet.as_view({'get': 'published'}), name='public-news'),
     path('public/faqs/', views_content.FAQViewSet.as_view({'get': 'active'}), name='public-faqs'),
     path('public/downloads/', views_content.DownloadViewSet.as_view({'get': 'active'}), name='public-downloads'),
     path('public/gallery/', views_content.GalleryViewSet.as_view({'get': 'active'}), name='public-gallery'),
+    path('public/search/', views_content.PublicSearchView.as_view(), name='public-search'),
     path('public/contact-info/', views_content.ContactInfoViewSet.as_view({'get': 'active'}), name='public-contact-info'),
     path('public/feedback/submit/', views.CustomerFeedbackViewSet.as_view({'post': 'submit_feedback'}), name='submit-feedback'),
 ] 
\ No newline at end of file
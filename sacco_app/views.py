@@ -7,7 +7,6 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.core.mail import send_mail
 from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse
@@ -25,6 +24,9 @@ from .serializers import (
     FAQSerializer, DownloadSerializer, GallerySerializer, ContactInfoSerializer,
     CustomerFeedbackSerializer, SystemSettingSerializer, DashboardStatsSerializer
 )
+from .pagination import OptInKeysetPagination
+from .serializers_fast import FastListMixin, FastReadSerializer
+from . import dashboard, dividends, outbox
 
 
 class IsAdminUser(permissions.BasePermission):
@@ -67,16 +69,11 @@ class AuthViewSet(viewsets.ViewSet):
             
             # Send email notification for admin logins
             if user.role in ['admin', 'manager']:
-                try:
-                    send_mail(
-                        'Admin Login Notification',
-                        f'Admin user {user.username} logged in at {timezone.now()}',
-                        settings.DEFAULT_FROM_EMAIL,
-                        [settings.DEFAULT_FROM_EMAIL],
-                        fail_silently=True,
-                    )
-                except Exception as e:
-                    print(f"Email notification failed: {e}")
+                outbox.send(
+                    'Admin Login Notification',
+                    f'Admin user {user.username} logged in at {timezone.now()}',
+                    [settings.DEFAULT_FROM_EMAIL],
+                )
             
             return Response({
                 'user': UserSerializer(user).data,
@@ -139,7 +136,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
 class ShareViewSet(viewsets.ModelViewSet):
     """Share management views"""
-    queryset = Share.objects.all()
+    queryset = Share.objects.select_related('member__user')
     serializer_class = ShareSerializer
     permission_classes = [IsFinanceOfficer]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -161,29 +158,35 @@ class DividendViewSet(viewsets.ModelViewSet):
     def calculate_payments(self, request, pk=None):
         """Calculate dividend payments for all members"""
         dividend = self.get_object()
+        report = dividends.calculate_payments(dividend)
         
-        # Get all active shares
-        shares = Share.objects.filter(is_active=True)
-        
-        for share in shares:
-            amount = share.quantity * dividend.amount_per_share
-            DividendPayment.objects.get_or_create(
-                dividend=dividend,
-                member=share.member,
-                defaults={
-                    'shares_owned': share.quantity,
-                    'amount': amount,
-                }
-            )
-        
-        return Response({'message': 'Dividend payments calculated successfully'})
+        return Response({'message': 'Dividend payments calculated successfully', **report})
+    
+    @action(detail=True, methods=['post'])
+    def payout(self, request, pk=None):
+        """Queue paying unpaid dividend payments into members' savings accounts"""
+        dividend = self.get_object()
+        payout = dividends.schedule_payout(dividend)
+        return Response({
+            'message': 'Dividend payout queued',
+            'dividend': dividend.pk,
+            'payout': payout.pk,
+            'progress_url': request.build_absolute_uri(),
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @payout.mapping.get
+    def payout_progress(self, request, pk=None):
+        """Progress of the dividend's latest payout"""
+        return Response(dividends.payout_progress(self.get_object()))
 
 
-class DividendPaymentViewSet(viewsets.ModelViewSet):
+class DividendPaymentViewSet(FastListMixin, viewsets.ModelViewSet):
     """Dividend payment views"""
-    queryset = DividendPayment.objects.all()
+    queryset = DividendPayment.objects.select_related('member__user', 'dividend')
     serializer_class = DividendPaymentSerializer
+    fast_serializer = FastReadSerializer(DividendPaymentSerializer)
     permission_classes = [IsFinanceOfficer]
+    pagination_class = OptInKeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['dividend', 'member', 'is_paid']
     ordering_fields = ['created_at', 'amount']
@@ -191,9 +194,10 @@ class DividendPaymentViewSet(viewsets.ModelViewSet):
 
 class CustomerFeedbackViewSet(viewsets.ModelViewSet):
     """Customer feedback views"""
-    queryset = CustomerFeedback.objects.all()
+    queryset = CustomerFeedback.objects.select_related('responded_by')
     serializer_class = CustomerFeedbackSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = OptInKeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status']
     search_fields = ['name', 'email', 'subject', 'message']
@@ -213,25 +217,18 @@ class CustomerFeedbackViewSet(viewsets.ModelViewSet):
             feedback = serializer.save()
             
             # Send email notification to admin
-            try:
-                send_mail(
-                    'New Customer Feedback',
-                    f'New feedback from {feedback.name} ({feedback.email}):\n\nSubject: {feedback.subject}\nMessage: {feedback.message}',
-                    settings.DEFAULT_FROM_EMAIL,
-                    [settings.DEFAULT_FROM_EMAIL],
-                    fail_silently=True,
-                )
-                
-                # Send confirmation email to customer
-                send_mail(
-                    'Feedback Received',
-                    f'Thank you for your feedback. We have received your message and will respond shortly.\n\nSubject: {feedback.subject}\nMessage: {feedback.message}',
-                    settings.DEFAULT_FROM_EMAIL,
-                    [feedback.email],
-                    fail_silently=True,
-                )
-            except Exception as e:
-                print(f"Email notification failed: {e}")
+            outbox.send(
+                'New Customer Feedback',
+                f'New feedback from {feedback.name} ({feedback.email}):\n\nSubject: {feedback.subject}\nMessage: {feedback.message}',
+                [settings.DEFAULT_FROM_EMAIL],
+            )
+            
+            # Send confirmation email to customer
+            outbox.send(
+                'Feedback Received',
+                f'Thank you for your feedback. We have received your message and will respond shortly.\n\nSubject: {feedback.subject}\nMessage: {feedback.message}',
+                [feedback.email],
+            )
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -252,16 +249,11 @@ class CustomerFeedbackViewSet(viewsets.ModelViewSet):
         feedback.save()
         
         # Send response email to customer
-        try:
-            send_mail(
-                'Response to Your Feedback',
-                f'Thank you for your feedback. Here is our response:\n\n{response_text}',
-                settings.DEFAULT_FROM_EMAIL,
-                [feedback.email],
-                fail_silently=True,
-            )
-        except Exception as e:
-            print(f"Email notification failed: {e}")
+        outbox.send(
+            'Response to Your Feedback',
+            f'Thank you for your feedback. Here is our response:\n\n{response_text}',
+            [feedback.email],
+        )
         
         return Response({'message': 'Response sent successfully'})
 
@@ -283,20 +275,7 @@ class DashboardView(APIView):
     
     def get(self, request):
         """Get dashboard statistics"""
-        today = timezone.now().date()
-        
-        stats = {
-            'total_news': News.objects.count(),
-            'total_faqs': FAQ.objects.count(),
-            'total_downloads': Download.objects.count(),
-            'total_gallery': Gallery.objects.count(),
-            'new_feedback_count': CustomerFeedback.objects.filter(status='new').count(),
-            'total_feedback': CustomerFeedback.objects.count(),
-            'published_news': News.objects.filter(is_published=True).count(),
-            'active_faqs': FAQ.objects.filter(is_active=True).count(),
-            'active_downloads': Download.objects.filter(is_active=True).count(),
-            'active_gallery': Gallery.objects.filter(is_active=True).count(),
-        }
+        stats = dashboard.get_stats()
         
         serializer = DashboardStatsSerializer(stats)
         return Response(serializer.data) 
\ No newline at end of file
@@ -1,22 +1,73 @@
+import os
+
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import F
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
 from .models import News, FAQ, Download, Gallery, ContactInfo
 from .serializers import NewsSerializer, FAQSerializer, DownloadSerializer, GallerySerializer, ContactInfoSerializer
 from .views import IsAdminUser
+from .pagination import LimitCursorPagination
+from .projection import ProjectionError, project, requested_fields, restrict
+from . import content_search, image_resize, public_cache
+
+
+class PublicListMixin:
+    """
+    Public list actions with opt-in ``?limit=``/``?cursor=`` pagination,
+    ``?fields=`` projection and ``?summary=true`` (the ``summary_fields``).
+    Without any of them the whole list is returned as before.
+    """
+    # Column the list is ordered on, newest first
+    public_order_field = 'created_at'
+    summary_fields = None
+    # Model columns of output fields that are not plain model attributes
+    projection_sources = {}
+    
+    def public_list(self, request, name, queryset):
+        """Serve queryset as the public collection name (see public_cache)"""
+        serializer_class = self.get_serializer_class()
+        summary = request.query_params.get('summary', '').lower() in ('1', 'true', 'yes')
+        try:
+            names = requested_fields(request, serializer_class, self.summary_fields if summary else None)
+        except ProjectionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        paginator = LimitCursorPagination(self.public_order_field) if LimitCursorPagination.requested(request) else None
+        
+        def serialize():
+            rows = queryset
+            if names:
+                rows = project(rows, serializer_class, names, self.projection_sources,
+                               extra=[self.public_order_field if paginator else None])
+            if paginator:
+                rows = paginator.paginate_queryset(rows, request, self)
+            serializer = self.get_serializer(rows, many=True)
+            if names:
+                restrict(serializer, names)
+            return paginator.get_paginated_data(serializer.data) if paginator else serializer.data
+        
+        return public_cache.respond(request, name, queryset, serialize)
 
 
-class NewsViewSet(viewsets.ModelViewSet):
+class NewsViewSet(PublicListMixin, viewsets.ModelViewSet):
     """News management views"""
-    queryset = News.objects.all()
+    queryset = News.objects.select_related('author')
     serializer_class = NewsSerializer
     permission_classes = [IsAdminUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_published', 'author']
     search_fields = ['title', 'content']
     ordering_fields = ['created_at', 'published_date']
+    public_order_field = 'published_date'
+    summary_fields = ['id', 'title', 'excerpt', 'image', 'srcset', 'published_date', 'author_name']
     
     def get_permissions(self):
         """Allow public access to published news"""
@@ -30,9 +81,10 @@ class NewsViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def published(self, request):
         """Get only published news"""
-        news = News.objects.filter(is_published=True).order_by('-published_date')
-        serializer = self.get_serializer(news, many=True)
-        return Response(serializer.data)
+        news = News.objects.filter(is_published=True).select_related('author').order_by(
+            F('published_date').desc(nulls_last=True), '-id'
+        )
+        return self.public_list(request, 'news', news)
 
 
 class FAQViewSet(viewsets.ModelViewSet):
@@ -55,23 +107,24 @@ class FAQViewSet(viewsets.ModelViewSet):
     def active(self, request):
         """Get only active FAQs"""
         faqs = FAQ.objects.filter(is_active=True).order_by('order', 'created_at')
-        serializer = self.get_serializer(faqs, many=True)
-        return Response(serializer.data)
+        return public_cache.respond(request, 'faqs', faqs, lambda: self.get_serializer(faqs, many=True).data)
 
 
-class DownloadViewSet(viewsets.ModelViewSet):
+class DownloadViewSet(PublicListMixin, viewsets.ModelViewSet):
     """Download management views"""
-    queryset = Download.objects.all()
+    queryset = Download.objects.select_related('uploaded_by')
     serializer_class = DownloadSerializer
     permission_classes = [IsAdminUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['file_type', 'is_active']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'download_count']
+    summary_fields = ['id', 'title', 'file_type', 'file_size', 'file_url', 'created_at']
+    projection_sources = {'file_url': ['file']}
     
     def get_permissions(self):
         """Allow public access to active downloads"""
-        if self.action == 'active':
+        if self.action in ('active', 'download_file'):
             return [permissions.AllowAny()]
         return super().get_permissions()
     
@@ -81,9 +134,25 @@ class DownloadViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get only active downloads"""
-        downloads = Download.objects.filter(is_active=True).order_by('-created_at')
-        serializer = self.get_serializer(downloads, many=True)
-        return Response(serializer.data)
+        downloads = Download.objects.filter(is_active=True).select_related('uploaded_by').order_by('-created_at', '-id')
+        return self.public_list(request, 'downloads', downloads)
+    
+    @action(detail=True, methods=['get'], url_path='file', url_name='file')
+    def download_file(self, request, pk=None):
+        """The file as an attachment, named as it was uploaded (stored files are named by content)"""
+        downloads = Download.objects.only('file', 'original_name')
+        if getattr(request.user, 'role', None) not in ('admin', 'manager'):
+            downloads = downloads.filter(is_active=True)
+        download = get_object_or_404(downloads, pk=pk)
+        if not download.file:
+            raise Http404('No file')
+        try:
+            handle = download.file.open('rb')
+        except FileNotFoundError:
+            raise Http404('No file')
+        return FileResponse(
+            handle, as_attachment=True, filename=download.original_name or os.path.basename(download.file.name),
+        )
     
     @action(detail=True, methods=['post'])
     def increment_download(self, request, pk=None):
@@ -94,15 +163,17 @@ class DownloadViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Download count updated'})
 
 
-class GalleryViewSet(viewsets.ModelViewSet):
+class GalleryViewSet(PublicListMixin, viewsets.ModelViewSet):
     """Gallery management views"""
-    queryset = Gallery.objects.all()
+    queryset = Gallery.objects.select_related('uploaded_by')
     serializer_class = GallerySerializer
     permission_classes = [IsAdminUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_active', 'uploaded_by']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at']
+    summary_fields = ['id', 'title', 'image_url', 'srcset', 'image_width', 'image_height', 'created_at']
+    projection_sources = {'image_url': ['image']}
     
     def get_permissions(self):
         """Allow public access to active gallery items"""
@@ -116,9 +187,8 @@ class GalleryViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get only active gallery items"""
-        gallery = Gallery.objects.filter(is_active=True).order_by('-created_at')
-        serializer = self.get_serializer(gallery, many=True)
-        return Response(serializer.data)
+        gallery = Gallery.objects.filter(is_active=True).select_related('uploaded_by').order_by('-created_at', '-id')
+        return self.public_list(request, 'gallery', gallery)
 
 
 class ContactInfoViewSet(viewsets.ModelViewSet):
@@ -141,5 +211,63 @@ class ContactInfoViewSet(viewsets.ModelViewSet):
     def active(self, request):
         """Get only active contact info"""
         contacts = ContactInfo.objects.filter(is_active=True).order_by('branch')
-        serializer = self.get_serializer(contacts, many=True)
-        return Response(serializer.data) 
\ No newline at end of file
+        return public_cache.respond(
+            request, 'contact-info', contacts, lambda: self.get_serializer(contacts, many=True).data
+        )
+
+
+class PublicSearchView(APIView):
+    """Ranked search across published news, active FAQs and active downloads"""
+    permission_classes = [permissions.AllowAny]
+    max_limit = 50
+    
+    def get(self, request):
+        """Search public content (?q=, optional ?type=news,faq,download and ?limit=)"""
+        query = request.query_params.get('q', '')
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        unknown = [kind for kind in kinds if kind not in content_search.SOURCES]
+        if unknown:
+            return Response(
+                {'error': f"Unknown type; use any of: {', '.join(content_search.SOURCES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'query': query, 'results': content_search.search(query, kinds, limit)})
+
+
+@require_safe
+def resized_image(request, width, height, path):
+    """A news or gallery image scaled down to fit within width x height (see image_resize)"""
+    try:
+        name = image_resize.source_name(path)
+        image_resize.check_box(width, height)
+    except image_resize.ResizeError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    fmt = 'webp' if 'image/webp' in request.META.get('HTTP_ACCEPT', '') else 'jpeg'
+    cache_key = image_resize.key(name, width, height, fmt)
+    if cache_key is None:
+        raise Http404('No such image')
+    etag = f'"{cache_key[:32]}"'
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            resized = image_resize.open_resized(name, width, height, fmt, cache_key)
+        except image_resize.ResizeError as e:
+            return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = FileResponse(resized, content_type=image_resize.CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    response['Cache-Control'] = image_resize.CACHE_CONTROL
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+class ResizedImageStatsView(APIView):
+    """Hit, miss and eviction counts of the resized image cache"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(image_resize.stats())
@@ -1,16 +1,26 @@
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
-from .models import Member, SavingsAccount, Loan, Transaction
-from .serializers import MemberSerializer, SavingsAccountSerializer, LoanSerializer, TransactionSerializer
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from .models import Member, MemberSummary, SavingsAccount, Loan, Transaction, Reconciliation
+from .serializers import (
+    MemberSerializer, MemberSummarySerializer, SavingsAccountSerializer, LoanSerializer,
+    LoanScheduleSerializer, TransactionSerializer, ReconciliationSerializer, ReconciliationLineSerializer
+)
 from .views import IsAdminUser, IsFinanceOfficer
+from .pagination import KeysetPagination, OptInKeysetPagination
+from .serializers_fast import FastListMixin, FastReadSerializer
+from . import amortization, member_search, posting, reconciliation, rollups, summaries
+from .idempotency import idempotent
 
 
 class MemberViewSet(viewsets.ModelViewSet):
     """Member management views"""
-    queryset = Member.objects.all()
+    queryset = Member.objects.select_related('user')
     serializer_class = MemberSerializer
     permission_classes = [IsAdminUser]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -18,11 +28,33 @@ class MemberViewSet(viewsets.ModelViewSet):
     search_fields = ['member_id', 'user__first_name', 'user__last_name', 'user__email']
     ordering_fields = ['created_at', 'membership_date']
     
+    @action(detail=False, methods=['get'], permission_classes=[IsFinanceOfficer])
+    def search(self, request):
+        """Autocomplete members by name, phone, email, member ID or account number prefixes (?q=)"""
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'query': query, 'results': member_search.search(query, limit)})
+    
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Get member's savings, loan, share and dividend totals"""
+        member = self.get_object()
+        try:
+            summary = MemberSummary.objects.get(member=member)
+        except MemberSummary.DoesNotExist:
+            summaries.refresh([member.pk])
+            summary = MemberSummary.objects.get(member=member)
+        summary.member = member
+        return Response(MemberSummarySerializer(summary).data)
+    
     @action(detail=True, methods=['get'])
     def accounts(self, request, pk=None):
         """Get member's savings accounts"""
         member = self.get_object()
-        accounts = SavingsAccount.objects.filter(member=member)
+        accounts = SavingsAccount.objects.filter(member=member).select_related('member__user')
         serializer = SavingsAccountSerializer(accounts, many=True)
         return Response(serializer.data)
     
@@ -30,23 +62,30 @@ class MemberViewSet(viewsets.ModelViewSet):
     def loans(self, request, pk=None):
         """Get member's loans"""
         member = self.get_object()
-        loans = Loan.objects.filter(member=member)
+        loans = Loan.objects.filter(member=member).select_related('member__user')
         serializer = LoanSerializer(loans, many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def transactions(self, request, pk=None):
-        """Get member's transactions"""
+        """Get member's transactions (latest 50, or keyset pages with ?cursor=)"""
         member = self.get_object()
-        transactions = Transaction.objects.filter(member=member).order_by('-created_at')[:50]
-        serializer = TransactionSerializer(transactions, many=True)
+        transactions = Transaction.objects.filter(member=member).select_related('member__user')
+        if KeysetPagination.cursor_query_param in request.query_params:
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(transactions, request, view=self)
+            serializer = TransactionSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        
+        serializer = TransactionSerializer(transactions.order_by('-created_at')[:50], many=True)
         return Response(serializer.data)
 
 
-class SavingsAccountViewSet(viewsets.ModelViewSet):
+class SavingsAccountViewSet(FastListMixin, viewsets.ModelViewSet):
     """Savings account management views"""
-    queryset = SavingsAccount.objects.all()
+    queryset = SavingsAccount.objects.select_related('member__user')
     serializer_class = SavingsAccountSerializer
+    fast_serializer = FastReadSerializer(SavingsAccountSerializer)
     permission_classes = [IsFinanceOfficer]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['account_type', 'is_active']
@@ -54,79 +93,102 @@ class SavingsAccountViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'balance']
     
     @action(detail=True, methods=['post'])
+    @idempotent
     def deposit(self, request, pk=None):
         """Make a deposit to savings account"""
         account = self.get_object()
-        amount = request.data.get('amount')
-        
-        if not amount or float(amount) <= 0:
-            return Response({'error': 'Invalid amount'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update account balance
-        account.balance += float(amount)
-        account.save()
-        
-        # Create transaction record
-        transaction = Transaction.objects.create(
-            member=account.member,
-            transaction_id=f"TXN{str(timezone.now().timestamp()).replace('.', '')}",
-            transaction_type='deposit',
-            amount=amount,
-            description=f'Deposit to {account.account_number}',
-            savings_account=account,
-            balance_after=account.balance
-        )
+        try:
+            transaction = posting.deposit(
+                account,
+                request.data.get('amount'),
+                reference_number=request.data.get('reference_number'),
+            )
+        except posting.PostingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'message': 'Deposit successful',
-            'new_balance': account.balance,
+            'new_balance': transaction.balance_after,
             'transaction': TransactionSerializer(transaction).data
         })
     
     @action(detail=True, methods=['post'])
+    @idempotent
     def withdraw(self, request, pk=None):
         """Make a withdrawal from savings account"""
         account = self.get_object()
-        amount = request.data.get('amount')
-        
-        if not amount or float(amount) <= 0:
-            return Response({'error': 'Invalid amount'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if account.balance < float(amount):
-            return Response({'error': 'Insufficient funds'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update account balance
-        account.balance -= float(amount)
-        account.save()
-        
-        # Create transaction record
-        transaction = Transaction.objects.create(
-            member=account.member,
-            transaction_id=f"TXN{str(timezone.now().timestamp()).replace('.', '')}",
-            transaction_type='withdrawal',
-            amount=amount,
-            description=f'Withdrawal from {account.account_number}',
-            savings_account=account,
-            balance_after=account.balance
-        )
+        try:
+            transaction = posting.withdraw(
+                account,
+                request.data.get('amount'),
+                reference_number=request.data.get('reference_number'),
+            )
+        except posting.PostingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'message': 'Withdrawal successful',
-            'new_balance': account.balance,
+            'new_balance': transaction.balance_after,
             'transaction': TransactionSerializer(transaction).data
         })
 
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def bulk_deposit(self, request):
+        """Post a payroll deduction batch (uploaded CSV/JSON file or JSON array)"""
+        upload = request.FILES.get('file')
+        try:
+            if upload:
+                fmt = 'json' if upload.name.lower().endswith('.json') else 'csv'
+                lines = posting.read_batch(upload, fmt)
+            else:
+                lines = request.data if isinstance(request.data, list) else request.data.get('lines')
+            if not isinstance(lines, list):
+                raise posting.PostingError('No batch lines supplied')
+        except (posting.PostingError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.query_params.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        report = posting.bulk_deposit(lines, dry_run=dry_run)
+        return Response(report)
+
 
-class LoanViewSet(viewsets.ModelViewSet):
+class LoanViewSet(FastListMixin, viewsets.ModelViewSet):
     """Loan management views"""
-    queryset = Loan.objects.all()
+    queryset = Loan.objects.select_related('member__user')
     serializer_class = LoanSerializer
+    fast_serializer = FastReadSerializer(LoanSerializer)
     permission_classes = [IsFinanceOfficer]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['loan_type', 'status']
     search_fields = ['loan_number', 'member__user__first_name', 'member__user__last_name']
     ordering_fields = ['created_at', 'amount', 'due_date']
     
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        monthly_payment, total_amount = amortization.terms(
+            data['amount'], data['interest_rate'], data['term_months'], data.get('interest_method', 'reducing')
+        )
+        loan = serializer.save(
+            monthly_payment=monthly_payment, total_amount=total_amount, remaining_balance=total_amount
+        )
+        amortization.build_schedules(Loan.objects.filter(pk=loan.pk))
+        loan.refresh_from_db()
+    
+    def perform_update(self, serializer):
+        loan = serializer.save()
+        amortization.build_schedules(Loan.objects.filter(pk=loan.pk))
+        loan.refresh_from_db()
+    
+    @action(detail=True, methods=['get'])
+    def schedule(self, request, pk=None):
+        """Get the loan's repayment schedule"""
+        loan = self.get_object()
+        if not loan.schedule.exists():
+            amortization.build_schedules(Loan.objects.filter(pk=loan.pk))
+        serializer = LoanScheduleSerializer(loan.schedule.all(), many=True)
+        return Response(serializer.data)
+    
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
         """Approve a loan application"""
@@ -141,71 +203,149 @@ class LoanViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Loan approved successfully'})
     
     @action(detail=True, methods=['post'])
+    @idempotent
     def disburse(self, request, pk=None):
         """Disburse an approved loan"""
         loan = self.get_object()
-        if loan.status != 'approved':
-            return Response({'error': 'Loan is not approved'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        loan.status = 'active'
-        loan.disbursement_date = timezone.now().date()
-        loan.save()
-        
-        # Create transaction record
-        transaction = Transaction.objects.create(
-            member=loan.member,
-            transaction_id=f"TXN{str(timezone.now().timestamp()).replace('.', '')}",
-            transaction_type='loan_disbursement',
-            amount=loan.amount,
-            description=f'Loan disbursement for {loan.loan_number}',
-            loan=loan,
-            balance_after=0  # This would be the loan balance
-        )
+        try:
+            posting.disburse_loan(loan)
+        except posting.PostingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({'message': 'Loan disbursed successfully'})
     
     @action(detail=True, methods=['post'])
+    @idempotent
     def make_payment(self, request, pk=None):
         """Make a loan payment"""
         loan = self.get_object()
-        amount = request.data.get('amount')
-        
-        if not amount or float(amount) <= 0:
-            return Response({'error': 'Invalid amount'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if loan.remaining_balance < float(amount):
-            return Response({'error': 'Payment amount exceeds remaining balance'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update loan balance
-        loan.remaining_balance -= float(amount)
-        if loan.remaining_balance <= 0:
-            loan.status = 'completed'
-        loan.save()
-        
-        # Create transaction record
-        transaction = Transaction.objects.create(
-            member=loan.member,
-            transaction_id=f"TXN{str(timezone.now().timestamp()).replace('.', '')}",
-            transaction_type='loan_payment',
-            amount=amount,
-            description=f'Loan payment for {loan.loan_number}',
-            loan=loan,
-            balance_after=loan.remaining_balance
-        )
+        try:
+            transaction = posting.loan_payment(
+                loan,
+                request.data.get('amount'),
+                reference_number=request.data.get('reference_number'),
+            )
+        except posting.PostingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'message': 'Payment successful',
-            'remaining_balance': loan.remaining_balance,
+            'remaining_balance': transaction.balance_after,
             'transaction': TransactionSerializer(transaction).data
         })
 
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     """Transaction views (read-only)"""
-    queryset = Transaction.objects.all()
+    queryset = Transaction.objects.select_related('member__user')
     serializer_class = TransactionSerializer
+    fast_serializer = FastReadSerializer(TransactionSerializer)
     permission_classes = [IsFinanceOfficer]
+    pagination_class = OptInKeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['transaction_type', 'member']
     search_fields = ['transaction_id', 'member__user__first_name', 'member__user__last_name']
-    ordering_fields = ['created_at', 'amount'] 
\ No newline at end of file
+    ordering_fields = ['created_at', 'amount'] 
+
+
+class ReconciliationViewSet(viewsets.ReadOnlyModelViewSet):
+    """Bank and mobile-money statement reconciliation views"""
+    queryset = Reconciliation.objects.select_related('created_by')
+    serializer_class = ReconciliationSerializer
+    permission_classes = [IsFinanceOfficer]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['source']
+    ordering_fields = ['created_at']
+    
+    @action(detail=False, methods=['post'])
+    def upload(self, request):
+        """Reconcile an uploaded statement CSV (date, reference, amount[, description] columns)"""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'Statement file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        source = request.data.get('source', 'bank')
+        if source not in dict(Reconciliation.SOURCE_CHOICES):
+            return Response({'error': 'Invalid source'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            window_days = int(request.data.get('window_days', 2))
+        except (TypeError, ValueError):
+            window_days = -1
+        if not 0 <= window_days <= reconciliation.MAX_WINDOW_DAYS:
+            return Response(
+                {'error': f'window_days must be between 0 and {reconciliation.MAX_WINDOW_DAYS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            run = reconciliation.reconcile(
+                upload, name=upload.name, source=source, window_days=window_days,
+                date_format=request.data.get('date_format') or None, user=request.user,
+            )
+        except reconciliation.StatementError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ReconciliationSerializer(run).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['get'])
+    def lines(self, request, pk=None):
+        """Get a reconciliation's lines in file order, optionally of one ?status="""
+        run = self.get_object()
+        lines = run.lines.order_by('line_number')
+        line_status = request.query_params.get('status')
+        if line_status:
+            lines = lines.filter(status=line_status)
+        page = self.paginate_queryset(lines)
+        serializer = ReconciliationLineSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class TimeseriesReportView(APIView):
+    """Transaction volume reports served from the daily rollup"""
+    permission_classes = [IsFinanceOfficer]
+    max_days = 3660
+    
+    def get(self, request):
+        """Get transaction count and amount per day, week or month"""
+        metric = request.query_params.get('metric', 'all')
+        granularity = request.query_params.get('granularity', 'day')
+        if metric != 'all' and metric not in rollups.METRICS:
+            return Response(
+                {'error': f"Unknown metric; use 'all' or one of: {', '.join(rollups.METRICS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if granularity not in rollups.GRANULARITIES:
+            return Response(
+                {'error': f"Unknown granularity; use one of: {', '.join(rollups.GRANULARITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            date_to = self.parse_day('to') or timezone.localdate()
+            date_from = self.parse_day('from') or date_to - timedelta(days=29)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if date_from > date_to:
+            return Response({'error': "'from' must not be after 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+        if (date_to - date_from).days >= self.max_days:
+            return Response(
+                {'error': f'Date range is limited to {self.max_days} days'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'metric': metric,
+            'granularity': granularity,
+            'from': date_from,
+            'to': date_to,
+            'series': rollups.series(metric, granularity, date_from, date_to),
+        })
+    
+    def parse_day(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValueError(f"'{name}' must be a date (YYYY-MM-DD)")
+        return day
@@ -110,6 +110,79 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Number of IDs a worker process reserves per database round trip (see sacco_app/ids.py)
+ID_BLOCK_SIZE = config('ID_BLOCK_SIZE', default=100, cast=int)
+
+# Admin dashboard (see sacco_app/dashboard.py): seconds its statistics count as
+# fresh, then how much longer a stale copy may be served while it is recomputed
+# in the background, and where the copy is kept ('locmem' per process, so a
+# write invalidates only the worker that handled it; 'file' or 'db' to share
+# it between workers, the latter after "manage.py createcachetable")
+DASHBOARD_CACHE_SECONDS = config('DASHBOARD_CACHE_SECONDS', default=30, cast=int)
+DASHBOARD_STALE_SECONDS = config('DASHBOARD_STALE_SECONDS', default=300, cast=int)
+DASHBOARD_CACHE_BACKEND = config('DASHBOARD_CACHE_BACKEND', default='locmem')
+DASHBOARD_CACHE_LOCATION = config('DASHBOARD_CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'dashboard'))
+
+# Public content endpoints (see sacco_app/public_cache.py): the Cache-Control
+# they send, where their rendered responses are kept ('locmem' per process;
+# 'file' or 'db' to share them between workers, the latter after
+# "manage.py createcachetable"), how long an entry is kept, and how old a
+# previous response may be to still be served while one request rebuilds it
+PUBLIC_CACHE_CONTROL = config('PUBLIC_CACHE_CONTROL', default='public, max-age=60')
+PUBLIC_CACHE_BACKEND = config('PUBLIC_CACHE_BACKEND', default='locmem')
+PUBLIC_CACHE_LOCATION = config('PUBLIC_CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'public'))
+PUBLIC_CACHE_TIMEOUT = config('PUBLIC_CACHE_TIMEOUT', default=86400, cast=int)
+PUBLIC_CACHE_STALE_SECONDS = config('PUBLIC_CACHE_STALE_SECONDS', default=300, cast=int)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'public': {
+        'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sacco-public'},
+        'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': PUBLIC_CACHE_LOCATION},
+        'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'sacco_public_cache'},
+    }[PUBLIC_CACHE_BACKEND],
+    'dashboard': {
+        'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sacco-dashboard'},
+        'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': DASHBOARD_CACHE_LOCATION},
+        'db': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'sacco_dashboard_cache'},
+    }[DASHBOARD_CACHE_BACKEND],
+}
+
+# Static JSON snapshots of the public collections (see sacco_app/snapshots.py):
+# where they are written, how long after a change they are republished (edits
+# made in between go out together), and the prefix of file and image links in
+# them ('' keeps links relative to the site root)
+SNAPSHOT_DIR = config('SNAPSHOT_DIR', default=str(BASE_DIR / 'assets' / 'data'))
+SNAPSHOT_DEBOUNCE_SECONDS = config('SNAPSHOT_DEBOUNCE_SECONDS', default=10, cast=int)
+SNAPSHOT_BASE_URL = config('SNAPSHOT_BASE_URL', default='')
+
+# Resized copies of news and gallery images (see sacco_app/image_derivatives.py):
+# the widths made (never wider than the original) and the processes that make them
+IMAGE_DERIVATIVE_WIDTHS = config('IMAGE_DERIVATIVE_WIDTHS', default='320,640,1024,1600',
+                                 cast=lambda value: sorted({int(width) for width in value.split(',') if width.strip()}))
+IMAGE_DERIVATIVE_WORKERS = config('IMAGE_DERIVATIVE_WORKERS', default=2, cast=int)
+
+# Images resized on request (see sacco_app/image_resize.py): where results are
+# cached, the byte budget past which the least recently used are evicted, and
+# the only boxes (width x height) that may be asked for
+IMAGE_RESIZE_CACHE_DIR = config('IMAGE_RESIZE_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'resized'))
+IMAGE_RESIZE_CACHE_BYTES = config('IMAGE_RESIZE_CACHE_BYTES', default=256 * 1024 * 1024, cast=int)
+IMAGE_RESIZE_SIZES = config('IMAGE_RESIZE_SIZES', default='160x160,320x320,640x640,1024x1024,1600x1600',
+                            cast=lambda value: {tuple(int(n) for n in box.strip().split('x'))
+                                                for box in value.split(',') if box.strip()})
+
+# Hours a stored Idempotency-Key response is replayed before the key may be reused
+IDEMPOTENCY_KEY_TTL_HOURS = config('IDEMPOTENCY_KEY_TTL_HOURS', default=24, cast=int)
+
+# Background jobs (see sacco_app/jobs.py): attempts before a job is marked
+# failed, first retry delay (doubling each attempt up to the maximum), and how
+# long a running job may go unfinished before it is handed to another worker
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=5, cast=int)
+JOB_RETRY_BACKOFF_SECONDS = config('JOB_RETRY_BACKOFF_SECONDS', default=30, cast=int)
+JOB_RETRY_BACKOFF_MAX_SECONDS = config('JOB_RETRY_BACKOFF_MAX_SECONDS', default=3600, cast=int)
+JOB_LOCK_TIMEOUT_SECONDS = config('JOB_LOCK_TIMEOUT_SECONDS', default=600, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -174,6 +247,15 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@sacco.com')
 
+# Email outbox (see sacco_app/outbox.py): messages per minute sent to one
+# recipient domain, with per-domain overrides as "gmail.com=60,yahoo.com=30"
+EMAIL_RATE_LIMIT_PER_MINUTE = config('EMAIL_RATE_LIMIT_PER_MINUTE', default=120, cast=int)
+EMAIL_PROVIDER_RATE_LIMITS = config(
+    'EMAIL_PROVIDER_RATE_LIMITS', default='',
+    cast=lambda value: {domain.strip().lower(): int(limit) for domain, limit in
+                        (item.split('=') for item in value.split(',') if item.strip())},
+)
+
 # File upload settings
 MAX_UPLOAD_SIZE = 5242880  # 5MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
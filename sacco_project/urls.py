@@ -9,12 +9,16 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from sacco_app.views_content import resized_image
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('sacco_app.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    # Ahead of the media files below, which would otherwise claim its paths
+    path(f"{settings.MEDIA_URL.strip('/')}/resize/<int:width>x<int:height>/<path:path>", resized_image,
+         name='resized-image'),
 ]
 
 # Serve media files during development